@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Sanctions Screening Benchmark
+Screens perturbed list names (typos, reordered tokens, legal-form noise)
+and unrelated names through the blocking index and through exhaustive
+scoring, and reports names/sec, recall and false-positive rate as JSON
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from sanctions_screening import SanctionsScreener, compact_name, normalize_name
+
+# Consonant-vowel(-consonant) syllables give names a trigram spread close to
+# that of real transliterated list names
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwyz" for v in "aeiou"] + \
+            [c + v + e for c in "bdhklmnrst" for v in "aeiou" for e in "lmnrs"]
+COMPANY_WORDS = ["TRADING", "SHIPPING", "HOLDINGS", "INDUSTRIES", "PETROLEUM", "EXPORT", "BANK", "GROUP",
+                 "MARINE", "LOGISTICS", "INVESTMENT", "ENERGY"]
+LEGAL_FORMS = ["LLC", "LTD", "CO.", "S.A.", "GMBH", "JSC"]
+
+def synthetic_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+def synthetic_name(rng: random.Random) -> Tuple[str, str]:
+    if rng.random() < 0.7:
+        return " ".join(synthetic_word(rng) for _ in range(rng.randint(2, 3))), "Individual"
+    words = [synthetic_word(rng) for _ in range(rng.randint(1, 2))] + [rng.choice(COMPANY_WORDS)]
+    return " ".join(words + [rng.choice(LEGAL_FORMS)]), "Entity"
+
+def write_synthetic_list(path: Path, count: int, rng: random.Random) -> List[Tuple[str, List[str]]]:
+    """Write a CSV list with ~20% of entries carrying an alias; returns (id, names) per entry"""
+    entries = []
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "name", "aliases", "type", "programs", "source"])
+        for number in range(count):
+            name, kind = synthetic_name(rng)
+            aliases = [synthetic_name(rng)[0]] if rng.random() < 0.2 else []
+            writer.writerow([f"SYN-{number}", name, ";".join(aliases), kind, "SDGT", "synthetic"])
+            entries.append((f"SYN-{number}", [name] + aliases))
+    return entries
+
+def perturb(name: str, rng: random.Random, edits: int) -> str:
+    """Typos, a swapped token order and a changed legal form, as seen on real applications"""
+    tokens = name.split()
+    if len(tokens) > 1 and rng.random() < 0.5:
+        rng.shuffle(tokens)
+    text = " ".join(tokens)
+    for _ in range(edits):
+        position = rng.randrange(len(text))
+        operation = rng.choice(("substitute", "delete", "insert", "transpose"))
+        letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        if operation == "substitute":
+            text = text[:position] + letter + text[position + 1:]
+        elif operation == "delete" and len(text) > 4:
+            text = text[:position] + text[position + 1:]
+        elif operation == "insert":
+            text = text[:position] + letter + text[position:]
+        elif position + 1 < len(text):
+            text = text[:position] + text[position + 1] + text[position] + text[position + 2:]
+    if rng.random() < 0.3:
+        text += " " + rng.choice(LEGAL_FORMS)
+    return text
+
+def exhaustive_screen(screener: SanctionsScreener, names: List[str], chunk: int = 8) -> List[set]:
+    """Reference result: score every list name against every query (no blocking)"""
+    index = screener.index
+    hits = []
+    for start in range(0, len(names), chunk):
+        batch = names[start:start + chunk]
+        pair_queries = np.repeat(np.arange(len(batch)), len(index))
+        pair_rows = np.tile(np.arange(len(index)), len(batch))
+        similarity = index.score([normalize_name(name) for name in batch], [compact_name(name) for name in batch],
+                                 pair_queries, pair_rows)
+        hit = similarity >= screener.threshold
+        found = [set() for _ in batch]
+        for number, owner in zip(pair_queries[hit].tolist(), index.owners[pair_rows[hit]].tolist()):
+            found[number].add(index.entries[owner].entry_id)
+        hits.extend(found)
+    return hits
+
+def run(entries: int, queries: int, edits: int, threshold: float, batch_size: int,
+        list_path: Optional[Path], seed: int, reference_queries: int) -> Dict:
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory(prefix="screenbench_") as work_dir:
+        if list_path is None:
+            list_path = Path(work_dir) / "sanctions.csv"
+            truth_entries = write_synthetic_list(list_path, entries, rng)
+        else:
+            truth_entries = None
+
+        start = time.perf_counter()
+        screener = SanctionsScreener(str(list_path), threshold=threshold)
+        build_seconds = time.perf_counter() - start
+        index = screener.index
+
+        # Known-positive queries are perturbed list names; negatives are fresh names
+        positives, truth = [], []
+        for _ in range(queries // 2):
+            owner = rng.randrange(len(index.entries))
+            entry = index.entries[owner]
+            positives.append(perturb(rng.choice((entry.name, *entry.aliases)), rng, edits))
+            truth.append(entry.entry_id)
+        known = {normalize_name(name) for _, names in (truth_entries or []) for name in names}
+        negatives = []
+        while len(negatives) < queries - len(positives):
+            name = synthetic_name(rng)[0]
+            if normalize_name(name) not in known:
+                negatives.append(name)
+        names = positives + negatives
+
+        start = time.perf_counter()
+        results = []
+        for offset in range(0, len(names), batch_size):
+            results.extend(screener.screen_many(names[offset:offset + batch_size]))
+        elapsed = time.perf_counter() - start
+
+        found = [{match.entry.entry_id for match in result.matches} for result in results]
+        recall = float(np.mean([entry_id in hit for entry_id, hit in zip(truth, found)])) if truth else 0.0
+        false_positive_rate = float(np.mean([bool(hit) for hit in found[len(positives):]])) if negatives else 0.0
+        pair_queries, _ = index.candidate_pairs([normalize_name(name) for name in names])
+        candidates = np.bincount(pair_queries, minlength=len(names))
+
+        # Blocking recall against exhaustive scoring on a sample of queries
+        sample = names[:reference_queries]
+        start = time.perf_counter()
+        reference = exhaustive_screen(screener, sample)
+        reference_elapsed = time.perf_counter() - start
+        blocked_pairs = sum(len(hit & ref) for hit, ref in zip(found, reference))
+        reference_pairs = sum(len(ref) for ref in reference)
+
+        # Hot reload: append an entry and swap the rebuilt index in
+        with open(list_path, "a", newline="") as handle:
+            csv.writer(handle).writerow(["SYN-RELOAD", "Reload Probe Trading LLC", "", "Entity", "SDGT", "synthetic"])
+        start = time.perf_counter()
+        screener.reload_if_changed(force=True)
+        reload_seconds = time.perf_counter() - start
+        reloaded = screener.screen("Reload Probe Trading").status
+
+    return {
+        "list_entries": len(index.entries),
+        "list_names": len(index),
+        "queries": len(names),
+        "edits_per_query": edits,
+        "threshold": threshold,
+        "batch_size": batch_size,
+        "build_seconds": round(build_seconds, 3),
+        "names_per_sec": round(len(names) / elapsed, 1),
+        "recall": round(recall, 4),
+        "false_positive_rate": round(false_positive_rate, 4),
+        "mean_candidates": round(float(np.mean(candidates)), 1),
+        "blocking_recall_vs_exhaustive": round(blocked_pairs / reference_pairs, 4) if reference_pairs else 1.0,
+        "exhaustive_names_per_sec": round(len(sample) / reference_elapsed, 1),
+        "reload_seconds": round(reload_seconds, 3),
+        "reload_probe": reloaded,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000, help="Synthetic list size")
+    parser.add_argument("--list", type=Path, help="Screen against this list file instead of a synthetic one")
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--edits", type=int, default=1, help="Typos applied to each positive query")
+    parser.add_argument("--threshold", type=float, default=0.85)
+    parser.add_argument("--batch-size", type=int, default=64, help="Names per screen_many call")
+    parser.add_argument("--reference-queries", type=int, default=200,
+                        help="Queries also screened exhaustively to measure blocking recall")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "sanctions_screening",
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "run": run(args.entries, args.queries, args.edits, args.threshold, args.batch_size,
+                   args.list, args.seed, args.reference_queries),
+    }
+    result = report["run"]
+    print(f"{result['list_names']} list names  {result['names_per_sec']:.0f} names/sec "
+          f"(exhaustive {result['exhaustive_names_per_sec']:.0f})  recall {result['recall']:.3f}  "
+          f"blocking recall {result['blocking_recall_vs_exhaustive']:.3f}  "
+          f"false positives {result['false_positive_rate']:.3f}  reload {result['reload_seconds']}s")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True))
+        print(f"Wrote report: {args.output}")
+
+if __name__ == "__main__":
+    main()
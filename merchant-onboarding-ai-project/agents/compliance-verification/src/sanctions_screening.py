@@ -0,0 +1,425 @@
+"""
+Sanctions Screening Engine
+Fuzzy screening of owner and business names against a local sanctions list
+(OFAC SDN, UN, EU or a consolidated export): trigram and phonetic blocking
+narrows ~20k list names to a few dozen candidates, which are scored with a
+bit-parallel edit distance vectorised across every (name, candidate) pair
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import csv
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+# Names are reduced to this alphabet; code 0 pads shorter names
+ALPHABET = " ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+_CODES = np.zeros(128, dtype=np.uint8)
+_CODES[[ord(c) for c in ALPHABET]] = np.arange(1, len(ALPHABET) + 1)
+ALPHABET_SIZE = len(ALPHABET) + 1
+# The bit-parallel scorer holds the query in one 64-bit word
+MAX_NAME_LENGTH = 64
+
+# Legal-form and filler words that carry no identity
+STOP_WORDS = frozenset({
+    "THE", "OF", "AND", "LLC", "INC", "LTD", "LIMITED", "CORP", "CORPORATION", "CO", "COMPANY",
+    "PLC", "SA", "AG", "GMBH", "BV", "NV", "LLP", "LP", "JSC", "PJSC", "OOO", "ZAO", "OAO",
+})
+
+CLEAR = "clear"
+HIT = "hit"
+# Nothing left to compare after normalisation (e.g. a script with no
+# transliteration and no exact list match); needs a manual review
+UNSCREENABLE = "unscreenable"
+
+# Cyrillic has no NFKD decomposition to ASCII; transliterate it so Cyrillic
+# names and aliases block and score against their Latin spellings
+_CYRILLIC = dict(zip(
+    "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯІЇЄҐЎ",
+    ["A", "B", "V", "G", "D", "E", "E", "ZH", "Z", "I", "Y", "K", "L", "M", "N", "O", "P", "R", "S", "T",
+     "U", "F", "KH", "TS", "CH", "SH", "SHCH", "", "Y", "", "E", "YU", "YA", "I", "YI", "YE", "G", "U"],
+))
+_TRANSLITERATION = str.maketrans({**{ord(k): v for k, v in _CYRILLIC.items()},
+                                  **{ord(k.lower()): v for k, v in _CYRILLIC.items()}})
+
+@dataclass(frozen=True)
+class ListEntry:
+    """One sanctioned party; aliases are screened as well as the primary name"""
+    entry_id: str
+    name: str
+    entity_type: str = ""
+    programs: str = ""
+    source: str = ""
+    aliases: Tuple[str, ...] = ()
+
+@dataclass(frozen=True)
+class ScreeningMatch:
+    entry: ListEntry
+    matched_name: str
+    score: float
+
+@dataclass
+class ScreeningResult:
+    name: str
+    status: str
+    matches: List[ScreeningMatch] = field(default_factory=list)
+    list_version: str = ""
+
+def _name_tokens(name: str) -> List[str]:
+    """Uppercase ASCII tokens without accents, punctuation or legal-form words"""
+    ascii_name = unicodedata.normalize("NFKD", name.translate(_TRANSLITERATION))
+    ascii_name = ascii_name.encode("ascii", "ignore").decode("ascii").upper()
+    tokens = [token for token in re.split(r"[^A-Z0-9]+", ascii_name.replace("'", "").replace(".", "")) if token]
+    return [token for token in tokens if token not in STOP_WORDS] or tokens
+
+def normalize_name(name: str) -> str:
+    """Tokens in sorted order, so "Smith, John" and "JOHN SMITH" compare equal"""
+    return " ".join(sorted(_name_tokens(name)))[:MAX_NAME_LENGTH]
+
+def exact_key(name: str) -> str:
+    """Case- and width-folded name in its own script, for exact matching of any alphabet"""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+def compact_name(name: str) -> str:
+    """
+    Tokens in written order with no separators, so a typo that moves a
+    word boundary ("Nis aTalibomo") costs one edit
+    """
+    return "".join(_name_tokens(name))[:MAX_NAME_LENGTH]
+
+_SOUNDEX = str.maketrans("BFPVCGJKQSXZDTLMNR", "111122222222334556")
+
+def soundex(token: str) -> str:
+    """American Soundex of an uppercase token (digits are kept as-is)"""
+    if not token[0].isalpha():
+        return token
+    digits = token.translate(_SOUNDEX)
+    code, previous = token[0], digits[0]
+    for char, digit in zip(token[1:], digits[1:]):
+        if digit.isdigit() and digit != previous:
+            code += digit
+        if char not in "HW":
+            previous = digit
+    return (code + "000")[:4]
+
+def _encode(names: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Alphabet codes of normalised names as a zero-padded matrix, plus lengths"""
+    lengths = np.array([len(name) for name in names], dtype=np.int64)
+    width = max(int(lengths.max()) if len(names) else 0, 1)
+    raw = np.frombuffer("".join(name.ljust(width, "\0") for name in names).encode("ascii"), dtype=np.uint8)
+    return _CODES[raw].reshape(len(names), width), lengths
+
+def _trigrams(codes: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (row, trigram id) pairs of space-padded names, one per distinct trigram
+    in each name; ids index a dense ALPHABET_SIZE ** 3 table
+    """
+    space = _CODES[ord(" ")]
+    padded = np.zeros((len(codes), codes.shape[1] + 2), dtype=np.int64)
+    padded[:, 0] = space
+    padded[:, 1:-1] = codes
+    padded[np.arange(len(codes)), lengths + 1] = space
+    grams = (padded[:, :-2] * ALPHABET_SIZE + padded[:, 1:-1]) * ALPHABET_SIZE + padded[:, 2:]
+    valid = np.arange(grams.shape[1]) < lengths[:, None]
+    rows = np.broadcast_to(np.arange(len(codes))[:, None], grams.shape)[valid]
+    keys = np.unique(rows * ALPHABET_SIZE ** 3 + grams[valid])
+    return keys // ALPHABET_SIZE ** 3, keys % ALPHABET_SIZE ** 3
+
+def edit_distances(query_codes: np.ndarray, query_lengths: np.ndarray, pair_queries: np.ndarray,
+                   text_codes: np.ndarray, text_lengths: np.ndarray) -> np.ndarray:
+    """
+    Edit distance (Levenshtein plus adjacent transpositions, as optimal
+    string alignment) for every (query, text) pair, with Hyyro's extension
+    of Myers' bit-parallel algorithm. Each step advances all pairs by one
+    text character, so the Python loop runs once per character position
+    rather than once per pair. ``text_codes``/``text_lengths`` are per
+    pair; ``pair_queries`` indexes the queries.
+    """
+    # Per-query match masks: bit i of peq[q, c] is set when query[i] == c
+    peq = np.zeros((len(query_codes), ALPHABET_SIZE), dtype=np.uint64)
+    rows = np.arange(len(query_codes))
+    for i in range(query_codes.shape[1]):
+        present = i < query_lengths
+        peq[rows[present], query_codes[present, i]] |= np.uint64(1 << i)
+    peq[:, 0] = 0
+
+    m = query_lengths[pair_queries]
+    high = np.left_shift(np.uint64(1), (np.maximum(m, 1) - 1).astype(np.uint64))
+    pv = np.full(len(pair_queries), np.uint64(0xFFFFFFFFFFFFFFFF))
+    mv = np.zeros(len(pair_queries), dtype=np.uint64)
+    d0 = pv.copy()
+    previous_eq = mv.copy()
+    score = m.copy()
+    one = np.uint64(1)
+    for j in range(text_codes.shape[1]):
+        active = j < text_lengths
+        if not active.any():
+            break
+        eq = peq[pair_queries, text_codes[:, j]]
+        transposed = ((~d0 & eq) << one) & previous_eq
+        d0 = (((eq & pv) + pv) ^ pv) | eq | mv | transposed
+        ph = mv | ~(d0 | pv)
+        mh = d0 & pv
+        score += (active & ((ph & high) != 0)).astype(np.int64)
+        score -= (active & ((mh & high) != 0)).astype(np.int64)
+        ph = (ph << one) | one
+        mh = mh << one
+        pv = mh | ~(d0 | ph)
+        mv = ph & d0
+        previous_eq = eq
+    # An empty query is as far from a text as the text is long
+    return np.where(m > 0, score, text_lengths)
+
+def load_list(path: str) -> List[ListEntry]:
+    """
+    Read a sanctions list export. Either a CSV with a header row containing
+    ``name`` (plus optional id, aliases separated by ";", type, programs,
+    source columns), or OFAC's headerless sdn.csv layout.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        reader = csv.reader(handle)
+        first = next(reader, None)
+        if first is None:
+            return []
+        header = [column.strip().lower() for column in first]
+        entries = []
+        if "name" not in header:
+            # OFAC SDN: ent_num, SDN_Name, SDN_Type, Program, ... with "-0-" for nulls
+            for row in [first, *reader]:
+                if len(row) < 4 or not row[1].strip():
+                    continue
+                clean = ["" if value.strip() == "-0-" else value.strip() for value in row]
+                entries.append(ListEntry(clean[0], clean[1], clean[2], clean[3], "OFAC SDN"))
+            return entries
+
+        column = {name: header.index(name) for name in header}
+        get = lambda row, *names: next((row[column[n]].strip() for n in names
+                                        if n in column and column[n] < len(row)), "")
+        for number, row in enumerate(reader):
+            name = get(row, "name")
+            if not name:
+                continue
+            aliases = tuple(alias.strip() for alias in get(row, "aliases", "alias").split(";") if alias.strip())
+            entries.append(ListEntry(
+                get(row, "id", "uid", "entry_id") or str(number + 1), name,
+                get(row, "type", "entity_type"), get(row, "programs", "program"),
+                get(row, "source", "list"), aliases,
+            ))
+        return entries
+
+class ScreeningIndex:
+    """
+    Immutable blocking index over every primary name and alias of a list
+    Candidates for a query are list names sharing enough distinct character
+    trigrams (Dice coefficient) or most of the query's Soundex keys; only
+    those are scored by edit distance. Trigrams found in more than
+    ``max_gram_share`` of names (" AL", "MAD") are left out of blocking:
+    they select nothing but make up most of the posting volume. Candidate
+    generation and scoring both work on a whole batch of queries at once.
+    Every name is also kept verbatim (see ``exact_key``), so names in
+    scripts that normalise to nothing can still be matched exactly.
+    """
+
+    def __init__(self, entries: Sequence[ListEntry], version: str = "",
+                 min_trigram_similarity: float = 0.3, max_candidates: int = 64,
+                 max_gram_share: float = 0.02):
+        self.entries = list(entries)
+        self.version = version
+        self.min_trigram_similarity = min_trigram_similarity
+        self.max_candidates = max_candidates
+
+        names, compacts, owners, originals = [], [], [], []
+        self.exact: Dict[str, List[Tuple[int, str]]] = {}
+        for number, entry in enumerate(self.entries):
+            for original in (entry.name, *entry.aliases):
+                self.exact.setdefault(exact_key(original), []).append((number, original))
+                normalized = normalize_name(original)
+                if normalized:
+                    names.append(normalized)
+                    compacts.append(compact_name(original))
+                    owners.append(number)
+                    originals.append(original)
+        self.names = names
+        self.originals = originals
+        self.owners = np.array(owners, dtype=np.int64)
+        self.codes, self.lengths = _encode(names)
+        self.compact_codes, self.compact_lengths = _encode(compacts)
+
+        # Trigram postings in CSR form over the dense trigram id space
+        rows, grams = _trigrams(self.codes, self.lengths)
+        frequency = np.bincount(grams, minlength=ALPHABET_SIZE ** 3)
+        self.common_grams = frequency > max(max_gram_share * len(names), 100)
+        informative = ~self.common_grams[grams]
+        rows, grams = rows[informative], grams[informative]
+        order = np.argsort(grams, kind="stable")
+        self.gram_rows = rows[order]
+        self.gram_offsets = np.concatenate([[0], np.cumsum(np.bincount(grams, minlength=ALPHABET_SIZE ** 3))])
+        self.gram_counts = np.bincount(rows, minlength=len(names))
+
+        phonetic: Dict[str, List[int]] = {}
+        for row, name in enumerate(names):
+            for key in {soundex(token) for token in name.split()}:
+                phonetic.setdefault(key, []).append(row)
+        self.phonetic = {key: np.array(rows, dtype=np.int64) for key, rows in phonetic.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def candidate_pairs(self, queries: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(query number, list row) of every pair worth scoring, for normalised queries"""
+        size = len(self.names)
+        codes, lengths = _encode(queries)
+        query_ids, grams = _trigrams(codes, lengths)
+        informative = ~self.common_grams[grams]
+        query_ids, grams = query_ids[informative], grams[informative]
+
+        # Concatenate the posting ranges of every (query, trigram) without a loop
+        starts = self.gram_offsets[grams]
+        spans = self.gram_offsets[grams + 1] - starts
+        positions = np.arange(spans.sum()) + np.repeat(starts - (np.cumsum(spans) - spans), spans)
+        keys, shared = np.unique(np.repeat(query_ids, spans) * size + self.gram_rows[positions],
+                                 return_counts=True)
+        owners, rows = keys // size, keys % size
+        grams_per_query = np.bincount(query_ids, minlength=len(queries))
+        dice = 2 * shared / (grams_per_query[owners] + self.gram_counts[rows])
+        keep = dice >= self.min_trigram_similarity
+        keys, owners, dice = keys[keep], owners[keep], dice[keep]
+
+        # Best ``max_candidates`` per query: rank within each query's group
+        order = np.lexsort((-dice, owners))
+        keys, owners = keys[order], owners[order]
+        rank = np.arange(len(owners)) - np.searchsorted(owners, owners)
+        keys = keys[rank < self.max_candidates]
+
+        # Phonetic neighbours catch spellings that share few trigrams
+        sound_queries, sound_rows, needed = [], [], []
+        for number, query in enumerate(queries):
+            sounds = {soundex(token) for token in query.split()}
+            needed.append(len(sounds))
+            for sound in sounds:
+                posting = self.phonetic.get(sound)
+                if posting is not None:
+                    sound_rows.append(posting)
+                    sound_queries.append(np.full(len(posting), number, dtype=np.int64))
+        if sound_rows:
+            sound_keys, votes = np.unique(np.concatenate(sound_queries) * size + np.concatenate(sound_rows),
+                                          return_counts=True)
+            needed = np.array(needed)[sound_keys // size]
+            keys = np.union1d(keys, sound_keys[votes * 2 >= needed + (needed > 1)])
+        return keys // size, keys % size
+
+    def score(self, queries: Sequence[str], compacts: Sequence[str], pair_queries: np.ndarray,
+              pair_rows: np.ndarray) -> np.ndarray:
+        """
+        Similarity (1 - distance / longer length) per pair, the better of
+        the token-sorted and the compact written-order comparison
+        """
+        best = np.zeros(len(pair_queries))
+        if not len(pair_queries):
+            return best
+        for names, codes, lengths in ((queries, self.codes, self.lengths),
+                                      (compacts, self.compact_codes, self.compact_lengths)):
+            query_codes, query_lengths = _encode(names)
+            distances = edit_distances(query_codes, query_lengths, pair_queries,
+                                       codes[pair_rows], lengths[pair_rows])
+            longer = np.maximum(np.maximum(query_lengths[pair_queries], lengths[pair_rows]), 1)
+            best = np.maximum(best, 1.0 - distances / longer)
+        return best
+
+class SanctionsScreener:
+    """
+    Screens names against a list file, reloading it when the file changes
+    The file is re-checked at most every ``check_interval`` seconds. A new
+    index is built off to the side and swapped in whole, so screening never
+    sees a half-loaded list, and a bad update keeps the previous list live.
+    """
+
+    def __init__(self, list_path: str, threshold: float = 0.85, check_interval: float = 30.0,
+                 **index_options):
+        self.list_path = list_path
+        self.threshold = threshold
+        self.check_interval = check_interval
+        self.index_options = index_options
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked = 0.0
+        self.index = self._load()
+
+    def _load(self) -> ScreeningIndex:
+        stat = os.stat(self.list_path)
+        data = Path(self.list_path).read_bytes()
+        version = hashlib.sha256(data).hexdigest()[:16]
+        start = time.perf_counter()
+        index = ScreeningIndex(load_list(self.list_path), version, **self.index_options)
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        self.logger.info(f"Loaded {len(index.entries)} list entries ({len(index)} names, version {version}) "
+                         f"in {time.perf_counter() - start:.2f}s")
+        return index
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        """Rebuild the index if the list file changed on disk; True when it was swapped"""
+        now = time.monotonic()
+        if not force and now - self._checked < self.check_interval:
+            return False
+        with self._lock:
+            self._checked = now
+            try:
+                stat = os.stat(self.list_path)
+                if not force and (stat.st_mtime_ns, stat.st_size) == self._stat:
+                    return False
+                self.index = self._load()
+                return True
+            except (OSError, ValueError, csv.Error) as e:
+                self.logger.error(f"Sanctions list reload failed, keeping version {self.index.version}: {str(e)}")
+                return False
+
+    def screen(self, name: str) -> ScreeningResult:
+        return self.screen_many([name])[0]
+
+    def screen_many(self, names: Iterable[str]) -> List[ScreeningResult]:
+        """Screen a batch of names; all candidate pairs are scored in one vectorised pass"""
+        self.reload_if_changed()
+        index = self.index
+        names = list(names)
+        queries = [normalize_name(name) for name in names]
+        pair_queries, pair_rows = index.candidate_pairs(queries)
+        similarity = index.score(queries, [compact_name(name) for name in names], pair_queries, pair_rows)
+
+        # Only pairs over the threshold reach Python; keep each entry's best alias
+        hit = similarity >= self.threshold
+        best: List[Dict[int, ScreeningMatch]] = [{} for _ in names]
+        for number, row, score in zip(pair_queries[hit].tolist(), pair_rows[hit].tolist(), similarity[hit].tolist()):
+            owner = int(index.owners[row])
+            if owner not in best[number] or score > best[number][owner].score:
+                best[number][owner] = ScreeningMatch(index.entries[owner], index.originals[row], round(score, 4))
+        results = []
+        for name, query, found in zip(names, queries, best):
+            for owner, original in index.exact.get(exact_key(name), ()):
+                found[owner] = ScreeningMatch(index.entries[owner], original, 1.0)
+            matches = sorted(found.values(), key=lambda match: -match.score)
+            status = HIT if matches else CLEAR if query else UNSCREENABLE
+            results.append(ScreeningResult(name, status, matches, index.version))
+        return results
+
+# Extracted fields that hold a person or business name
+_NAME_FIELD = re.compile(r"(^|_)(name|owner|owners|director|officer|signatory|beneficiary)(_|$)")
+
+def names_from_extraction(extracted: Dict) -> List[str]:
+    """Distinct name values from DocumentProcessingAgent extracted_data, in field order"""
+    names = []
+    for key, value in extracted.items():
+        if not _NAME_FIELD.search(key.lower()):
+            continue
+        for item in value if isinstance(value, (list, tuple)) else [value]:
+            if isinstance(item, str) and item.strip() and item.strip() not in names:
+                names.append(item.strip())
+    return names
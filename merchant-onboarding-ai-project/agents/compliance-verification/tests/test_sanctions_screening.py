@@ -0,0 +1,33 @@
+import csv
+
+import pytest
+
+from sanctions_screening import CLEAR, HIT, UNSCREENABLE, SanctionsScreener, normalize_name
+
+@pytest.fixture
+def screener(tmp_path):
+    path = tmp_path / "list.csv"
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "name", "aliases", "type"])
+        writer.writerow(["1", "Miron Volkov", "Мирон Волков;Мирон", "individual"])
+        writer.writerow(["2", "Golden Crescent Trading LLC", "الهلال الذهبي", "entity"])
+    return SanctionsScreener(str(path))
+
+def test_cyrillic_names_are_transliterated():
+    assert normalize_name("Мирон Волков") == normalize_name("Miron Volkov") == "MIRON VOLKOV"
+
+def test_non_latin_aliases_match(screener):
+    cyrillic, arabic = screener.screen_many(["Мирон", "الهلال الذهبي"])
+
+    assert cyrillic.status == HIT
+    assert [match.entry.entry_id for match in cyrillic.matches] == ["1"]
+    assert arabic.status == HIT
+    assert arabic.matches[0].entry.entry_id == "2" and arabic.matches[0].score == 1.0
+
+def test_name_that_normalises_to_nothing_is_not_cleared(screener):
+    unknown, punctuation, unrelated = screener.screen_many(["李小龍", "---", "Jane Doe"])
+
+    assert unknown.status == UNSCREENABLE and not unknown.matches
+    assert punctuation.status == UNSCREENABLE
+    assert unrelated.status == CLEAR
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Document Pipeline Benchmark
+Replays the sample document corpus (plus synthetic variants) through
+DocumentProcessingAgent and reports throughput, latency percentiles and
+peak memory as JSON that can be diffed between releases
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from document_processor import DocumentProcessingAgent
+
+REPO_ROOT = Path(__file__).resolve().parents[4]
+DEFAULT_CORPUS = REPO_ROOT / "prototype" / "sample_documents"
+DOCUMENT_EXTENSIONS = {".png", ".jpg", ".jpeg", ".pdf", ".txt"}
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank p50/p95/p99 (seconds)"""
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(values)
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))]
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99)}
+
+def peak_rss_mb() -> float:
+    """High-water RSS so far of this process plus reaped children (pool workers)"""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round((own + children) / scale, 1)
+
+def load_corpus(corpus_dir: Path) -> List[Path]:
+    documents = sorted(p for p in corpus_dir.iterdir() if p.suffix.lower() in DOCUMENT_EXTENSIONS)
+    if not documents:
+        raise SystemExit(f"No documents found in {corpus_dir}")
+    return documents
+
+def materialize_documents(corpus: List[Path], count: int, work_dir: Path) -> List[str]:
+    """
+    Build ``count`` documents by cycling through the corpus. Every copy after
+    the first pass gets a unique trailer after the end of the file (ignored by
+    PDF/PNG/JPEG readers), so variants don't collapse onto one cache entry.
+    """
+    paths = []
+    for i in range(count):
+        source = corpus[i % len(corpus)]
+        if i < len(corpus):
+            paths.append(str(source))
+            continue
+        variant = work_dir / f"{source.stem}_{i:06d}{source.suffix}"
+        variant.write_bytes(source.read_bytes() + f"\n%variant {i}\n".encode("ascii"))
+        paths.append(str(variant))
+    return paths
+
+async def run_scenario(config: Dict, paths: List[str], concurrency: int) -> Dict:
+    agent = DocumentProcessingAgent(dict(config, batch_concurrency=concurrency))
+    await agent.start()
+
+    latencies = []
+    by_type = defaultdict(list)
+    stage_wall = defaultdict(list)
+    stage_cpu = defaultdict(list)
+
+    try:
+        start = time.perf_counter()
+        async for result in agent.process_batch(paths, merchant_id="benchmark"):
+            latencies.append(result.processing_time)
+            by_type[result.document_type.value].append(result.processing_time)
+            for stage, timing in result.stage_timings.items():
+                stage_wall[stage].append(timing.wall_time)
+                stage_cpu[stage].append(timing.cpu_time)
+        elapsed = time.perf_counter() - start
+    finally:
+        agent.close()
+
+    formats = Counter(Path(path).suffix.lower().lstrip(".") for path in paths)
+
+    return {
+        "documents": len(paths),
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 4),
+        "docs_per_sec": round(len(paths) / elapsed, 2) if elapsed else 0.0,
+        "latency": percentiles(latencies),
+        "stages": {
+            stage: {"wall": percentiles(stage_wall[stage]), "cpu": percentiles(stage_cpu[stage])}
+            for stage in sorted(stage_wall)
+        },
+        "document_types": {doc_type: dict(percentiles(values), count=len(values))
+                           for doc_type, values in sorted(by_type.items())},
+        "formats": dict(sorted(formats.items())),
+        "cache": agent.cache_stats(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return human-readable regressions beyond ``tolerance`` (fractional)"""
+    regressions = []
+    previous = {(run["documents"], run["concurrency"]): run for run in baseline.get("runs", [])}
+    for run in report["runs"]:
+        old = previous.get((run["documents"], run["concurrency"]))
+        if old is None:
+            continue
+        label = f"{run['documents']} docs @ concurrency {run['concurrency']}"
+        if old["docs_per_sec"] and run["docs_per_sec"] < old["docs_per_sec"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {old['docs_per_sec']} -> {run['docs_per_sec']} docs/sec")
+        if old["latency"]["p99"] and run["latency"]["p99"] > old["latency"]["p99"] * (1 + tolerance):
+            regressions.append(f"{label}: p99 latency {old['latency']['p99']:.4f}s -> {run['latency']['p99']:.4f}s")
+        for stage, stats in run["stages"].items():
+            old_p99 = old.get("stages", {}).get(stage, {}).get("wall", {}).get("p99")
+            if old_p99 and stats["wall"]["p99"] > old_p99 * (1 + tolerance):
+                regressions.append(f"{label}: stage {stage} p99 {old_p99:.4f}s -> {stats['wall']['p99']:.4f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="Directory of sample documents")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100, 10000],
+                        help="Document counts to benchmark")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8], help="batch_concurrency values")
+    parser.add_argument("--stage-workers", type=json.loads, default={},
+                        help='Process pool size per stage as JSON, e.g. \'{"extract": 8}\'')
+    parser.add_argument("--result-cache", action="store_true", help="Enable the (in-memory) result cache")
+    parser.add_argument("--result-store", action="store_true", help="Enable the (in-memory) result store")
+    parser.add_argument("--page-index", action="store_true", help="Enable the (in-memory) page-hash index")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    parser.add_argument("--baseline", type=Path, help="Previous JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression (fraction)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    config = {
+        "stage_workers": args.stage_workers,
+        # Every layer that can answer without processing is off unless asked
+        # for, so the default numbers measure the pipeline itself
+        "result_cache": {"enabled": args.result_cache},
+        "result_store": {"enabled": args.result_store},
+        "page_index": {"enabled": args.page_index},
+    }
+
+    report = {
+        "benchmark": "document_pipeline",
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {"path": str(args.corpus), "documents": len(corpus)},
+        "config": config,
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="docbench_") as work_dir:
+        for count in args.scale:
+            paths = materialize_documents(corpus, count, Path(work_dir))
+            for concurrency in args.concurrency:
+                run = asyncio.run(run_scenario(config, paths, concurrency))
+                report["runs"].append(run)
+                print(f"{count:>6} docs  concurrency {concurrency:>3}  "
+                      f"{run['docs_per_sec']:>10.1f} docs/sec  "
+                      f"p50 {run['latency']['p50'] * 1000:.2f}ms  "
+                      f"p99 {run['latency']['p99'] * 1000:.2f}ms  "
+                      f"rss {run['peak_rss_mb']}MB")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True))
+        print(f"Wrote report: {args.output}")
+
+    if args.baseline:
+        regressions = compare_to_baseline(report, json.loads(args.baseline.read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
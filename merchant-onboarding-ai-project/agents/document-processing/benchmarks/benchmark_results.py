@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Processing Result Memory Benchmark
+Loads synthetic ProcessingResults as the dataclass, as CompactResult and
+as a columnar ResultBatch, and reports retained bytes per result plus
+JSON vs binary (de)serialisation throughput as JSON
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from compact_results import CompactResult, ResultBatch, pack_result, pack_results, unpack_result, unpack_results
+from document_processor import (REUSED_DOCUMENT, BUILTIN_STAGES, DocumentType, ProcessingResult,
+                                _deserialize_result, _serialize_result)
+from pipeline import StageTiming
+from result_store import document_id
+
+def synthetic_fields(doc_type: DocumentType, rng: random.Random, transactions: int) -> Dict:
+    """Extracted fields shaped like the extractors' output for each type"""
+    company = f"{rng.choice(['TechFlow', 'Northwind', 'Blue Harbor', 'Summit'])} {rng.randint(1, 9999)} LLC"
+    date = f"March {rng.randint(1, 28)}, 2024"
+    money = lambda: f"${rng.randint(1000, 2000000):,}"
+    if doc_type is DocumentType.BANK_STATEMENT:
+        balances = [round(rng.uniform(-500, 90000), 2) for _ in range(transactions)]
+        return {
+            "account_name": company, "account_number": f"****-{rng.randint(1000, 9999)}",
+            "statement_period": "February 1, 2024 - February 29, 2024", "total_deposits": money(),
+            "phone": "1-800-555-0100", "opening_balance": round(rng.uniform(0, 90000), 2),
+            "period_start": "2024-02-01", "period_end": "2024-02-29",
+            "transactions": {
+                "date": [f"2024-02-{day % 28 + 1:02d}" for day in range(transactions)],
+                "description": [rng.choice(["ACH DEPOSIT STRIPE", "POS PURCHASE", "WIRE IN"]) for _ in balances],
+                "amount": [round(rng.uniform(-5000, 9000), 2) for _ in balances],
+                "balance": balances,
+            },
+            "cash_flow": {
+                "transaction_count": transactions, "period_days": 29,
+                "average_daily_balance": round(rng.uniform(0, 90000), 2),
+                "minimum_daily_balance": round(rng.uniform(-500, 40000), 2),
+                "negative_balance_days": rng.randint(0, 3), "nsf_count": rng.randint(0, 2),
+                "total_deposits": round(rng.uniform(0, 200000), 2), "total_withdrawals": round(rng.uniform(0, 200000), 2),
+                "deposit_count": rng.randint(1, 40), "deposits_per_month": float(rng.randint(1, 40)),
+                "deposit_amount_per_month": round(rng.uniform(0, 200000), 2),
+                "mean_days_between_deposits": round(rng.uniform(0.5, 10), 1),
+                "monthly_deposits": {"2024-02": round(rng.uniform(0, 200000), 2)},
+                "revenue_cv": None, "peak_month_ratio": 1.0,
+            },
+        }
+    if doc_type is DocumentType.BUSINESS_LICENSE:
+        return {
+            "license_number": f"BL-2024-{rng.randint(100000, 999999)}", "issue_date": date,
+            "expiration_date": date.replace("2024", "2025"), "business_name": company,
+            "business_type": "Limited Liability Company", "federal_ein": f"87-{rng.randint(1000000, 9999999)}",
+            "phone": "(415) 555-0123", "issued_by": "Department of Consumer Affairs",
+        }
+    if doc_type is DocumentType.TAX_RETURN:
+        return {
+            "name": company, "ein": f"87-{rng.randint(1000000, 9999999)}", "address": "1247 Innovation Drive",
+            "business_code": "541511", "gross_receipts_or_sales": money(), "net_sales": money(),
+            "ordinary_business_income": money(), "total_assets": money(), "total_liabilities": money(),
+            "prepared_by": "Martinez & Associates CPA", "date": date,
+        }
+    if doc_type is DocumentType.ID_DOCUMENT:
+        return {
+            "name": rng.choice(["Sarah Chen", "Michael Rodriguez", "Jennifer Kim"]), "date_of_birth": "01/02/1985",
+            "document_number": f"D{rng.randint(1000000, 9999999)}", "expiration_date": date,
+            "address": "1247 Innovation Drive",
+        }
+    return {"name": company, "period": "FY2023", "total_assets": money(), "total_liabilities": money(),
+            "net_income": money(), "revenue": money()}
+
+def synthetic_payloads(count: int, transactions: int, seed: int) -> List[str]:
+    """Results serialised as the result cache/store do, so nothing is shared with the loaded objects"""
+    rng = random.Random(seed)
+    payloads = []
+    for number in range(count):
+        doc_type = rng.choice(list(DocumentType))
+        payloads.append(_serialize_result(ProcessingResult(
+            document_id=document_id(f"merchant{number // 8}", doc_type.value, f"{rng.getrandbits(256):064x}"),
+            document_type=doc_type,
+            extracted_data=synthetic_fields(doc_type, rng, transactions),
+            confidence_score=rng.random(),
+            fraud_indicators=[REUSED_DOCUMENT] if rng.random() < 0.05 else [],
+            quality_score=rng.random(),
+            processing_time=rng.uniform(0.01, 2.0),
+            stage_timings={stage: StageTiming(rng.random(), rng.random()) for stage in BUILTIN_STAGES},
+        )))
+    return payloads
+
+def retained_bytes(build: Callable[[], object]) -> int:
+    """Bytes still allocated once ``build`` returns, i.e. held by its result"""
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del held
+    return size
+
+def rate(func: Callable, items: List, repeat: int = 3) -> float:
+    """Best-of-``repeat`` items/sec for calling ``func`` on every item"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return round(len(items) / best, 1)
+
+def run(count: int, transactions: int, seed: int) -> Dict:
+    payloads = synthetic_payloads(count, transactions, seed)
+    results = [_deserialize_result(payload) for payload in payloads]
+    compacts = [CompactResult.from_result(result) for result in results]
+    blobs = [pack_result(compact) for compact in compacts]
+    assert all(unpack_result(blob) == compact for blob, compact in zip(blobs, compacts))
+    assert all(compact.extracted_data == result.extracted_data for compact, result in zip(compacts, results))
+    shard = pack_results(compacts)
+    timed_shard = pack_results(CompactResult.from_result(result, keep_timings=True) for result in results)
+
+    memory = {
+        "dataclass": retained_bytes(lambda: [_deserialize_result(payload) for payload in payloads]),
+        "compact": retained_bytes(lambda: list(unpack_results(shard))),
+        "compact_with_timings": retained_bytes(lambda: list(unpack_results(timed_shard))),
+        "columnar": retained_bytes(lambda: ResultBatch.from_results(unpack_results(shard))),
+    }
+    return {
+        "results": count,
+        "transactions_per_statement": transactions,
+        "bytes_per_result": {name: round(size / count) for name, size in memory.items()},
+        "encoded_bytes_per_result": {
+            "json": round(sum(len(payload.encode("utf-8")) for payload in payloads) / count),
+            "binary": round(len(shard) / count),
+        },
+        "serialize_per_sec": {
+            "json": rate(_serialize_result, results),
+            "binary": rate(pack_result, compacts),
+            "binary_from_dataclass": rate(lambda result: pack_result(CompactResult.from_result(result)), results),
+        },
+        "deserialize_per_sec": {
+            "json": rate(_deserialize_result, payloads),
+            "binary": rate(unpack_result, blobs),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--results", type=int, default=50000, help="Synthetic results to load")
+    parser.add_argument("--transactions", type=int, default=40,
+                        help="Transaction rows per bank statement (kept in the free-form extra dict)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "processing_results",
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "run": run(args.results, args.transactions, args.seed),
+    }
+    result = report["run"]
+    memory, serialize, deserialize = result["bytes_per_result"], result["serialize_per_sec"], result["deserialize_per_sec"]
+    print(f"{result['results']} results  bytes/result: dataclass {memory['dataclass']}  compact {memory['compact']}  "
+          f"columnar {memory['columnar']}")
+    print(f"serialize/sec: json {serialize['json']:.0f}  binary {serialize['binary']:.0f}  "
+          f"deserialize/sec: json {deserialize['json']:.0f}  binary {deserialize['binary']:.0f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, sort_keys=True))
+        print(f"Wrote report: {args.output}")
+
+if __name__ == "__main__":
+    main()
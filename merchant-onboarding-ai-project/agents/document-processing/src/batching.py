@@ -0,0 +1,89 @@
+"""
+Dynamic Micro-Batching
+Collects single-item model requests from concurrent documents into one
+batched call
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, Set, Tuple, TypeVar
+import logging
+
+from pipeline import record_cpu_time
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Runs one batch; returns per-item results plus the CPU seconds the batch took
+BatchFunc = Callable[[List[T]], Awaitable[Tuple[List[R], float]]]
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Batches concurrent ``submit`` calls
+    A batch is dispatched once ``max_batch_size`` items are queued or the
+    oldest item has waited ``max_wait_ms``, whichever comes first. Larger
+    values trade per-document latency for throughput; a batch size of 1
+    disables batching. The batch's CPU time is split evenly across callers.
+    """
+
+    def __init__(self, run_batch: BatchFunc, max_batch_size: int = 1, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.logger = logging.getLogger(__name__)
+        self._queue: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # In-flight dispatches; the event loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.append((item, future))
+
+        if len(self._queue) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        result, cpu_share = await future
+        record_cpu_time(cpu_share)
+        return result
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue[:self.max_batch_size], self._queue[self.max_batch_size:]
+        if batch:
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self._queue:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+    async def _dispatch(self, batch: List[Tuple[T, asyncio.Future]]):
+        # Callers cancelled while queued may already have released their inputs
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            results, cpu_time = await self.run_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch of {len(batch)} returned {len(results)} results")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            self.logger.error(f"Batch of {len(batch)} failed: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        cpu_share = cpu_time / len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, cpu_share))
@@ -0,0 +1,443 @@
+"""
+Document Processing Compact Results
+Slotted, schema-typed form of ProcessingResult for jobs that hold millions
+of results in memory, plus a columnar batch form for analytics and a
+struct-based binary encoding
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import json
+import struct
+import sys
+import threading
+
+import numpy as np
+
+from document_processor import REUSED_DOCUMENT, DocumentType, ProcessingResult
+from pipeline import StageTiming
+
+# Typed fields per document type, in storage order. A dotted path names a
+# key inside a nested dict (e.g. the bank statement's cash_flow features).
+# Extracted values of any other key, or of the wrong type, are kept in the
+# result's free-form ``extra`` dict, so conversion is lossless either way.
+FIELD_SCHEMAS: Dict[DocumentType, Tuple[Tuple[str, type], ...]] = {
+    DocumentType.BUSINESS_LICENSE: (
+        ("business_name", str), ("dba", str), ("business_type", str), ("license_number", str),
+        ("federal_ein", str), ("issue_date", str), ("expiration_date", str), ("issued_by", str),
+    ),
+    DocumentType.BANK_STATEMENT: (
+        ("account_name", str), ("account_number", str), ("statement_period", str),
+        ("period_start", str), ("period_end", str), ("opening_balance", float),
+        ("cash_flow.transaction_count", int), ("cash_flow.period_days", int),
+        ("cash_flow.average_daily_balance", float), ("cash_flow.minimum_daily_balance", float),
+        ("cash_flow.negative_balance_days", int), ("cash_flow.nsf_count", int),
+        ("cash_flow.total_deposits", float), ("cash_flow.total_withdrawals", float),
+        ("cash_flow.deposit_count", int), ("cash_flow.deposits_per_month", float),
+        ("cash_flow.deposit_amount_per_month", float), ("cash_flow.mean_days_between_deposits", float),
+        ("cash_flow.revenue_cv", float), ("cash_flow.peak_month_ratio", float),
+    ),
+    DocumentType.TAX_RETURN: (
+        ("name", str), ("ein", str), ("address", str), ("business_code", str),
+        ("gross_receipts_or_sales", str), ("net_sales", str), ("ordinary_business_income", str),
+        ("total_assets", str), ("total_liabilities", str), ("date", str),
+    ),
+    DocumentType.ID_DOCUMENT: (
+        ("name", str), ("date_of_birth", str), ("document_number", str), ("address", str),
+        ("issue_date", str), ("expiration_date", str),
+    ),
+    DocumentType.FINANCIAL_STATEMENT: (
+        ("name", str), ("period", str), ("total_assets", str), ("total_liabilities", str),
+        ("net_income", str), ("revenue", str),
+    ),
+}
+
+DOCUMENT_TYPES: Tuple[DocumentType, ...] = tuple(DocumentType)
+_TYPE_INDEX = {doc_type: number for number, doc_type in enumerate(DOCUMENT_TYPES)}
+# (parent key, child key or "", type) per schema field
+_PATHS = {
+    doc_type: tuple((*path.partition(".")[::2], kind) for path, kind in schema)
+    for doc_type, schema in FIELD_SCHEMAS.items()
+}
+_MISSING = object()
+
+class IndicatorCodes:
+    """
+    Interned fraud-indicator names, each mapped to one bit of a mask
+    Codes are assigned in first-seen order and are only meaningful inside
+    this process; the binary encoding stores names, not codes. Once all
+    ``MAX_CODES`` bits are taken, further names get no code and results keep
+    them as strings instead (see ``split``).
+    """
+    MAX_CODES = 64
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        for name in names:
+            self.code(name)
+
+    def lookup(self, name: str) -> Optional[int]:
+        """The name's code if it has one; never assigns"""
+        return self._codes.get(name)
+
+    def try_code(self, name: str) -> Optional[int]:
+        """The name's code, assigning one if a bit is free; None once all are taken"""
+        code = self._codes.get(name)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(name)
+                if code is None:
+                    if len(self._names) >= self.MAX_CODES:
+                        return None
+                    code = len(self._names)
+                    self._names.append(sys.intern(name))
+                    self._codes[self._names[code]] = code
+        return code
+
+    def code(self, name: str) -> int:
+        code = self.try_code(name)
+        if code is None:
+            raise ValueError(f"More than {self.MAX_CODES} distinct fraud indicators")
+        return code
+
+    def mask(self, names: Iterable[str]) -> int:
+        mask = 0
+        for name in names:
+            mask |= 1 << self.code(name)
+        return mask
+
+    def split(self, names: Iterable[str]) -> Tuple[int, Optional[Tuple[str, ...]]]:
+        """Mask of the names that have (or get) a code, and the interned rest, if any"""
+        mask, overflow = 0, []
+        for name in names:
+            code = self.try_code(name)
+            if code is None:
+                overflow.append(sys.intern(name))
+            else:
+                mask |= 1 << code
+        return mask, tuple(overflow) or None
+
+    def names(self, mask: int) -> List[str]:
+        """Indicator names set in ``mask``, in code order"""
+        return [name for code, name in enumerate(self._names) if mask >> code & 1]
+
+indicator_codes = IndicatorCodes([REUSED_DOCUMENT])
+
+def _split_fields(doc_type: DocumentType, data: Dict) -> Tuple[Tuple, Optional[Dict]]:
+    """Schema values (None where absent) and whatever else is left over"""
+    paths = _PATHS.get(doc_type, ())
+    if not paths:
+        return (), dict(data) or None
+    extra = dict(data)
+    copied = set()
+    values = []
+    for parent, child, kind in paths:
+        container = extra.get(parent) if child else extra
+        key = child or parent
+        value = container.get(key, _MISSING) if isinstance(container, dict) else _MISSING
+        if type(value) is not kind:
+            values.append(None)
+            continue
+        values.append(value)
+        if child:
+            if parent not in copied:
+                container = extra[parent] = dict(container)
+                copied.add(parent)
+            del container[key]
+        else:
+            del extra[key]
+    # A nested dict emptied into the schema is recreated when expanding
+    for parent in copied:
+        if not extra[parent]:
+            del extra[parent]
+    return tuple(values), extra or None
+
+def _join_fields(doc_type: DocumentType, values: Tuple, extra: Optional[Dict]) -> Dict:
+    data = dict(extra) if extra else {}
+    copied = set()
+    for (parent, child, _), value in zip(_PATHS.get(doc_type, ()), values):
+        if value is None:
+            continue
+        if not child:
+            data[parent] = value
+            continue
+        if parent not in copied:
+            data[parent] = dict(data.get(parent) or {})
+            copied.add(parent)
+        data[parent][child] = value
+    return data
+
+@dataclass(slots=True)
+class CompactResult:
+    """
+    Memory-lean ProcessingResult: no per-instance ``__dict__``, extracted
+    fields as a tuple in FIELD_SCHEMAS order, and fraud indicators as a bit
+    mask over ``indicator_codes`` (plus ``fraud_overflow`` names once its
+    codes run out). Stage outputs, skipped stages and (when kept) stage
+    timings live in ``details``, which is None for most results.
+    """
+    document_id: str
+    document_type: DocumentType
+    values: Tuple
+    extra: Optional[Dict]
+    confidence_score: float
+    quality_score: float
+    processing_time: float
+    fraud_mask: int = 0
+    details: Optional[Dict] = None
+    fraud_overflow: Optional[Tuple[str, ...]] = None
+
+    @classmethod
+    def from_result(cls, result: ProcessingResult, keep_timings: bool = False) -> "CompactResult":
+        """
+        Stage timings are dropped unless ``keep_timings`` is set; they are
+        already exported as metrics and rarely needed when re-reading results
+        """
+        values, extra = _split_fields(result.document_type, result.extracted_data)
+        details = {}
+        if result.stage_outputs:
+            details["stage_outputs"] = result.stage_outputs
+        if result.skipped_stages:
+            details["skipped_stages"] = result.skipped_stages
+        if keep_timings and result.stage_timings:
+            details["stage_timings"] = {name: (timing.wall_time, timing.cpu_time)
+                                        for name, timing in result.stage_timings.items()}
+        fraud_mask, fraud_overflow = indicator_codes.split(result.fraud_indicators)
+        return cls(
+            document_id=sys.intern(result.document_id),
+            document_type=result.document_type,
+            values=values,
+            extra=extra,
+            confidence_score=result.confidence_score,
+            quality_score=result.quality_score,
+            processing_time=result.processing_time,
+            fraud_mask=fraud_mask,
+            details=details or None,
+            fraud_overflow=fraud_overflow,
+        )
+
+    @property
+    def fraud_indicators(self) -> List[str]:
+        return indicator_codes.names(self.fraud_mask) + list(self.fraud_overflow or ())
+
+    @property
+    def extracted_data(self) -> Dict:
+        return _join_fields(self.document_type, self.values, self.extra)
+
+    def field(self, path: str, default=None):
+        """One schema field by (dotted) path, without rebuilding extracted_data"""
+        for (name, _), value in zip(FIELD_SCHEMAS.get(self.document_type, ()), self.values):
+            if name == path:
+                return default if value is None else value
+        return default
+
+    def to_result(self) -> ProcessingResult:
+        details = self.details or {}
+        return ProcessingResult(
+            document_id=self.document_id,
+            document_type=self.document_type,
+            extracted_data=self.extracted_data,
+            confidence_score=self.confidence_score,
+            fraud_indicators=self.fraud_indicators,
+            quality_score=self.quality_score,
+            processing_time=self.processing_time,
+            stage_outputs=dict(details.get("stage_outputs", {})),
+            stage_timings={name: StageTiming(*timing) for name, timing in details.get("stage_timings", {}).items()},
+            skipped_stages=dict(details.get("skipped_stages", {})),
+        )
+
+# Binary record: format version, document type index, indicator count,
+# flags, confidence, quality, processing time, bitmap of present fields;
+# then the length-prefixed document ID and indicator names, the present
+# field values in schema order, and a JSON blob for extra/details if flagged.
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<BBBBdddI")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_F64 = struct.Struct("<d")
+_I64 = struct.Struct("<q")
+_HAS_BLOB = 1
+assert all(len(schema) <= 32 for schema in FIELD_SCHEMAS.values())
+
+def pack_result(result: CompactResult) -> bytes:
+    """Encode one result; raises TypeError if extra or details aren't JSON-serializable"""
+    indicators = [name.encode("utf-8") for name in result.fraud_indicators]
+    present = 0
+    body = []
+    for number, ((_, _, kind), value) in enumerate(zip(_PATHS.get(result.document_type, ()), result.values)):
+        if value is None:
+            continue
+        present |= 1 << number
+        if kind is str:
+            encoded = value.encode("utf-8")
+            body += (_U32.pack(len(encoded)), encoded)
+        elif kind is float:
+            body.append(_F64.pack(value))
+        else:
+            body.append(_I64.pack(value))
+    blob = None
+    if result.extra or result.details:
+        blob = json.dumps([result.extra, result.details], separators=(",", ":")).encode("utf-8")
+        body += (_U32.pack(len(blob)), blob)
+
+    document_id = result.document_id.encode("utf-8")
+    head = [
+        _HEADER.pack(FORMAT_VERSION, _TYPE_INDEX[result.document_type], len(indicators),
+                     _HAS_BLOB if blob is not None else 0, result.confidence_score, result.quality_score,
+                     result.processing_time, present),
+        _U16.pack(len(document_id)), document_id,
+    ]
+    for name in indicators:
+        head += (_U16.pack(len(name)), name)
+    return b"".join(head + body)
+
+def unpack_result(buffer: Union[bytes, memoryview], offset: int = 0) -> CompactResult:
+    return _unpack(buffer, offset)[0]
+
+def _unpack(buffer, offset: int) -> Tuple[CompactResult, int]:
+    version, type_index, indicator_count, flags, confidence, quality, elapsed, present = \
+        _HEADER.unpack_from(buffer, offset)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported result format version {version}")
+    doc_type = DOCUMENT_TYPES[type_index]
+    offset += _HEADER.size
+    (length,) = _U16.unpack_from(buffer, offset)
+    document_id = str(buffer[offset + 2:offset + 2 + length], "utf-8")
+    offset += 2 + length
+    names = []
+    for _ in range(indicator_count):
+        (length,) = _U16.unpack_from(buffer, offset)
+        offset += 2
+        names.append(str(buffer[offset:offset + length], "utf-8"))
+        offset += length
+    mask, overflow = indicator_codes.split(names)
+
+    values = []
+    for number, (_, _, kind) in enumerate(_PATHS.get(doc_type, ())):
+        if not present >> number & 1:
+            values.append(None)
+        elif kind is str:
+            (length,) = _U32.unpack_from(buffer, offset)
+            values.append(str(buffer[offset + 4:offset + 4 + length], "utf-8"))
+            offset += 4 + length
+        elif kind is float:
+            values.append(_F64.unpack_from(buffer, offset)[0])
+            offset += 8
+        else:
+            values.append(_I64.unpack_from(buffer, offset)[0])
+            offset += 8
+    extra = details = None
+    if flags & _HAS_BLOB:
+        (length,) = _U32.unpack_from(buffer, offset)
+        extra, details = json.loads(bytes(buffer[offset + 4:offset + 4 + length]))
+        offset += 4 + length
+    result = CompactResult(sys.intern(document_id), doc_type, tuple(values), extra, confidence, quality, elapsed,
+                           mask, details, overflow)
+    return result, offset
+
+def pack_results(results: Iterable[CompactResult]) -> bytes:
+    """Length-prefixed records, e.g. for one file per reprocessing shard"""
+    parts = []
+    for result in results:
+        record = pack_result(result)
+        parts += (_U32.pack(len(record)), record)
+    return b"".join(parts)
+
+def unpack_results(data: bytes) -> Iterator[CompactResult]:
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        (length,) = _U32.unpack_from(view, offset)
+        result, end = _unpack(view, offset + 4)
+        if end != offset + 4 + length:
+            raise ValueError(f"Corrupt result record at byte {offset}")
+        offset = end
+        yield result
+
+def _columns() -> Dict[str, type]:
+    columns: Dict[str, type] = {}
+    for schema in FIELD_SCHEMAS.values():
+        for path, kind in schema:
+            if columns.setdefault(path, kind) is not kind:
+                columns[path] = object
+    return columns
+
+@dataclass
+class ResultBatch:
+    """
+    Columnar results for analytics: one array per attribute and per schema
+    field path (the union over document types). Numeric fields are float64
+    with NaN where a document lacks them; text fields are object arrays with
+    None. ``document_type`` indexes DOCUMENT_TYPES and ``fraud_mask`` uses
+    ``indicator_codes``; ``fraud_overflow`` holds any uncoded indicator
+    names (None for almost every row). Free-form ``extra`` fields and
+    details are not carried over.
+    """
+    document_id: np.ndarray
+    document_type: np.ndarray
+    confidence_score: np.ndarray
+    quality_score: np.ndarray
+    processing_time: np.ndarray
+    fraud_mask: np.ndarray
+    fields: Dict[str, np.ndarray]
+    fraud_overflow: np.ndarray
+
+    @classmethod
+    def from_results(cls, results: Iterable[Union[CompactResult, ProcessingResult]]) -> "ResultBatch":
+        kinds = _columns()
+        names = list(kinds)
+        slots = {doc_type: [names.index(path) for path, _ in schema] for doc_type, schema in FIELD_SCHEMAS.items()}
+        ids, types, confidence, quality, elapsed, masks, overflow = [], [], [], [], [], [], []
+        rows = []
+        for result in results:
+            if isinstance(result, ProcessingResult):
+                result = CompactResult.from_result(result)
+            ids.append(result.document_id)
+            types.append(_TYPE_INDEX[result.document_type])
+            confidence.append(result.confidence_score)
+            quality.append(result.quality_score)
+            elapsed.append(result.processing_time)
+            masks.append(result.fraud_mask)
+            overflow.append(result.fraud_overflow)
+            rows.append((slots.get(result.document_type, ()), result.values))
+
+        fields = {
+            name: np.full(len(rows), np.nan) if kinds[name] in (int, float) else np.full(len(rows), None, dtype=object)
+            for name in names
+        }
+        columns = [fields[name] for name in names]
+        for row, (indices, values) in enumerate(rows):
+            for index, value in zip(indices, values):
+                if value is not None:
+                    columns[index][row] = value
+        overflow_column = np.full(len(rows), None, dtype=object)
+        for row, names in enumerate(overflow):
+            if names:
+                overflow_column[row] = names
+        return cls(
+            document_id=np.array(ids, dtype=object),
+            document_type=np.array(types, dtype=np.uint8),
+            confidence_score=np.array(confidence, dtype=np.float64),
+            quality_score=np.array(quality, dtype=np.float64),
+            processing_time=np.array(elapsed, dtype=np.float64),
+            fraud_mask=np.array(masks, dtype=np.uint64),
+            fields=fields,
+            fraud_overflow=overflow_column,
+        )
+
+    def __len__(self) -> int:
+        return len(self.document_id)
+
+    def of_type(self, doc_type: DocumentType) -> np.ndarray:
+        """Boolean row mask for one document type"""
+        return self.document_type == _TYPE_INDEX[doc_type]
+
+    def with_indicator(self, name: str) -> np.ndarray:
+        """Boolean row mask for results carrying a fraud indicator"""
+        # A name without a code is either unknown or one of the overflow strings
+        code = indicator_codes.lookup(name)
+        if code is not None:
+            return (self.fraud_mask & np.uint64(1 << code)) != 0
+        return np.array([name in (names or ()) for names in self.fraud_overflow], dtype=bool)
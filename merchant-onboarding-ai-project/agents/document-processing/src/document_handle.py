@@ -0,0 +1,208 @@
+"""
+Document Handle
+Opens an uploaded document once, memory-maps it, and streams decoded pages
+lazily to every pipeline stage
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple, Union
+import hashlib
+import mmap
+import re
+
+from formats import SNIFF_BYTES, PdfTextLayer, UnsupportedDocumentError, is_text_layer, sniff_kind
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+try:
+    import pypdfium2
+except ImportError:  # optional dependency
+    pypdfium2 = None
+
+@dataclass
+class Page:
+    """
+    One decoded page.
+    ``kind`` is "text" (``buffer`` holds UTF-8 text, from a text file or a
+    PDF page's text layer), "image" (``buffer`` holds raw pixels described
+    by ``mode`` and ``size``) or "pdf" (``buffer`` is the handle's memory
+    map of the whole undecoded PDF, not a copy, used when it has no readable
+    text layer and no PDF renderer is installed). Only "image" and "pdf"
+    pages need OCR.
+    """
+    number: int
+    kind: str
+    buffer: bytes
+    mode: Optional[str] = None
+    size: Optional[Tuple[int, int]] = None
+
+class DocumentHandle:
+    """
+    Shared, read-only view of one document
+    The file is opened and memory-mapped once. ``data`` exposes the raw bytes
+    without copying; pages are decoded on demand and at most ``page_window``
+    decoded pages are held at a time, so memory is bounded by the window
+    rather than by document size.
+    """
+
+    def __init__(self, path: str, page_window: int = 4):
+        if page_window < 1:
+            raise ValueError("page_window must be at least 1")
+        self.path = path
+        self.page_window = page_window
+        self._file = open(path, "rb")
+        try:
+            self._mmap: Union[mmap.mmap, bytes] = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self._mmap = b""
+        self._pages: "OrderedDict[int, Page]" = OrderedDict()
+        self._content_hash: Optional[str] = None
+        self._text_offsets: Optional[List[Tuple[int, int]]] = None
+        self._pdf = None
+        self._text_layer: Union[PdfTextLayer, bool, None] = None
+        self._page_count: Optional[int] = None
+        self.kind = self._detect_kind()
+        if self.kind == "unknown":
+            self.close()
+            raise UnsupportedDocumentError(f"Unsupported document format: {path}")
+
+    @property
+    def data(self) -> Union[mmap.mmap, bytes]:
+        """Raw document bytes (buffer protocol, zero-copy)"""
+        return self._mmap
+
+    @property
+    def size(self) -> int:
+        return len(self._mmap)
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the raw bytes, computed once in 1 MiB chunks"""
+        if self._content_hash is None:
+            digest = hashlib.sha256()
+            for offset in range(0, len(self._mmap), 1 << 20):
+                digest.update(self._mmap[offset:offset + (1 << 20)])
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    def _detect_kind(self) -> str:
+        return sniff_kind(self._mmap[:SNIFF_BYTES])
+
+    @property
+    def page_count(self) -> int:
+        if self._page_count is None:
+            if self.kind == "text":
+                self._page_count = len(self._text_page_offsets())
+            elif self.kind == "image":
+                with self._open_image() as image:
+                    self._page_count = getattr(image, "n_frames", 1)
+            elif pypdfium2 is not None:
+                self._page_count = len(self._pdf_document())
+            else:
+                layer = self._builtin_text_layer()
+                self._page_count = len(layer) if layer else 1
+        return self._page_count
+
+    def page(self, number: int) -> Page:
+        """Decode (or reuse) page ``number``, evicting the oldest beyond the window"""
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+
+        page = self._decode_page(number)
+        self._pages[number] = page
+        while len(self._pages) > self.page_window:
+            self._pages.popitem(last=False)
+        return page
+
+    def iter_pages(self) -> Iterator[Page]:
+        for number in range(self.page_count):
+            yield self.page(number)
+
+    def _decode_page(self, number: int) -> Page:
+        if self.kind == "text":
+            start, end = self._text_page_offsets()[number]
+            return Page(number, "text", self._mmap[start:end])
+
+        if self.kind == "image":
+            with self._open_image() as image:
+                image.seek(number)
+                frame = image.convert("RGB") if image.mode not in ("RGB", "L") else image.copy()
+            return Page(number, "image", frame.tobytes(), frame.mode, frame.size)
+
+        # Pages with a real text layer skip rendering and OCR altogether
+        if pypdfium2 is None:
+            layer = self._builtin_text_layer()
+            if layer is not None:
+                return Page(number, "text", layer.page_text(number).encode("utf-8"))
+            return Page(number, "pdf", self._mmap)
+        pdf_page = self._pdf_document()[number]
+        try:
+            textpage = pdf_page.get_textpage()
+            try:
+                text = textpage.get_text_range()
+            finally:
+                textpage.close()
+            if is_text_layer(text):
+                return Page(number, "text", text.encode("utf-8"))
+            rendered = pdf_page.render(scale=200 / 72).to_pil()
+        finally:
+            pdf_page.close()
+        return Page(number, "image", rendered.tobytes(), rendered.mode, rendered.size)
+
+    def _text_page_offsets(self) -> List[Tuple[int, int]]:
+        """Page boundaries of a text document, split on form feeds"""
+        if self._text_offsets is None:
+            offsets, start = [], 0
+            for match in re.finditer(rb"\f", self._mmap):
+                offsets.append((start, match.start()))
+                start = match.end()
+            offsets.append((start, len(self._mmap)))
+            self._text_offsets = offsets
+        return self._text_offsets
+
+    def _builtin_text_layer(self) -> Optional[PdfTextLayer]:
+        """
+        The built-in reader's text layer over the mapped file, or None unless
+        every page has a usable one (then the whole PDF goes to OCR as one
+        page). The check decodes one page at a time and keeps none of them;
+        pages are decoded again, per window, as they are read.
+        """
+        if self._text_layer is None:
+            layer = PdfTextLayer.open(self._mmap)
+            usable = bool(layer) and all(is_text_layer(layer.page_text(n)) for n in range(len(layer)))
+            self._text_layer = layer if usable else False
+        return self._text_layer or None
+
+    def _open_image(self):
+        if Image is None:
+            raise ImportError("Decoding image documents requires Pillow")
+        # PIL reads lazily through the mmap's file interface
+        self._mmap.seek(0)
+        return Image.open(self._mmap)
+
+    def _pdf_document(self):
+        if self._pdf is None:
+            self._pdf = pypdfium2.PdfDocument(self.path)
+        return self._pdf
+
+    def close(self):
+        self._pages.clear()
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> "DocumentHandle":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
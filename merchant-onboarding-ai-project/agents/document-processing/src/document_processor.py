@@ -4,10 +4,25 @@ Handles OCR, classification, fraud detection, and data extraction
 """
 
 import asyncio
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field, replace
 from enum import Enum
+from functools import partial
+import json
 import logging
+import sys
+import time
+
+import kernels
+from document_handle import DocumentHandle
+from batching import MicroBatcher
+from executors import StageExecutor
+from extractors import configure_extractors
+from metrics import MetricsSink
+from page_index import PageFingerprint, PageHashIndex
+from pipeline import ShortCircuitPolicy, Stage, StageGraph, StageTiming
+from result_cache import ResultCache
+from result_store import ResultStore, document_id
 
 class DocumentType(Enum):
     BUSINESS_LICENSE = "business_license"
@@ -16,7 +31,7 @@ class DocumentType(Enum):
     ID_DOCUMENT = "id_document"
     FINANCIAL_STATEMENT = "financial_statement"
 
-@dataclass
+@dataclass(slots=True)
 class ProcessingResult:
     document_id: str
     document_type: DocumentType
@@ -25,6 +40,70 @@ class ProcessingResult:
     fraud_indicators: List[str]
     quality_score: float
     processing_time: float
+    stage_outputs: Dict[str, Any] = field(default_factory=dict)
+    stage_timings: Dict[str, StageTiming] = field(default_factory=dict)
+    skipped_stages: Dict[str, str] = field(default_factory=dict)
+
+# Stages whose outputs map onto ProcessingResult fields; anything else
+# registered on the agent is reported under ProcessingResult.stage_outputs
+BUILTIN_STAGES = ("quality", "classify", "tamper", "extract", "fraud", "confidence")
+# Every result needs these outputs, so they can never be short-circuited
+REQUIRED_STAGES = frozenset({"quality", "classify"})
+
+# Fraud indicator for a document (or a near-duplicate of one of its pages)
+# already submitted by a different merchant
+REUSED_DOCUMENT = "reused_document"
+
+@dataclass
+class DocumentShortCircuitPolicy(ShortCircuitPolicy):
+    """
+    Stop spending compute on documents that will be rejected anyway.
+    Triggers when the quality score falls below ``min_quality`` or a stage
+    reports one of ``hard_fraud_indicators``; classification always runs so
+    the result still carries a document type.
+    """
+    min_quality: Optional[float] = None
+    hard_fraud_indicators: FrozenSet[str] = frozenset()
+    skippable: FrozenSet[str] = frozenset({"extract", "fraud", "confidence"})
+    
+    @classmethod
+    def from_config(cls, config: Dict) -> "DocumentShortCircuitPolicy":
+        policy = cls(
+            min_quality=config.get("min_quality"),
+            hard_fraud_indicators=frozenset(config.get("hard_fraud_indicators", ())),
+        )
+        if "skippable" in config:
+            required = REQUIRED_STAGES.intersection(config["skippable"])
+            if required:
+                raise ValueError(f"Stage(s) {', '.join(sorted(required))} can't be skipped: every result needs them")
+            policy.skippable = frozenset(config["skippable"])
+        return policy
+    
+    def fingerprint(self) -> str:
+        """Stable description for cache keys (frozenset reprs vary between runs)"""
+        return f"{self.min_quality}|{','.join(sorted(self.hard_fraud_indicators))}|{','.join(sorted(self.skippable))}"
+    
+    def check(self, stage: str, output: Any) -> Optional[str]:
+        if stage == "quality" and self.min_quality is not None and output < self.min_quality:
+            return f"quality {output:.2f} below {self.min_quality:.2f}"
+        if stage in ("tamper", "fraud"):
+            hard = sorted(self.hard_fraud_indicators.intersection(output))
+            if hard:
+                return f"hard fraud indicator: {', '.join(hard)}"
+        return None
+
+def _serialize_result(result: ProcessingResult) -> str:
+    data = asdict(result)
+    data["document_type"] = result.document_type.value
+    return json.dumps(data)
+
+def _deserialize_result(payload: str) -> ProcessingResult:
+    data = json.loads(payload)
+    data["document_type"] = DocumentType(data["document_type"])
+    # Indicator names repeat across millions of results; share one copy of each
+    data["fraud_indicators"] = [sys.intern(indicator) for indicator in data["fraud_indicators"]]
+    data["stage_timings"] = {name: StageTiming(**timing) for name, timing in data.get("stage_timings", {}).items()}
+    return ProcessingResult(**data)
 
 class DocumentProcessingAgent:
     """
@@ -35,63 +114,398 @@ class DocumentProcessingAgent:
     def __init__(self, config: Dict):
         self.config = config
         self.logger = logging.getLogger(__name__)
-        self.ocr_service = None  # Initialize OCR service
-        self.classifier = None   # Initialize document classifier
-        self.fraud_detector = None  # Initialize fraud detection model
+        # OCR, classifier and fraud models are loaded inside the executor's
+        # workers via config["model_loaders"]; config["stage_workers"] sets
+        # the process-pool size per stage (stages without one run inline).
+        # Extraction models come from the per-type extractor registry:
+        # config["extractors"] maps DocumentType values to "module:Class"
+        # paths, loaded lazily unless listed in config["preload_extractors"].
+        model_loaders = dict(config.get("model_loaders", {}))
+        model_loaders.setdefault("extract", partial(
+            configure_extractors, config.get("extractors", {}), tuple(config.get("preload_extractors", ()))
+        ))
+        self.executor = StageExecutor(
+            pool_sizes=config.get("stage_workers", {}),
+            model_loaders=model_loaders,
+        )
+        # Text pages are extracted and every document's pages merged in this
+        # process with the agent's own registry; the extract pool's workers
+        # each build theirs from the same overrides
+        self.extractors = self.executor.inline_model("extract")
+        # Cross-document micro-batching for classification and fraud scoring,
+        # e.g. {"max_batch_size": 32, "max_wait_ms": 10}; off by default
+        batching = config.get("micro_batching", {})
+        self.classify_batcher = MicroBatcher(
+            lambda documents: self.executor.run_batch("classify", kernels.classify_batch, documents),
+            max_batch_size=batching.get("max_batch_size", 1),
+            max_wait_ms=batching.get("max_wait_ms", 5.0),
+        )
+        self.fraud_batcher = MicroBatcher(
+            lambda items: self.executor.run_batch(
+                "fraud", kernels.detect_fraud_batch, [document for document, _ in items], [data for _, data in items]
+            ),
+            max_batch_size=batching.get("max_batch_size", 1),
+            max_wait_ms=batching.get("max_wait_ms", 5.0),
+        )
+        self.batch_concurrency = config.get("batch_concurrency", 8)
+        # Decoded pages held per document; bounds memory for long PDFs
+        self.page_window = config.get("page_window", 4)
+        self.pipeline = self._build_pipeline()
+        self.metrics = config.get("metrics_sink") or MetricsSink()
+        # e.g. {"min_quality": 0.4, "hard_fraud_indicators": ["edited_pdf_metadata"]}
+        self.short_circuit = DocumentShortCircuitPolicy.from_config(config.get("short_circuit", {}))
+        self.result_cache = self._build_result_cache(config.get("result_cache", {}))
+        self.page_index = self._build_page_index(config.get("page_index", {}))
+        # Only the first pages are fingerprinted; with the default of one page
+        # window they are still decoded when the extract stage reaches them
+        self.fingerprint_pages = config.get("page_index", {}).get("max_pages", self.page_window)
+        self.result_store = self._build_result_store(config.get("result_store", {}))
+        
+    def _build_pipeline(self) -> StageGraph:
+        """
+        Default stage graph. Quality, classification and raw-file tamper
+        checks are independent and run concurrently; extraction waits on
+        classification, fraud on extraction and tamper checks.
+        """
+        return StageGraph([
+            Stage("quality", lambda ctx: self._assess_quality(ctx["document"])),
+            Stage("classify", lambda ctx: self._classify_document(ctx["document"])),
+            Stage("tamper", lambda ctx: self._detect_tampering(ctx["document"])),
+            Stage("extract", lambda ctx: self._extract_data(ctx["document"], ctx["classify"]),
+                  depends_on=("classify",)),
+            Stage("fraud", self._run_fraud_stage, depends_on=("extract", "tamper")),
+            Stage("confidence", lambda ctx: self._calculate_confidence(ctx["quality"], ctx["extract"]),
+                  depends_on=("quality", "extract")),
+        ])
+    
+    def _build_result_cache(self, cache_config: Dict) -> Optional[ResultCache]:
+        """
+        Cache keyed by document content and pipeline version, so a model
+        rollout or stage change never serves results from the old pipeline.
+        Set result_cache.enabled to False to always reprocess.
+        """
+        if not cache_config.get("enabled", True):
+            return None
+        return ResultCache(
+            version=self._cache_version(),
+            serialize=_serialize_result,
+            deserialize=_deserialize_result,
+            memory_entries=cache_config.get("memory_entries", 1024),
+            disk_path=cache_config.get("disk_path"),
+            disk_max_bytes=cache_config.get("disk_max_bytes", 512 * 1024 * 1024),
+        )
+    
+    def _build_page_index(self, index_config: Dict) -> Optional[PageHashIndex]:
+        """
+        Cross-merchant index of page fingerprints in the SQLite file at
+        page_index.path. Off unless a path is set: in memory it would grow
+        with every page processed. page_index.enabled set to True without a
+        path keeps it in memory for tests and short-lived agents.
+        page_index.max_pages bounds the pages fingerprinted per document.
+        """
+        if not index_config.get("enabled", bool(index_config.get("path"))):
+            return None
+        return PageHashIndex(index_config.get("path"), max_distance=index_config.get("max_distance", 5))
+    
+    def _build_result_store(self, store_config: Dict) -> Optional[ResultStore]:
+        """
+        Durable record of every result by stable document ID in the SQLite
+        file at result_store.path. Re-submitting the same bytes for a
+        merchant returns the stored result. Off unless a path is set, as the
+        in-memory store is never pruned; result_store.enabled set to True
+        without a path keeps it in memory for tests and short-lived agents.
+        """
+        if not store_config.get("enabled", bool(store_config.get("path"))):
+            return None
+        return ResultStore(
+            version=self._cache_version(),
+            serialize=_serialize_result,
+            deserialize=_deserialize_result,
+            path=store_config.get("path"),
+        )
+    
+    def _cache_version(self) -> str:
+        stage_names = ",".join(sorted(stage.name for stage in self.pipeline.stages))
+        return f"{self.config.get('model_version', '0')}:{stage_names}:{self.short_circuit.fingerprint()}"
+    
+    def cache_stats(self) -> Dict[str, int]:
+        """Result cache hit/miss counters (empty when caching is disabled)"""
+        return self.result_cache.stats() if self.result_cache else {}
+    
+    async def start(self):
+        """Warm the stage process pools so the first documents don't pay model load time"""
+        await self.executor.start()
+    
+    def stored_results(self, merchant_id: str, doc_type: Optional[DocumentType] = None) -> List[ProcessingResult]:
+        """A merchant's processed documents (optionally of one type) from the result store"""
+        if not self.result_store:
+            return []
+        return self.result_store.by_merchant(merchant_id, doc_type.value if doc_type else None)
+    
+    def close(self):
+        """Shut down the stage process pools and close the result cache, page index and result store"""
+        self.executor.shutdown()
+        if self.result_cache:
+            self.result_cache.close()
+        if self.page_index:
+            self.page_index.close()
+        if self.result_store:
+            self.result_store.close()
+    
+    def add_stage(self, stage: Stage, replace: bool = False):
+        """Plug an additional (or replacement) stage into the pipeline"""
+        candidate = StageGraph(s for s in self.pipeline.stages if s.name != stage.name or not replace)
+        candidate.add_stage(stage)
+        candidate.validate()
+        self.pipeline = candidate
+        if self.result_cache:
+            self.result_cache.version = self._cache_version()
+        if self.result_store:
+            self.result_store.version = self._cache_version()
         
     async def process_document(self, document_path: str, merchant_id: str) -> ProcessingResult:
         """
         Main processing pipeline for uploaded documents
         """
+        start = time.perf_counter()
         try:
-            # Step 1: Quality Assessment
-            quality_score = await self._assess_quality(document_path)
-            
-            # Step 2: Document Classification
-            doc_type = await self._classify_document(document_path)
-            
-            # Step 3: OCR and Data Extraction
-            extracted_data = await self._extract_data(document_path, doc_type)
-            
-            # Step 4: Fraud Detection
-            fraud_indicators = await self._detect_fraud(document_path, extracted_data)
-            
-            # Step 5: Confidence Scoring
-            confidence = await self._calculate_confidence(quality_score, extracted_data)
-            
-            return ProcessingResult(
-                document_id=f"{merchant_id}_{doc_type.value}",
-                document_type=doc_type,
-                extracted_data=extracted_data,
-                confidence_score=confidence,
-                fraud_indicators=fraud_indicators,
-                quality_score=quality_score,
-                processing_time=0.0  # Calculate actual time
-            )
-            
+            with DocumentHandle(document_path, page_window=self.page_window) as document:
+                return await self._process_handle(document, merchant_id, start)
         except Exception as e:
+            self.metrics.increment("documents_total", labels={"document_type": "unknown", "outcome": "failed"})
             self.logger.error(f"Document processing failed: {str(e)}")
             raise
     
-    async def _assess_quality(self, document_path: str) -> float:
+    async def _process_handle(self, document: DocumentHandle, merchant_id: str, start: float) -> ProcessingResult:
+        """Run the store and cache lookups and the stage graph over an opened document"""
+        if self.result_store:
+            # Retried upload: same merchant, same bytes, same pipeline version
+            stored = self.result_store.find(merchant_id, document.content_hash)
+            if stored is not None:
+                result = replace(stored, processing_time=time.perf_counter() - start, stage_timings={})
+                self._record_metrics(result, "stored")
+                return result
+        
+        cache_key = None
+        if self.result_cache:
+            cache_key = self.result_cache.key(document.content_hash)
+            cached = self.result_cache.get(cache_key)
+            self.metrics.increment("cache_lookups_total", labels={"result": "hit" if cached else "miss"})
+            if cached is not None:
+                fingerprints = self.page_index.fingerprints(document.content_hash) if self.page_index else []
+                return self._reuse_result(cached, document, merchant_id, fingerprints, start, "cached")
+        
+        fingerprints: List[PageFingerprint] = []
+        complete = True
+        if self.page_index:
+            fingerprints = await self._fingerprint_pages(document)
+            complete = len(fingerprints) == document.page_count
+            # Same pages in a different file (re-saved, new metadata): reuse
+            # the earlier result instead of running OCR and models again.
+            # Only a fingerprint of every page can prove the pages identical.
+            duplicate = self.page_index.find_exact(fingerprints) if complete else None
+            if duplicate and self.result_cache:
+                cached = self.result_cache.get(self.page_index.result_key(duplicate))
+                if cached is not None:
+                    return self._reuse_result(cached, document, merchant_id, fingerprints, start, "duplicate",
+                                              cache_key)
+        
+        timings: Dict[str, StageTiming] = {}
+        skipped: Dict[str, str] = {}
+        reused_by = self._reused_by(document, merchant_id, fingerprints)
+        outputs = await self.pipeline.run({
+            "document": document,
+            "document_path": document.path,
+            "merchant_id": merchant_id,
+            "reused_by": reused_by,
+        }, timings, self.short_circuit, skipped)
+        doc_type = outputs["classify"]
+        if "fraud" in outputs:
+            fraud_indicators = outputs["fraud"]
+        else:
+            # Fraud scoring was skipped; tamper and reuse findings still count
+            fraud_indicators = outputs.get("tamper", []) + ([REUSED_DOCUMENT] if reused_by else [])
+        
+        result = ProcessingResult(
+            document_id=document_id(merchant_id, doc_type.value, document.content_hash),
+            document_type=doc_type,
+            extracted_data=outputs.get("extract", {}),
+            confidence_score=outputs.get("confidence", 0.0),
+            fraud_indicators=fraud_indicators,
+            quality_score=outputs["quality"],
+            processing_time=time.perf_counter() - start,
+            stage_outputs={name: value for name, value in outputs.items() if name not in BUILTIN_STAGES},
+            stage_timings=timings,
+            skipped_stages=skipped
+        )
+        if skipped:
+            self.logger.info(f"Short-circuited {document.path}: skipped {', '.join(sorted(skipped))}")
+        
+        if cache_key:
+            try:
+                self.result_cache.put(cache_key, result)
+            except TypeError as e:
+                self.logger.warning(f"Result for {document.path} not cacheable: {str(e)}")
+                cache_key = None
+        if self.page_index:
+            self.page_index.add(document.content_hash, merchant_id, fingerprints, cache_key, complete)
+        self._store_result(result, merchant_id, document)
+        self._record_metrics(result, "processed")
+        return result
+    
+    def _reuse_result(self, cached: ProcessingResult, document: DocumentHandle, merchant_id: str,
+                      fingerprints: List[PageFingerprint], start: float, outcome: str,
+                      cache_key: Optional[str] = None) -> ProcessingResult:
+        """
+        Serve a cached result for this merchant. Reuse is re-checked against
+        the submitting merchant rather than carried over from the original.
+        """
+        indicators = [indicator for indicator in cached.fraud_indicators if indicator != REUSED_DOCUMENT]
+        if self.page_index:
+            if self._reused_by(document, merchant_id, fingerprints):
+                indicators.append(REUSED_DOCUMENT)
+            self.page_index.add(document.content_hash, merchant_id, fingerprints or None, cache_key)
+            if cache_key:
+                self.result_cache.put(cache_key, cached)
+        result = replace(
+            cached,
+            document_id=document_id(merchant_id, cached.document_type.value, document.content_hash),
+            fraud_indicators=indicators,
+            processing_time=time.perf_counter() - start,
+            stage_timings={},
+        )
+        self._store_result(result, merchant_id, document)
+        self._record_metrics(result, outcome)
+        return result
+    
+    def _store_result(self, result: ProcessingResult, merchant_id: str, document: DocumentHandle):
+        """Append the result to the store; a concurrent duplicate of the same upload is ignored"""
+        if not self.result_store:
+            return
+        try:
+            self.result_store.put(result.document_id, merchant_id, result.document_type.value,
+                                  document.content_hash, result)
+        except TypeError as e:
+            self.logger.warning(f"Result for {document.path} not storable: {str(e)}")
+    
+    async def _fingerprint_pages(self, document: DocumentHandle) -> List[PageFingerprint]:
+        """
+        Perceptual fingerprints of the first ``fingerprint_pages`` pages.
+        Text pages are hashed inline, rasters on the fingerprint executor.
+        """
+        fingerprints = []
+        for number in range(min(self.fingerprint_pages, document.page_count)):
+            page = document.page(number)
+            if page.kind == "text":
+                fingerprints.append(kernels.fingerprint_page(page.buffer, page.kind, page.mode, page.size))
+            else:
+                fingerprints.append(await self.executor.run(
+                    "fingerprint", kernels.fingerprint_page, page.buffer, page.kind, page.mode, page.size
+                ))
+        return fingerprints
+    
+    def _reused_by(self, document: DocumentHandle, merchant_id: str,
+                   fingerprints: List[PageFingerprint]) -> List[str]:
+        """Other merchants that submitted this document or a near-duplicate of any of its pages"""
+        if not self.page_index:
+            return []
+        related = {match.content_hash for match in self.page_index.near_duplicates(fingerprints)}
+        related.add(document.content_hash)
+        merchants = set().union(*(self.page_index.merchants(content_hash) for content_hash in related))
+        merchants.discard(merchant_id)
+        if merchants:
+            self.logger.warning(f"{document.path} reuses pages submitted by {', '.join(sorted(merchants))}")
+        return sorted(merchants)
+    
+    def _record_metrics(self, result: ProcessingResult, outcome: str):
+        """Emit per-document and per-stage latency, labelled by document type"""
+        doc_type = result.document_type.value
+        self.metrics.increment("documents_total", labels={"document_type": doc_type, "outcome": outcome})
+        for stage in result.skipped_stages:
+            self.metrics.increment("stages_skipped_total", labels={"document_type": doc_type, "stage": stage})
+        self.metrics.observe("document_seconds", result.processing_time,
+                             labels={"document_type": doc_type, "outcome": outcome})
+        for stage, timing in result.stage_timings.items():
+            labels = {"document_type": doc_type, "stage": stage}
+            self.metrics.observe("stage_seconds", timing.wall_time, labels=labels)
+            self.metrics.observe("stage_cpu_seconds", timing.cpu_time, labels=labels)
+    
+    async def process_batch(self, document_paths: Iterable[str], merchant_id: str) -> AsyncIterator[ProcessingResult]:
+        """
+        Process an application packet with bounded concurrency.
+        Results are yielded in completion order. At most ``batch_concurrency``
+        documents are in flight; the next path is only pulled from
+        ``document_paths`` once a slot frees up and the caller has consumed
+        the finished result.
+        """
+        if self.batch_concurrency < 1:
+            raise ValueError("batch_concurrency must be at least 1")
+        
+        pending = set()
+        finished = []
+        try:
+            for document_path in document_paths:
+                if len(pending) >= self.batch_concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    finished.extend(done)
+                    while finished:
+                        yield finished.pop().result()
+                pending.add(asyncio.ensure_future(self.process_document(document_path, merchant_id)))
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                finished.extend(done)
+                while finished:
+                    yield finished.pop().result()
+        finally:
+            # Caller stopped early or a document failed - don't leak work,
+            # and collect outcomes of finished documents that were never yielded
+            for task in pending:
+                task.cancel()
+            if pending or finished:
+                await asyncio.gather(*pending, *finished, return_exceptions=True)
+    
+    async def _assess_quality(self, document: DocumentHandle) -> float:
         """Assess document image quality"""
-        # Implement quality assessment logic
-        return 0.95
+        return await self.executor.run("quality", kernels.assess_quality, document.data)
     
-    async def _classify_document(self, document_path: str) -> DocumentType:
+    async def _classify_document(self, document: DocumentHandle) -> DocumentType:
         """Classify document type using ML model"""
-        # Implement classification logic
-        return DocumentType.BUSINESS_LICENSE
+        return DocumentType(await self.classify_batcher.submit(document.data))
+    
+    async def _extract_data(self, document: DocumentHandle, doc_type: DocumentType) -> Dict:
+        """
+        Extract structured data one page at a time.
+        Native text pages are parsed inline; only rasters are shipped to the
+        OCR pool. The document type's extractor then merges the page results
+        (by default, fields found on earlier pages win over later ones).
+        """
+        pages: List[Dict] = []
+        for page in document.iter_pages():
+            if page.kind == "text":
+                page_data = self.extractors.get(doc_type.value).extract_page(page.buffer, page.kind, page.mode,
+                                                                             page.size)
+            else:
+                page_data = await self.executor.run(
+                    "extract", kernels.extract_page, page.buffer, doc_type.value, page.kind, page.mode, page.size
+                )
+            self.metrics.increment("pages_total", labels={"route": "text" if page.kind == "text" else "ocr"})
+            pages.append(page_data)
+        return self.extractors.merge(doc_type.value, pages)
+    
+    async def _detect_tampering(self, document: DocumentHandle) -> List[str]:
+        """Detect fraud indicators that only need the raw file (metadata, edits)"""
+        return await self.executor.run("tamper", kernels.detect_tampering, document.data)
     
-    async def _extract_data(self, document_path: str, doc_type: DocumentType) -> Dict:
-        """Extract structured data using OCR"""
-        # Implement OCR and data extraction
-        return {"business_name": "Example Corp", "license_number": "12345"}
+    async def _run_fraud_stage(self, ctx: Dict[str, Any]) -> List[str]:
+        """Combine raw-file tamper indicators, cross-merchant reuse and content-based fraud checks"""
+        content_indicators = await self._detect_fraud(ctx["document"], ctx["extract"])
+        reuse_indicators = [REUSED_DOCUMENT] if ctx.get("reused_by") else []
+        return ctx["tamper"] + reuse_indicators + content_indicators
     
-    async def _detect_fraud(self, document_path: str, data: Dict) -> List[str]:
+    async def _detect_fraud(self, document: DocumentHandle, data: Dict) -> List[str]:
         """Detect potential fraud indicators"""
-        # Implement fraud detection logic
-        return []
+        return await self.fraud_batcher.submit((document.data, data))
     
     async def _calculate_confidence(self, quality: float, data: Dict) -> float:
         """Calculate overall confidence score"""
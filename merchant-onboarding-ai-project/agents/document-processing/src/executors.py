@@ -0,0 +1,204 @@
+"""
+Document Processing Executors
+Runs CPU-bound stage work (OCR, classification, fraud models) off the event loop
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+import time
+
+from pipeline import record_cpu_time
+
+# Models loaded by the pool initializer, keyed by stage. Each worker process
+# holds its own copy, so they stay warm across tasks.
+_WORKER_MODELS: Dict[str, Any] = {}
+# Models of the StageExecutor running a stage inline in this process; each
+# executor keeps its own, so agents sharing a process never share models
+_INLINE_MODELS: ContextVar[Optional[Dict[str, Any]]] = ContextVar("inline_models", default=None)
+
+def _init_worker(stage: str, loader: Optional[Callable[[], Any]]):
+    """Pool initializer: preload the stage's model once per worker process"""
+    _WORKER_MODELS[stage] = loader() if loader else None
+
+def worker_model(stage: str) -> Any:
+    """Return the model loaded for ``stage`` by the executor running the current task"""
+    models = _INLINE_MODELS.get()
+    return (_WORKER_MODELS if models is None else models).get(stage)
+
+def _warm_up() -> bool:
+    return True
+
+def _run_on_shared_buffer(fn: Callable, shm_name: str, size: int, args: tuple) -> Tuple[Any, float]:
+    """
+    Worker entry point: attach to the parent's shared memory and run ``fn`` on it.
+    Returns the result together with the CPU seconds it took.
+    """
+    # Workers share the parent's resource tracker (see StageExecutor._pool),
+    # which already holds the segment; the parent unlinks it once
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:size]
+    start = time.thread_time()
+    try:
+        return fn(view, *args), time.thread_time() - start
+    finally:
+        view.release()
+        shm.close()
+
+def _run_batch_on_shared_buffer(fn: Callable, shm_name: str, offsets: List[Tuple[int, int]],
+                                args: tuple) -> Tuple[Any, float]:
+    """Worker entry point for batches: one segment holds every item back to back"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    views = [shm.buf[start:end] for start, end in offsets]
+    start_time = time.thread_time()
+    try:
+        return fn(views, *args), time.thread_time() - start_time
+    finally:
+        for view in views:
+            view.release()
+        shm.close()
+
+class SharedBuffer:
+    """
+    Document bytes placed in shared memory once per call
+    Workers attach by name and read through a memoryview, so the payload is
+    never pickled through the pool's call queue.
+    """
+
+    def __init__(self, data: bytes):
+        self.size = len(data)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(self.size, 1))
+        self._shm.buf[:self.size] = data
+        self.offsets = [(0, self.size)]
+
+    @classmethod
+    def concatenate(cls, buffers: Sequence[bytes]) -> "SharedBuffer":
+        """Place several buffers back to back in one segment, recording their offsets"""
+        shared = cls.__new__(cls)
+        shared.size = sum(len(buffer) for buffer in buffers)
+        shared._shm = shared_memory.SharedMemory(create=True, size=max(shared.size, 1))
+        shared.offsets, position = [], 0
+        for buffer in buffers:
+            shared._shm.buf[position:position + len(buffer)] = buffer
+            shared.offsets.append((position, position + len(buffer)))
+            position += len(buffer)
+        return shared
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> "SharedBuffer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class StageExecutor:
+    """
+    Per-stage process pools for CPU-bound work
+    ``pool_sizes`` maps stage name to worker count; stages without a pool run
+    inline on the calling thread. ``model_loaders`` maps stage name to a
+    picklable zero-argument callable that loads the stage's model.
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[str, int]] = None,
+                 model_loaders: Optional[Dict[str, Callable[[], Any]]] = None):
+        self.pool_sizes = {stage: size for stage, size in (pool_sizes or {}).items() if size > 0}
+        self.model_loaders = model_loaders or {}
+        self.logger = logging.getLogger(__name__)
+        self._pools: Dict[str, ProcessPoolExecutor] = {}
+        self._inline_models: Dict[str, Any] = {}
+
+    def _pool(self, stage: str) -> ProcessPoolExecutor:
+        pool = self._pools.get(stage)
+        if pool is None:
+            # Start the tracker before any worker exists so workers inherit it
+            # rather than starting their own, which would unlink segments the
+            # parent still owns when the worker exits
+            resource_tracker.ensure_running()
+            pool = ProcessPoolExecutor(
+                max_workers=self.pool_sizes[stage],
+                initializer=_init_worker,
+                initargs=(stage, self.model_loaders.get(stage)),
+            )
+            self._pools[stage] = pool
+        return pool
+
+    def inline_model(self, stage: str) -> Any:
+        """``stage``'s model for work that runs inline, loaded in this process on first use"""
+        if stage not in self._inline_models:
+            loader = self.model_loaders.get(stage)
+            self._inline_models[stage] = loader() if loader else None
+        return self._inline_models[stage]
+
+    async def start(self):
+        """Spawn every pool's workers and load their models before traffic arrives"""
+        loop = asyncio.get_running_loop()
+        warmups = []
+        for stage, size in self.pool_sizes.items():
+            pool = self._pool(stage)
+            warmups.extend(loop.run_in_executor(pool, _warm_up) for _ in range(size))
+        await asyncio.gather(*warmups)
+        self.logger.info(f"Warmed stage pools: {self.pool_sizes}")
+
+    async def run(self, stage: str, fn: Callable, data: bytes, *args) -> Any:
+        """
+        Run ``fn(buffer, *args)`` for ``stage``
+        ``fn`` must be a module-level function so it can be sent to a worker.
+        Its CPU time is attributed to the calling pipeline stage.
+        """
+        if stage not in self.pool_sizes:
+            self.inline_model(stage)
+            token = _INLINE_MODELS.set(self._inline_models)
+            start = time.thread_time()
+            try:
+                with memoryview(data) as view:
+                    return fn(view, *args)
+            finally:
+                record_cpu_time(time.thread_time() - start)
+                _INLINE_MODELS.reset(token)
+
+        loop = asyncio.get_running_loop()
+        with SharedBuffer(data) as shared:
+            result, cpu_time = await loop.run_in_executor(
+                self._pool(stage), _run_on_shared_buffer, fn, shared.name, shared.size, args
+            )
+        record_cpu_time(cpu_time)
+        return result
+
+    async def run_batch(self, stage: str, fn: Callable, buffers: Sequence[bytes], *args) -> Tuple[Any, float]:
+        """
+        Run ``fn(list_of_buffers, *args)`` for ``stage`` as one call.
+        Returns the result with the CPU seconds it took, for the caller to
+        apportion across the batch.
+        """
+        if stage not in self.pool_sizes:
+            self.inline_model(stage)
+            token = _INLINE_MODELS.set(self._inline_models)
+            views = [memoryview(buffer) for buffer in buffers]
+            start = time.thread_time()
+            try:
+                return fn(views, *args), time.thread_time() - start
+            finally:
+                _INLINE_MODELS.reset(token)
+                for view in views:
+                    view.release()
+
+        loop = asyncio.get_running_loop()
+        with SharedBuffer.concatenate(buffers) as shared:
+            return await loop.run_in_executor(
+                self._pool(stage), _run_batch_on_shared_buffer, fn, shared.name, shared.offsets, args
+            )
+
+    def shutdown(self, wait: bool = True):
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait)
+        self._pools.clear()
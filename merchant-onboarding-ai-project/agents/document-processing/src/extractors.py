@@ -0,0 +1,153 @@
+"""
+Document Extractors
+Registry of per-DocumentType extractors whose models are imported and
+loaded on first use, then kept warm for the life of the process
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import importlib
+import logging
+import re
+import threading
+
+class Extractor:
+    """
+    Extracts structured fields from the pages of one document type.
+    Subclasses load their models in ``load``, which the registry calls once,
+    the first time a document of that type is seen. Pages that already
+    carry text go to ``parse_text``; only rasters go to ``ocr_page``.
+    """
+
+    def load(self):
+        """Load models and other heavy resources"""
+
+    def extract_page(self, page: memoryview, page_kind: str, mode: Optional[str],
+                     size: Optional[Tuple[int, int]]) -> Dict:
+        if page_kind == "text":
+            return self.parse_text(bytes(page).decode("utf-8", errors="replace"))
+        return self.ocr_page(page, page_kind, mode, size)
+
+    def parse_text(self, text: str) -> Dict:
+        """Extract fields from native text (text files, PDF text layers)"""
+        raise NotImplementedError
+
+    def ocr_page(self, page: memoryview, page_kind: str, mode: Optional[str],
+                 size: Optional[Tuple[int, int]]) -> Dict:
+        """Extract fields from a rendered page image or an unrenderable PDF"""
+        raise NotImplementedError
+
+    @classmethod
+    def merge(cls, pages: List[Dict]) -> Dict:
+        """
+        Combine per-page results into the document's fields; by default a
+        field found on an earlier page wins over later ones. A classmethod so
+        the agent can merge without loading the extractor's models.
+        """
+        merged: Dict = {}
+        for page in pages:
+            for key, value in page.items():
+                merged.setdefault(key, value)
+        return merged
+
+FIELD_LINE = re.compile(r"^[ \t]*([A-Za-z][A-Za-z0-9 #/&().'-]{1,60}?)[ \t]*:[ \t]*(\S.*?)[ \t]*$", re.M)
+
+class GenericExtractor(Extractor):
+    """Fallback extractor for document types without a dedicated model"""
+
+    def parse_text(self, text: str) -> Dict:
+        # "Label: value" lines, as on licenses, certificates and letters
+        fields = {}
+        for label, value in FIELD_LINE.findall(text):
+            key = re.sub(r"[^a-z0-9]+", "_", label.lower()).strip("_")
+            fields.setdefault(key, value)
+        return fields
+
+    def ocr_page(self, page: memoryview, page_kind: str, mode: Optional[str],
+                 size: Optional[Tuple[int, int]]) -> Dict:
+        # Implement OCR and data extraction
+        return {"business_name": "Example Corp", "license_number": "12345"}
+
+# A factory, or a "module:attribute" path imported only when first needed
+ExtractorFactory = Union[str, Callable[[], Extractor]]
+
+class ExtractorRegistry:
+    """
+    Maps document type values to extractor factories
+    Nothing is imported or loaded at registration time, so a worker that
+    only ever sees bank statements never pays for the tax-return or ID models.
+    """
+
+    def __init__(self, default: ExtractorFactory = GenericExtractor):
+        self.default = default
+        self.logger = logging.getLogger(__name__)
+        self._factories: Dict[str, ExtractorFactory] = {}
+        self._loaded: Dict[str, Extractor] = {}
+        self._lock = threading.Lock()
+
+    def register(self, doc_type: str, factory: ExtractorFactory):
+        """Register (or replace) the extractor for ``doc_type``"""
+        with self._lock:
+            self._factories[doc_type] = factory
+            self._loaded.pop(doc_type, None)
+
+    def get(self, doc_type: str) -> Extractor:
+        """Return the warm extractor for ``doc_type``, loading it on first use"""
+        extractor = self._loaded.get(doc_type)
+        if extractor is not None:
+            return extractor
+
+        with self._lock:
+            extractor = self._loaded.get(doc_type)
+            if extractor is None:
+                extractor = self.factory(doc_type)()
+                extractor.load()
+                self._loaded[doc_type] = extractor
+                self.logger.info(f"Loaded extractor for {doc_type}: {type(extractor).__name__}")
+        return extractor
+
+    def factory(self, doc_type: str) -> Callable[[], Extractor]:
+        """The extractor factory for ``doc_type``, imported but not called"""
+        factory = self._factories.get(doc_type, self.default)
+        if isinstance(factory, str):
+            module_name, _, attribute = factory.partition(":")
+            factory = getattr(importlib.import_module(module_name), attribute)
+        return factory
+
+    def merge(self, doc_type: str, pages: List[Dict]) -> Dict:
+        """Merge per-page results with the extractor class's ``merge``, without loading it"""
+        factory = self.factory(doc_type)
+        if not (isinstance(factory, type) and issubclass(factory, Extractor)):
+            factory = Extractor
+        return factory.merge(pages)
+
+    def copy(self) -> "ExtractorRegistry":
+        """A registry with the same factories, none of them loaded yet"""
+        copy = ExtractorRegistry(self.default)
+        with self._lock:
+            copy._factories = dict(self._factories)
+        return copy
+
+    def preload(self, doc_types: Iterable[str]):
+        for doc_type in doc_types:
+            self.get(doc_type)
+
+    def loaded(self) -> List[str]:
+        """Document types whose extractor is already warm in this process"""
+        return sorted(self._loaded)
+
+# Default extractors; agents configure copies of it and never change it
+registry = ExtractorRegistry()
+registry.register("bank_statement", "bank_statements:BankStatementExtractor")
+
+def configure_extractors(overrides: Dict[str, ExtractorFactory], preload: Iterable[str] = ()) -> ExtractorRegistry:
+    """
+    A copy of the default registry with ``overrides`` applied and the listed
+    types warmed. Used as the "extract" stage's model loader, so it runs
+    once per agent and in every pool worker; overrides must therefore be
+    picklable (import paths are).
+    """
+    extractors = registry.copy()
+    for doc_type, factory in overrides.items():
+        extractors.register(doc_type, factory)
+    extractors.preload(preload)
+    return extractors
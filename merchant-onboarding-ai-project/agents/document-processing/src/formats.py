@@ -0,0 +1,204 @@
+"""
+Document Format Sniffing
+Tells native text and text-layer PDFs apart from rasters, so only scans
+are sent to OCR
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+import base64
+import codecs
+import re
+import zlib
+
+PDF_MAGIC = b"%PDF"
+IMAGE_MAGICS = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"II*\x00", b"MM\x00*", b"GIF8", b"BM")
+
+# Bytes of a document inspected to tell its format
+SNIFF_BYTES = 4096
+# Share of printable characters a document needs to be treated as text
+MIN_PRINTABLE_RATIO = 0.95
+
+# A page needs this many non-blank characters before its text layer is
+# trusted over OCR (scans often carry a stray page number or watermark)
+MIN_TEXT_CHARS = 32
+
+_OBJECT = re.compile(rb"(\d+)\s+(\d+)\s+obj\b(.*?)endobj", re.S)
+_STREAM = re.compile(rb"stream\r?\n(.*?)\r?\n?endstream", re.S)
+_REF = re.compile(rb"(\d+)\s+\d+\s+R")
+_TEXT_TOKEN = re.compile(
+    rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|\[|\]|/[^\s/\[\]()<>]+|[-+]?\d*\.?\d+|[A-Za-z'\"*]+"
+)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+class UnsupportedDocumentError(ValueError):
+    """The document is neither text, a PDF nor a supported image format"""
+
+def sniff_kind(head: bytes) -> str:
+    """
+    "pdf", "image", "text" or "unknown" from the first ``SNIFF_BYTES`` of a
+    document. Text must be UTF-8 (or a single-byte encoding such as
+    Latin-1) and almost entirely printable, so binary formats we don't
+    recognise are never parsed as text.
+    """
+    if head.startswith(PDF_MAGIC):
+        return "pdf"
+    if any(head.startswith(magic) for magic in IMAGE_MAGICS):
+        return "image"
+    try:
+        # Incremental, so a character cut off at the end of the head is fine
+        text = codecs.getincrementaldecoder("utf-8")().decode(head)
+    except UnicodeDecodeError:
+        text = head.decode("latin-1")
+    printable = sum(char.isprintable() or char in "\t\n\r\f" for char in text)
+    return "text" if printable >= MIN_PRINTABLE_RATIO * len(text) else "unknown"
+
+def is_text_layer(text: Optional[str]) -> bool:
+    """Whether extracted page text is substantial and readable enough to skip OCR"""
+    if not text:
+        return False
+    visible = [c for c in text if not c.isspace()]
+    if len(visible) < MIN_TEXT_CHARS:
+        return False
+    # Fonts without a usable encoding extract as control-character noise
+    printable = sum(c.isprintable() for c in visible)
+    return printable / len(visible) >= 0.9
+
+def _decode_stream(dictionary: bytes, raw: bytes) -> Optional[bytes]:
+    filters = re.findall(rb"/(ASCIIHexDecode|ASCII85Decode|FlateDecode|AHx|A85|Fl)\b",
+                         dictionary.split(b"/DecodeParms")[0])
+    if re.search(rb"/Filter", dictionary) and not filters:
+        return None  # An image codec or something we can't decode
+    data = raw
+    try:
+        for name in filters:
+            if name in (b"ASCII85Decode", b"A85"):
+                data = base64.a85decode(re.sub(rb"\s", b"", data).split(b"~>")[0].removeprefix(b"<~"))
+            elif name in (b"ASCIIHexDecode", b"AHx"):
+                data = bytes.fromhex(re.sub(rb"[^0-9A-Fa-f]", b"", data.split(b">")[0]).decode())
+            else:
+                data = zlib.decompress(data)
+    except (ValueError, zlib.error):
+        return None
+    return data
+
+def _literal(token: bytes) -> bytes:
+    out, i, body = bytearray(), 0, token[1:-1]
+    while i < len(body):
+        c = body[i:i + 1]
+        if c != b"\\":
+            out += c
+            i += 1
+            continue
+        nxt = body[i + 1:i + 2]
+        octal = re.match(rb"[0-7]{1,3}", body[i + 1:i + 4])
+        if octal:
+            out.append(int(octal.group(), 8) & 0xFF)
+            i += 1 + len(octal.group())
+        else:
+            out += _ESCAPES.get(nxt, nxt if nxt != b"\n" else b"")
+            i += 2
+    return bytes(out)
+
+def content_text(content: bytes) -> str:
+    """
+    Text shown by a page content stream (Tj, TJ, ' and " operators), with a
+    line break per text object or line move. Assumes single-byte encodings,
+    which is what text-producing libraries such as reportlab emit.
+    """
+    lines, line, operands = [], [], []
+    for token in _TEXT_TOKEN.findall(content):
+        if token.startswith(b"("):
+            operands.append(_literal(token))
+        elif token.startswith(b"<"):
+            operands.append(bytes.fromhex(re.sub(rb"\s", b"", token[1:-1]).decode() or ""))
+        elif token in (b"[", b"]") or token[:1] == b"/" or re.match(rb"[-+.\d]", token):
+            if re.match(rb"[-+]?\d*\.?\d+$", token) and float(token) < -200 and operands:
+                # Large negative TJ adjustments are word gaps
+                operands.append(b" ")
+            continue
+        else:
+            if token in (b"Tj", b"TJ", b"'", b'"'):
+                if token in (b"'", b'"') and line:
+                    lines.append(b"".join(line))
+                    line = []
+                line.extend(operands)
+            elif token in (b"BT", b"ET", b"T*", b"Td", b"TD", b"Tm") and line:
+                lines.append(b"".join(line))
+                line = []
+            operands = []
+    if line:
+        lines.append(b"".join(line))
+    return "\n".join(l.decode("latin-1") for l in lines)
+
+class PdfTextLayer:
+    """
+    Lazy per-page text of a classic (non object-stream) PDF, without any
+    PDF library. Works over any buffer (bytes, mmap): opening records only
+    object offsets and the page list, and a page's content streams are
+    sliced out and decoded when that page is asked for.
+    """
+
+    def __init__(self, data, offsets: Dict[int, Tuple[int, int]], pages: List[int]):
+        self._data = data
+        self._offsets = offsets
+        self.pages = pages
+
+    @classmethod
+    def open(cls, data) -> Optional["PdfTextLayer"]:
+        """None when the file uses structures this reader doesn't handle"""
+        offsets = {int(m.group(1)): m.span(3) for m in _OBJECT.finditer(data)}
+        if not offsets or data.find(b"/ObjStm") != -1:
+            return None
+        layer = cls(data, offsets, [])
+        root = re.search(rb"/Root\s+(\d+)\s+\d+\s+R", data)
+        catalog = layer._object(int(root.group(1))) if root else b""
+        pages_ref = re.search(rb"/Pages\s+(\d+)\s+\d+\s+R", catalog)
+        if pages_ref is None:
+            return None
+        layer.pages = list(layer._page_objects(int(pages_ref.group(1))))
+        return layer
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def _object(self, number: int) -> bytes:
+        span = self._offsets.get(number)
+        return self._data[span[0]:span[1]] if span else b""
+
+    def _page_objects(self, number: int, depth: int = 0) -> Iterator[int]:
+        """Object numbers of the page tree's leaves, in document order"""
+        body = self._object(number)
+        if depth > 32:
+            return
+        kids = re.search(rb"/Kids\s*\[(.*?)\]", body, re.S)
+        if kids and re.search(rb"/Type\s*/Pages\b", body):
+            for kid in _REF.findall(kids.group(1)):
+                yield from self._page_objects(int(kid), depth + 1)
+        elif re.search(rb"/Type\s*/Page\b", body):
+            yield number
+
+    def page_text(self, index: int) -> Optional[str]:
+        """Text of page ``index``, or None if a content stream can't be decoded"""
+        page = self._object(self.pages[index])
+        contents = re.search(rb"/Contents\s*(\[.*?\]|\d+\s+\d+\s+R)", page, re.S)
+        parts = []
+        for ref in _REF.findall(contents.group(1)) if contents else []:
+            body = self._object(int(ref))
+            stream = _STREAM.search(body)
+            if stream is None:
+                return None
+            decoded = _decode_stream(body[:stream.start()], stream.group(1))
+            if decoded is None:
+                return None
+            parts.append(content_text(decoded))
+        return "\n".join(parts)
+
+def pdf_page_texts(data: bytes) -> Optional[List[str]]:
+    """
+    Per-page text of a classic (non object-stream) PDF, without any PDF
+    library. Returns None when the file uses structures this reader doesn't
+    handle; callers then fall back to a real renderer or OCR.
+    """
+    layer = PdfTextLayer.open(data)
+    texts = [layer.page_text(number) for number in range(len(layer))] if layer else []
+    return texts if texts and None not in texts else None
@@ -0,0 +1,373 @@
+"""
+Document Processing Job Queue
+Durable SQLite-backed queue with priority lanes, plus an async worker pool
+that drains it through DocumentProcessingAgent, so an upload returns as
+soon as its job is recorded and OCR runs in the background
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+from formats import UnsupportedDocumentError
+
+# Lanes follow the merchant-segmentation agent's segments. A job's rank is
+# the time it became ready plus its lane's delay: instant work always goes
+# first, but a fast-track or enhanced-review job that has waited that much
+# longer is served ahead of new instant jobs, so no lane starves.
+LANE_DELAYS: Dict[str, float] = {
+    "instant": 0.0,
+    "fast_track": 30.0,
+    "enhanced_review": 300.0,
+}
+DEFAULT_LANE = "fast_track"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+@dataclass(frozen=True)
+class Job:
+    """
+    One queued document. ``attempts`` counts claims so far and, together
+    with ``worker``, identifies the current lease: a worker whose lease
+    expired and was re-claimed elsewhere can no longer complete the job.
+    """
+    id: int
+    merchant_id: str
+    document_path: str
+    lane: str
+    state: str
+    attempts: int
+    max_attempts: int
+    enqueued: float
+    worker: Optional[str] = None
+    result_id: Optional[str] = None
+    error: Optional[str] = None
+    finished: Optional[float] = None
+
+_COLUMNS = "id, merchant_id, document_path, lane, state, attempts, max_attempts, enqueued, worker, result_id, " \
+           "error, finished"
+
+class JobQueue:
+    """
+    Job table in SQLite (a local stand-in for a real broker)
+    Every call is its own short transaction, so any number of worker
+    processes - on this host or sharing the database file - can claim from
+    the same queue; claims take SQLite's write lock, so each ready job goes
+    to exactly one worker. A claimed job is invisible to other workers for
+    ``visibility_timeout`` seconds; a worker that dies (or stops extending
+    its lease) lets the job become claimable again. Failed attempts are
+    retried with jittered exponential backoff until ``max_attempts``.
+    """
+
+    def __init__(self, path: Optional[str] = None, visibility_timeout: float = 300.0, max_attempts: int = 3,
+                 backoff: float = 2.0, max_backoff: float = 300.0, lane_delays: Optional[Dict[str, float]] = None):
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lane_delays = dict(lane_delays or LANE_DELAYS)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        # Autocommit: transactions are opened explicitly around each call
+        self._db = sqlite3.connect(path or ":memory:", timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, job_key TEXT UNIQUE, merchant_id TEXT NOT NULL, "
+            "document_path TEXT NOT NULL, lane TEXT NOT NULL, state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, enqueued REAL NOT NULL, "
+            "available REAL NOT NULL, rank REAL NOT NULL, lease_expires REAL, worker TEXT, result_id TEXT, "
+            "error TEXT, finished REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, rank)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_merchant ON jobs (merchant_id)")
+
+    def _rank(self, lane: str, available: float) -> float:
+        return available + self.lane_delays[lane]
+
+    def _lanes(self, lanes: Optional[Sequence[str]]) -> Tuple[str, Tuple]:
+        if not lanes:
+            return "", ()
+        return f" AND lane IN ({','.join('?' * len(lanes))})", tuple(lanes)
+
+    def enqueue(self, document_path: str, merchant_id: str, lane: str = DEFAULT_LANE,
+                job_key: Optional[str] = None, max_attempts: Optional[int] = None) -> int:
+        """
+        Record a job and return its ID. Re-enqueuing with the same
+        ``job_key`` (e.g. a client's upload ID) returns the existing job.
+        """
+        return self.enqueue_many([document_path], merchant_id, lane, [job_key] if job_key else None,
+                                 max_attempts)[0]
+
+    def enqueue_many(self, document_paths: Iterable[str], merchant_id: str, lane: str = DEFAULT_LANE,
+                     job_keys: Optional[Sequence[Optional[str]]] = None,
+                     max_attempts: Optional[int] = None) -> List[int]:
+        """Record an application packet in one transaction; job IDs in input order"""
+        if lane not in self.lane_delays:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {', '.join(self.lane_delays)}")
+        paths = list(document_paths)
+        keys = list(job_keys) if job_keys is not None else [None] * len(paths)
+        if len(keys) != len(paths):
+            raise ValueError("job_keys must match document_paths")
+        now = time.time()
+        ids = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for path, key in zip(paths, keys):
+                    if key is not None:
+                        row = self._db.execute("SELECT id FROM jobs WHERE job_key = ?", (key,)).fetchone()
+                        if row is not None:
+                            ids.append(row[0])
+                            continue
+                    cursor = self._db.execute(
+                        "INSERT INTO jobs (job_key, merchant_id, document_path, lane, state, max_attempts, "
+                        "enqueued, available, rank) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, merchant_id, str(path), lane, QUEUED, max_attempts or self.max_attempts,
+                         now, now, self._rank(lane, now)),
+                    )
+                    ids.append(cursor.lastrowid)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return ids
+
+    def claim(self, worker: str, lanes: Optional[Sequence[str]] = None) -> Optional[Job]:
+        """
+        Lease the best-ranked ready job (optionally only from ``lanes``),
+        including jobs whose previous lease expired. Jobs out of attempts
+        when their lease expires are marked failed instead.
+        """
+        now = time.time()
+        lane_filter, lane_params = self._lanes(lanes)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "UPDATE jobs SET state = ?, error = 'visibility timeout expired', finished = ? "
+                    "WHERE state = ? AND lease_expires <= ? AND attempts >= max_attempts",
+                    (FAILED, now, RUNNING, now),
+                )
+                row = self._db.execute(
+                    f"SELECT id FROM jobs WHERE ((state = ? AND available <= ?) OR (state = ? AND lease_expires <= ?))"
+                    f"{lane_filter} ORDER BY rank LIMIT 1",
+                    (QUEUED, now, RUNNING, now) + lane_params,
+                ).fetchone()
+                job = None
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_expires = ?, worker = ? "
+                        "WHERE id = ?",
+                        (RUNNING, now + self.visibility_timeout, worker, row[0]),
+                    )
+                    job = self._get(row[0])
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return job
+
+    def _leased(self, job: Job) -> Tuple[str, Tuple]:
+        return "id = ? AND state = ? AND worker = ? AND attempts = ?", (job.id, RUNNING, job.worker, job.attempts)
+
+    def _update(self, assignments: str, params: Tuple, job: Job) -> bool:
+        condition, lease = self._leased(job)
+        with self._lock:
+            cursor = self._db.execute(f"UPDATE jobs SET {assignments} WHERE {condition}", params + lease)
+        if cursor.rowcount == 0:
+            self.logger.warning(f"Job {job.id}: lease held by {job.worker} was lost")
+        return cursor.rowcount > 0
+
+    def extend(self, job: Job, seconds: Optional[float] = None) -> bool:
+        """Heartbeat: push the lease out again; False if it was already lost"""
+        timeout = self.visibility_timeout if seconds is None else seconds
+        return self._update("lease_expires = ?", (time.time() + timeout,), job)
+
+    def complete(self, job: Job, result_id: str) -> bool:
+        return self._update("state = ?, result_id = ?, error = NULL, finished = ?", (DONE, result_id, time.time()), job)
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> str:
+        """
+        Record a failed attempt. Returns the job's new state: queued again
+        after a backoff delay, or failed once out of attempts (or if
+        ``retry`` is False).
+        """
+        now = time.time()
+        if retry and job.attempts < job.max_attempts:
+            delay = min(self.max_backoff, self.backoff * 2 ** (job.attempts - 1)) * random.uniform(0.5, 1.0)
+            available = now + delay
+            self._update("state = ?, error = ?, available = ?, rank = ?, lease_expires = NULL",
+                         (QUEUED, error, available, self._rank(job.lane, available)), job)
+            return QUEUED
+        self._update("state = ?, error = ?, finished = ?", (FAILED, error, now), job)
+        return FAILED
+
+    def release(self, job: Job) -> bool:
+        """Hand a job back untouched (worker shutting down); the attempt isn't counted"""
+        return self._update("state = ?, attempts = attempts - 1, available = ?, lease_expires = NULL",
+                            (QUEUED, time.time()), job)
+
+    def retry_failed(self, lane: Optional[str] = None) -> int:
+        """Requeue dead-lettered jobs with a fresh set of attempts"""
+        now = time.time()
+        lane_filter, lane_params = self._lanes([lane] if lane else None)
+        with self._lock:
+            jobs = self._db.execute(f"SELECT id, lane FROM jobs WHERE state = ?{lane_filter}",
+                                    (FAILED,) + lane_params).fetchall()
+            self._db.executemany(
+                "UPDATE jobs SET state = ?, attempts = 0, available = ?, rank = ?, finished = NULL WHERE id = ?",
+                [(QUEUED, now, self._rank(job_lane, now), job_id) for job_id, job_lane in jobs],
+            )
+        return len(jobs)
+
+    def _get(self, job_id: int) -> Optional[Job]:
+        row = self._db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job(*row) if row else None
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._get(job_id)
+
+    def merchant_jobs(self, merchant_id: str) -> List[Job]:
+        """Every job for a merchant, oldest first (upload status pages poll this)"""
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM jobs WHERE merchant_id = ? ORDER BY id",
+                                    (merchant_id,)).fetchall()
+        return [Job(*row) for row in rows]
+
+    def pending(self, lanes: Optional[Sequence[str]] = None) -> int:
+        """Jobs still queued or running (including ones waiting out a backoff)"""
+        lane_filter, lane_params = self._lanes(lanes)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM jobs WHERE state IN (?, ?){lane_filter}",
+                                    (QUEUED, RUNNING) + lane_params).fetchone()[0]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Job counts by lane and state"""
+        counts: Dict[str, Dict[str, int]] = {lane: {} for lane in self.lane_delays}
+        with self._lock:
+            for lane, state, count in self._db.execute("SELECT lane, state, COUNT(*) FROM jobs GROUP BY lane, state"):
+                counts.setdefault(lane, {})[state] = count
+        return counts
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+class WorkerPool:
+    """
+    ``workers`` async workers, each claiming one job at a time and running
+    ``agent.process_document`` on it while a heartbeat extends the lease.
+    Scale out by starting more pools (in more processes) on the same queue
+    database; ``lanes`` dedicates a pool to some lanes, e.g. keeping
+    workers free for instant-segment merchants. Queue calls run in a thread
+    so a busy database never stalls the event loop.
+    """
+
+    def __init__(self, agent, queue: JobQueue, workers: int = 4, lanes: Optional[Sequence[str]] = None,
+                 poll_interval: float = 0.5,
+                 permanent_errors: Tuple[Type[BaseException], ...] = (FileNotFoundError, IsADirectoryError,
+                                                                       UnsupportedDocumentError),
+                 name: Optional[str] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.agent = agent
+        self.queue = queue
+        self.workers = workers
+        self.lanes = tuple(lanes) if lanes else None
+        self.poll_interval = poll_interval
+        # Errors that no retry will fix; everything else is retried
+        self.permanent_errors = permanent_errors
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._wake = asyncio.Event()
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping.clear()
+        self._tasks = [asyncio.ensure_future(self._work(f"{self.name}:{number}")) for number in range(self.workers)]
+
+    async def stop(self, timeout: Optional[float] = None):
+        """
+        Let in-flight jobs finish (up to ``timeout`` seconds), then exit;
+        jobs still running after that are released back to the queue
+        """
+        self._stopping.set()
+        self._wake.set()
+        if not self._tasks:
+            return
+        _, running = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers now instead of at their next poll (same-process enqueues)"""
+        self._wake.set()
+
+    async def run_until_idle(self):
+        """Drain the pool's lanes, including retries still backing off, then stop"""
+        await self.start()
+        while await asyncio.to_thread(self.queue.pending, self.lanes):
+            await asyncio.sleep(self.poll_interval)
+        await self.stop()
+
+    async def _work(self, worker: str):
+        while not self._stopping.is_set():
+            job = await asyncio.to_thread(self.queue.claim, worker, self.lanes)
+            if job is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        labels = {"lane": job.lane}
+        self.agent.metrics.observe("job_wait_seconds", time.time() - job.enqueued, labels=labels)
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            result = await self.agent.process_document(job.document_path, job.merchant_id)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.release, job)
+            raise
+        except Exception as e:
+            retry = not isinstance(e, self.permanent_errors)
+            state = await asyncio.to_thread(self.queue.fail, job, f"{type(e).__name__}: {str(e)}", retry)
+            outcome = "retried" if state == QUEUED else "failed"
+            self.logger.warning(f"Job {job.id} attempt {job.attempts}/{job.max_attempts} failed ({outcome}): {str(e)}")
+        else:
+            await asyncio.to_thread(self.queue.complete, job, result.document_id)
+            outcome = "done"
+        finally:
+            heartbeat.cancel()
+        self.agent.metrics.increment("jobs_total", labels=dict(labels, outcome=outcome))
+
+    async def _heartbeat(self, job: Job):
+        interval = self.queue.visibility_timeout / 3
+        while True:
+            await asyncio.sleep(interval)
+            if not await asyncio.to_thread(self.queue.extend, job):
+                return
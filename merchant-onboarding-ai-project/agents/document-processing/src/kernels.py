@@ -0,0 +1,56 @@
+"""
+Document Processing Kernels
+CPU-bound stage implementations. Kept at module level so StageExecutor can
+ship them to process-pool workers; each takes the document bytes as a
+memoryview (batch kernels a list of them) and must not keep a reference
+to it after returning.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from executors import worker_model
+from page_index import PageFingerprint, fingerprint_page as _fingerprint_page
+
+def assess_quality(document: memoryview) -> float:
+    """Assess document image quality"""
+    model = worker_model("quality")
+    # Implement quality assessment logic with the preloaded model
+    return 0.95
+
+def classify_batch(documents: List[memoryview]) -> List[str]:
+    """
+    Classify a batch of documents with one model call, returning a
+    DocumentType value per document
+    """
+    model = worker_model("classify")
+    # Implement classification: stack per-document features into one array
+    # and run a single batched forward pass with the preloaded model
+    return ["business_license" for _ in documents]
+
+def extract_page(page: memoryview, doc_type: str, page_kind: str, mode: Optional[str],
+                 size: Optional[Tuple[int, int]]) -> Dict:
+    """
+    Extract structured data from one page, by OCR unless it is already text.
+    ``page`` holds UTF-8 text, raw pixels (``mode``/``size``) or a whole PDF,
+    depending on ``page_kind`` (see document_handle.Page). The extractor for
+    ``doc_type`` comes from the executor's extractor registry and is loaded
+    the first time this process sees that type.
+    """
+    return worker_model("extract").get(doc_type).extract_page(page, page_kind, mode, size)
+
+def fingerprint_page(page: memoryview, page_kind: str, mode: Optional[str],
+                     size: Optional[Tuple[int, int]]) -> PageFingerprint:
+    """Perceptual fingerprint of one page, for the cross-merchant page index"""
+    return _fingerprint_page(page, page_kind, mode, size)
+
+def detect_tampering(document: memoryview) -> List[str]:
+    """Detect fraud indicators that only need the raw file (metadata, edits)"""
+    model = worker_model("tamper")
+    # Implement file-level tamper checks with the preloaded model
+    return []
+
+def detect_fraud_batch(documents: List[memoryview], data: List[Dict]) -> List[List[str]]:
+    """Detect potential fraud indicators for a batch of documents in one model call"""
+    model = worker_model("fraud")
+    # Implement fraud detection: score the whole batch with the preloaded model
+    return [[] for _ in documents]
@@ -0,0 +1,54 @@
+"""
+Document Processing Metrics
+Pluggable metrics sinks; the default discards everything
+"""
+
+from typing import Dict, Optional, Tuple
+
+try:
+    import prometheus_client
+except ImportError:  # optional dependency
+    prometheus_client = None
+
+# Latency buckets (seconds) spanning cache hits through multi-page OCR
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricsSink:
+    """No-op metrics sink. Subclass and override to export metrics."""
+
+    def increment(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        """Add ``value`` to a counter"""
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """Record one observation in a histogram"""
+
+class PrometheusMetricsSink(MetricsSink):
+    """
+    Exports counters and histograms through prometheus_client
+    Metrics are created on first use; every call for a given name must use
+    the same label keys.
+    """
+
+    def __init__(self, namespace: str = "document_processing", registry=None,
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        if prometheus_client is None:
+            raise ImportError("PrometheusMetricsSink requires the prometheus_client package")
+        self.namespace = namespace
+        self.registry = registry if registry is not None else prometheus_client.REGISTRY
+        self.buckets = buckets
+        self._metrics = {}
+
+    def _metric(self, kind, name: str, labels: Dict[str, str]):
+        metric = self._metrics.get(name)
+        if metric is None:
+            options = {"buckets": self.buckets} if kind is prometheus_client.Histogram else {}
+            metric = kind(name, name.replace("_", " "), sorted(labels), namespace=self.namespace,
+                          registry=self.registry, **options)
+            self._metrics[name] = metric
+        return metric.labels(**labels) if labels else metric
+
+    def increment(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+        self._metric(prometheus_client.Counter, name, labels or {}).inc(value)
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        self._metric(prometheus_client.Histogram, name, labels or {}).observe(value)
@@ -0,0 +1,288 @@
+"""
+Document Processing Page Index
+Perceptual fingerprints of every processed page, so documents reused across
+merchant applications are recognised even after re-scanning, re-saving or
+light edits
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+try:
+    from PIL import Image
+except ImportError:  # optional dependency
+    Image = None
+
+HASH_BITS = 64
+_MASK = (1 << HASH_BITS) - 1
+_WORD = re.compile(r"\w+")
+# Text pages with fewer words than this are too generic to fingerprint
+MIN_TEXT_WORDS = 8
+SHINGLE_WORDS = 3
+
+@dataclass(frozen=True)
+class PageFingerprint:
+    """
+    ``digest`` is the SHA-256 of the decoded page (pixels or text) and only
+    matches identical pages; ``hash`` is a 64-bit dHash (image pages) or
+    SimHash (text pages) that stays within a few bits for near-duplicates.
+    ``hash`` is None for blank pages and undecoded PDFs.
+    """
+    kind: str
+    digest: str
+    hash: Optional[int] = None
+
+@dataclass(frozen=True)
+class PageMatch:
+    """Page ``page`` of the queried document resembles ``matched_page`` of ``content_hash``"""
+    page: int
+    content_hash: str
+    matched_page: int
+    distance: int
+
+def dhash(pixels: bytes, mode: str, size: Tuple[int, int]) -> Optional[int]:
+    """
+    Difference hash: shrink to 9x8 greyscale and record whether each pixel is
+    brighter than its right-hand neighbour
+    """
+    if Image is None:
+        raise ImportError("Fingerprinting image pages requires Pillow")
+    image = Image.frombuffer(mode, size, pixels, "raw", mode, 0, 1).convert("L")
+    thumb = image.resize((9, 8), Image.BOX, reducing_gap=2.0).tobytes()
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (thumb[row * 9 + column] > thumb[row * 9 + column + 1])
+    # A flat page (blank, or one solid colour) has no gradients to compare
+    return value or None
+
+def simhash(text: str) -> Optional[int]:
+    """
+    SimHash of overlapping word shingles; changing a few amounts or names
+    flips only a few bits
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_TEXT_WORDS:
+        return None
+    hashes = [
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    ]
+    # Majority vote per bit position, counted column-wise over the bit strings
+    half = len(hashes) / 2
+    columns = zip(*(format(value, "064b") for value in hashes))
+    return int("".join("1" if column.count("1") > half else "0" for column in columns), 2)
+
+def fingerprint_page(page: memoryview, page_kind: str, mode: Optional[str],
+                     size: Optional[Tuple[int, int]]) -> PageFingerprint:
+    """Fingerprint one decoded page (see document_handle.Page for the arguments)"""
+    digest = hashlib.sha256(page).hexdigest()
+    if page_kind == "image":
+        return PageFingerprint(page_kind, digest, dhash(page, mode, size))
+    if page_kind == "text":
+        return PageFingerprint(page_kind, digest, simhash(bytes(page).decode("utf-8", errors="replace")))
+    return PageFingerprint(page_kind, digest)
+
+def _signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+class PageHashIndex:
+    """
+    Near-duplicate page index across every merchant's submissions
+    Lookups use multi-index hashing: each 64-bit hash is split into
+    ``max_distance + 1`` bands, and by the pigeonhole principle any hash
+    within ``max_distance`` bits agrees exactly with the query on at least
+    one band. Only those bucket entries are compared, so a query touches a
+    handful of candidates rather than every page. Every addition is
+    persisted immediately, and the in-memory buckets pick up rows committed
+    by other agents sharing the file before each lookup.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_distance: int = 5):
+        if not 0 <= max_distance < HASH_BITS:
+            raise ValueError(f"max_distance must be between 0 and {HASH_BITS - 1}")
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        bounds = [HASH_BITS * band // bands for band in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in self._bands]
+        # Hashed pages by row: (content hash, page number, kind, hash)
+        self._pages: List[Tuple[str, int, str, int]] = []
+        # Signature by content hash
+        self._contents: Dict[str, str] = {}
+        self._signatures: Dict[str, str] = {}
+        self._merchants: Dict[str, Set[str]] = {}
+        # Highest rowid loaded per table; rowids only grow as nothing is deleted
+        self._loaded = {"contents": 0, "pages": 0, "submissions": 0}
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS contents ("
+            "content_hash TEXT PRIMARY KEY, signature TEXT NOT NULL, result_key TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "content_hash TEXT NOT NULL, page INTEGER NOT NULL, kind TEXT NOT NULL, digest TEXT NOT NULL, "
+            "hash INTEGER, PRIMARY KEY (content_hash, page))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            "content_hash TEXT NOT NULL, merchant_id TEXT NOT NULL, submitted REAL NOT NULL, "
+            "PRIMARY KEY (content_hash, merchant_id))"
+        )
+        self._db.commit()
+        with self._lock:
+            self._refresh()
+
+    def _refresh(self):
+        """Load rows committed since the last refresh, by this or any other agent sharing the file"""
+        loaded = self._loaded
+        for rowid, content_hash, signature in self._db.execute(
+            "SELECT rowid, content_hash, signature FROM contents WHERE rowid > ? ORDER BY rowid",
+            (loaded["contents"],),
+        ):
+            self._contents[content_hash] = signature
+            self._signatures.setdefault(signature, content_hash)
+            loaded["contents"] = rowid
+        for rowid, content_hash, page, kind, value in self._db.execute(
+            "SELECT rowid, content_hash, page, kind, hash FROM pages WHERE rowid > ? AND hash IS NOT NULL "
+            "ORDER BY rowid", (loaded["pages"],),
+        ):
+            self._remember_page(content_hash, page, kind, value & _MASK)
+            loaded["pages"] = rowid
+        for rowid, content_hash, merchant_id in self._db.execute(
+            "SELECT rowid, content_hash, merchant_id FROM submissions WHERE rowid > ? ORDER BY rowid",
+            (loaded["submissions"],),
+        ):
+            self._merchants.setdefault(content_hash, set()).add(merchant_id)
+            loaded["submissions"] = rowid
+
+    def _remember_page(self, content_hash: str, page: int, kind: str, value: int):
+        row = len(self._pages)
+        self._pages.append((content_hash, page, kind, value))
+        for buckets, (shift, mask) in zip(self._buckets, self._bands):
+            buckets.setdefault((value >> shift) & mask, []).append(row)
+
+    @staticmethod
+    def signature(fingerprints: Iterable[PageFingerprint]) -> str:
+        """Digest of the page sequence; equal for documents with identical decoded pages"""
+        digest = hashlib.sha256()
+        for fingerprint in fingerprints:
+            digest.update(f"{fingerprint.kind}:{fingerprint.digest};".encode("ascii"))
+        return digest.hexdigest()
+
+    def __contains__(self, content_hash: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return content_hash in self._contents
+
+    def add(self, content_hash: str, merchant_id: str, fingerprints: Optional[List[PageFingerprint]] = None,
+            result_key: Optional[str] = None, complete: bool = True):
+        """
+        Record that ``merchant_id`` submitted the document. Pages are indexed
+        the first time its content is seen; later calls only add the
+        submission and refresh ``result_key``. ``complete`` is False when
+        ``fingerprints`` cover only the first pages: they are still matched
+        as near-duplicates, but never found by ``find_exact``. Another agent
+        may index the same content concurrently, so inserts ignore rows that
+        already exist.
+        """
+        with self._lock:
+            self._refresh()
+            if fingerprints is not None and content_hash not in self._contents:
+                signature = self.signature(fingerprints) if complete else f"partial:{content_hash}"
+                self._db.execute("INSERT OR IGNORE INTO contents VALUES (?, ?, ?)",
+                                 (content_hash, signature, result_key))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO pages VALUES (?, ?, ?, ?, ?)",
+                    [(content_hash, number, fp.kind, fp.digest, None if fp.hash is None else _signed(fp.hash))
+                     for number, fp in enumerate(fingerprints)],
+                )
+            elif content_hash in self._contents and result_key is not None:
+                self._db.execute("UPDATE contents SET result_key = ? WHERE content_hash = ?", (result_key, content_hash))
+            elif content_hash not in self._contents:
+                return  # Nothing to match against until its pages are indexed
+
+            if merchant_id not in self._merchants.get(content_hash, ()):
+                self._db.execute("INSERT OR IGNORE INTO submissions VALUES (?, ?, ?)",
+                                 (content_hash, merchant_id, time.time()))
+            self._db.commit()
+            self._refresh()
+
+    def merchants(self, content_hash: str) -> Set[str]:
+        """Merchants that submitted exactly this document"""
+        with self._lock:
+            self._refresh()
+            return set(self._merchants.get(content_hash, ()))
+
+    def fingerprints(self, content_hash: str) -> List[PageFingerprint]:
+        """Stored page fingerprints of an indexed document (empty if unknown)"""
+        rows = self._db.execute(
+            "SELECT kind, digest, hash FROM pages WHERE content_hash = ? ORDER BY page", (content_hash,)
+        ).fetchall()
+        return [PageFingerprint(kind, digest, None if value is None else value & _MASK) for kind, digest, value in rows]
+
+    def find_exact(self, fingerprints: List[PageFingerprint]) -> Optional[str]:
+        """Content hash of an indexed document whose decoded pages are identical, if any"""
+        if not fingerprints:
+            return None
+        with self._lock:
+            self._refresh()
+            return self._signatures.get(self.signature(fingerprints))
+
+    def result_key(self, content_hash: str) -> Optional[str]:
+        """Result cache key the document was last processed under, by any agent"""
+        with self._lock:
+            row = self._db.execute("SELECT result_key FROM contents WHERE content_hash = ?",
+                                   (content_hash,)).fetchone()
+        return row[0] if row else None
+
+    def near_duplicates(self, fingerprints: List[PageFingerprint],
+                        max_distance: Optional[int] = None) -> List[PageMatch]:
+        """
+        Indexed pages within ``max_distance`` bits (at most the index's own
+        limit) of each hashed page, closest first
+        """
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        with self._lock:
+            self._refresh()
+        matches = []
+        for number, fingerprint in enumerate(fingerprints):
+            if fingerprint.hash is None:
+                continue
+            seen = set()
+            for buckets, (shift, mask) in zip(self._buckets, self._bands):
+                for row in buckets.get((fingerprint.hash >> shift) & mask, ()):
+                    if row in seen:
+                        continue
+                    seen.add(row)
+                    content_hash, page, kind, value = self._pages[row]
+                    distance = (value ^ fingerprint.hash).bit_count()
+                    if kind == fingerprint.kind and distance <= limit:
+                        matches.append(PageMatch(number, content_hash, page, distance))
+        matches.sort(key=lambda match: (match.distance, match.page))
+        return matches
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            if self._db is not None:
+                self._refresh()
+        return {
+            "documents": len(self._contents),
+            "hashed_pages": len(self._pages),
+            "submissions": sum(len(merchants) for merchants in self._merchants.values()),
+            "largest_bucket": max((len(rows) for buckets in self._buckets for rows in buckets.values()), default=0),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
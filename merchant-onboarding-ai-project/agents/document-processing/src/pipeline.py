@@ -0,0 +1,189 @@
+"""
+Document Processing Pipeline - Stage Graph
+Runs processing stages concurrently according to their declared dependencies
+"""
+
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+import time
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+@dataclass
+class StageTiming:
+    """
+    Wall-clock and CPU seconds spent in one stage.
+    CPU time is what the stage's kernels reported through record_cpu_time,
+    wherever they ran (inline or in a pool worker); loop-side glue is not
+    attributed, since concurrent stages interleave on the same thread.
+    """
+    wall_time: float = 0.0
+    cpu_time: float = 0.0
+
+_current_timing: ContextVar[Optional[StageTiming]] = ContextVar("current_stage_timing", default=None)
+
+def record_cpu_time(seconds: float):
+    """Attribute CPU seconds to the stage running in the current task"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.cpu_time += seconds
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    A single pipeline stage.
+    ``run`` receives the pipeline context (``document``, ``document_path``,
+    ``merchant_id``)
+    plus the outputs of every stage named in ``depends_on``, keyed by name.
+    """
+    name: str
+    run: StageFunc
+    depends_on: Tuple[str, ...] = ()
+
+class ShortCircuitPolicy:
+    """
+    Decides after each stage whether the remaining work is wasted.
+    The default never stops. ``check`` returns a reason to stop, or None;
+    on a stop, stages in ``skippable`` that haven't finished are skipped
+    (running ones are cancelled), along with anything that depends on them.
+    """
+    skippable: FrozenSet[str] = frozenset()
+
+    def check(self, stage: str, output: Any) -> Optional[str]:
+        return None
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages
+    A stage starts as soon as all of its dependencies have finished, so the
+    latency of a run is its critical path rather than the sum of all stages.
+    """
+
+    def __init__(self, stages: Iterable[Stage] = ()):
+        self._stages: Dict[str, Stage] = {}
+        for stage in stages:
+            self.add_stage(stage)
+
+    @property
+    def stages(self) -> List[Stage]:
+        return list(self._stages.values())
+
+    def add_stage(self, stage: Stage, replace: bool = False):
+        """Register a stage; set ``replace`` to swap out an existing one"""
+        if stage.name in self._stages and not replace:
+            raise ValueError(f"Stage already registered: {stage.name}")
+        self._stages[stage.name] = stage
+
+    def remove_stage(self, name: str):
+        """Unregister a stage; fails if other stages still depend on it"""
+        dependents = [s.name for s in self._stages.values() if name in s.depends_on]
+        if dependents:
+            raise ValueError(f"Stage {name} is required by: {', '.join(dependents)}")
+        del self._stages[name]
+
+    def validate(self) -> List[str]:
+        """Check for missing dependencies and cycles, returning a topological order"""
+        for stage in self._stages.values():
+            missing = [d for d in stage.depends_on if d not in self._stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage(s): {', '.join(missing)}")
+
+        order = []
+        indegree = {name: len(stage.depends_on) for name, stage in self._stages.items()}
+        ready = [name for name, degree in indegree.items() if degree == 0]
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for stage in self._stages.values():
+                if name in stage.depends_on:
+                    indegree[stage.name] -= 1
+                    if indegree[stage.name] == 0:
+                        ready.append(stage.name)
+
+        if len(order) != len(self._stages):
+            cyclic = sorted(set(self._stages) - set(order))
+            raise ValueError(f"Stage dependency cycle among: {', '.join(cyclic)}")
+        return order
+
+    async def _run_stage(self, stage: Stage, inputs: Dict[str, Any], timing: StageTiming) -> Any:
+        # Runs in its own task, so the context variable is private to this stage
+        _current_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            return await stage.run(inputs)
+        finally:
+            timing.wall_time = time.perf_counter() - start
+
+    async def run(self, context: Dict[str, Any],
+                  timings: Optional[Dict[str, StageTiming]] = None,
+                  policy: Optional[ShortCircuitPolicy] = None,
+                  skipped: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Execute every stage and return their outputs keyed by stage name.
+        Per-stage timings are written into ``timings``, and stages skipped by
+        ``policy`` into ``skipped`` (stage name -> reason), when given.
+        """
+        self.validate()
+        if timings is None:
+            timings = {}
+        if skipped is None:
+            skipped = {}
+
+        outputs: Dict[str, Any] = {}
+        waiting = dict(self._stages)
+        running: Dict[asyncio.Future, str] = {}
+
+        try:
+            while waiting or running:
+                # Launch every stage whose dependencies are satisfied
+                for name, stage in list(waiting.items()):
+                    if all(dep in outputs for dep in stage.depends_on):
+                        inputs = dict(context)
+                        inputs.update({dep: outputs[dep] for dep in stage.depends_on})
+                        timings[name] = StageTiming()
+                        task = asyncio.ensure_future(self._run_stage(stage, inputs, timings[name]))
+                        running[task] = name
+                        del waiting[name]
+                if not running:
+                    break
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task not in running:
+                        continue  # cancelled by a short-circuit earlier in this batch
+                    name = running.pop(task)
+                    outputs[name] = task.result()
+                    reason = policy.check(name, outputs[name]) if policy else None
+                    if reason:
+                        await self._short_circuit(reason, policy, waiting, running, skipped)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        return outputs
+
+    async def _short_circuit(self, reason: str, policy: ShortCircuitPolicy, waiting: Dict[str, Stage],
+                             running: Dict[asyncio.Future, str], skipped: Dict[str, str]):
+        """Skip unfinished skippable stages, then everything downstream of them"""
+        cancelled = [task for task, name in running.items() if name in policy.skippable]
+        for task in cancelled:
+            skipped[running.pop(task)] = reason
+            task.cancel()
+        if cancelled:
+            await asyncio.gather(*cancelled, return_exceptions=True)
+
+        for name in [name for name in waiting if name in policy.skippable]:
+            skipped[name] = reason
+            del waiting[name]
+
+        # Dependents of skipped stages can never run
+        blocked = True
+        while blocked:
+            blocked = [name for name, stage in waiting.items() if any(dep in skipped for dep in stage.depends_on)]
+            for name in blocked:
+                skipped[name] = reason
+                del waiting[name]
@@ -0,0 +1,113 @@
+"""
+Document Processing Result Cache
+Content-addressed cache of processing results with an in-memory LRU tier
+and an optional SQLite disk tier
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import logging
+import sqlite3
+import time
+
+class ResultCache:
+    """
+    Two-tier cache keyed by document content hash plus pipeline version
+    Entries are stored serialized, so callers always get a fresh object and
+    can't mutate a cached result in place. The disk tier evicts least
+    recently used entries once ``disk_max_bytes`` is exceeded; access times
+    are only rewritten once they are ``ACCESS_RESOLUTION`` seconds old, so
+    most disk hits stay reads.
+    """
+    ACCESS_RESOLUTION = 60.0
+
+    def __init__(self, version: str, serialize: Callable[[Any], str], deserialize: Callable[[str], Any],
+                 memory_entries: int = 1024, disk_path: Optional[str] = None,
+                 disk_max_bytes: int = 512 * 1024 * 1024):
+        self.version = version
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.logger = logging.getLogger(__name__)
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+
+        self._db = None
+        self._disk_bytes = 0
+        if disk_path:
+            self._db = sqlite3.connect(disk_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._db.commit()
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def key(self, content_hash: str) -> str:
+        """Cache key for a document's content hash (see DocumentHandle), scoped to the pipeline version"""
+        return hashlib.sha256(f"{self.version}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        payload = self._memory.get(key)
+        if payload is not None:
+            self._memory.move_to_end(key)
+            self._counters["memory_hits"] += 1
+        elif self._db is not None:
+            row = self._db.execute("SELECT payload, accessed FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                payload, accessed = row
+                now = time.time()
+                if now - accessed >= self.ACCESS_RESOLUTION:
+                    self._db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                self._remember(key, payload)
+                self._counters["disk_hits"] += 1
+
+        if payload is None:
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        return self.deserialize(payload)
+
+    def put(self, key: str, value: Any):
+        payload = self.serialize(value)
+        self._remember(key, payload)
+        if self._db is not None:
+            self._store(key, payload)
+
+    def _remember(self, key: str, payload: str):
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, key: str, payload: str):
+        size = len(payload.encode("utf-8"))
+        previous = self._db.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+        self._db.execute(
+            "INSERT OR REPLACE INTO results (key, payload, size, accessed) VALUES (?, ?, ?, ?)",
+            (key, payload, size, time.time()),
+        )
+        self._disk_bytes += size - (previous[0] if previous else 0)
+
+        # Evict least recently used entries until back under budget
+        while self._disk_bytes > self.disk_max_bytes:
+            oldest = self._db.execute("SELECT key, size FROM results ORDER BY accessed LIMIT 1").fetchone()
+            if oldest is None:
+                break
+            self._db.execute("DELETE FROM results WHERE key = ?", (oldest[0],))
+            self._disk_bytes -= oldest[1]
+            self._counters["evictions"] += 1
+        self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters plus current tier sizes"""
+        return dict(self._counters, memory_entries=len(self._memory), disk_bytes=self._disk_bytes)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,135 @@
+"""
+Document Processing Result Store
+Durable, append-only record of every processed document, keyed by stable
+content-derived IDs and indexed by merchant, document type and content hash
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import sqlite3
+import threading
+import time
+
+# Hex digits of the content hash kept in a document ID (96 bits)
+ID_HASH_CHARS = 24
+
+def document_id(merchant_id: str, document_type: str, content_hash: str) -> str:
+    """
+    Stable ID for a merchant's document: the same bytes always get the same
+    ID (so retries are idempotent) and two different files of the same type
+    never share one
+    """
+    return f"{merchant_id}_{document_type}_{content_hash[:ID_HASH_CHARS]}"
+
+# (document_id, merchant_id, document_type, content_hash, result)
+StoreEntry = Tuple[str, str, str, str, Any]
+
+class ResultStore:
+    """
+    Append-only SQLite store of processing results
+    Rows are never updated or deleted: writing a document ID that already
+    has a result under the current pipeline ``version`` is a no-op, and a
+    new version appends a row alongside the old one. Reads return the
+    latest row per document. Lookups by merchant, type and content hash
+    are each a single indexed query.
+    """
+
+    def __init__(self, version: str, serialize: Callable[[Any], str], deserialize: Callable[[str], Any],
+                 path: Optional[str] = None):
+        self.version = version
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self._lock = threading.Lock()
+        self._counters = {"writes": 0, "duplicates": 0, "hits": 0, "misses": 0}
+
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "document_id TEXT NOT NULL, version TEXT NOT NULL, merchant_id TEXT NOT NULL, "
+            "document_type TEXT NOT NULL, content_hash TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created REAL NOT NULL, PRIMARY KEY (document_id, version))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_merchant ON results (merchant_id, document_type)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS results_content ON results (content_hash, merchant_id)")
+        self._db.commit()
+
+    def put(self, document_id: str, merchant_id: str, document_type: str, content_hash: str, result: Any) -> bool:
+        """Store one result; False if the document already had one under this version"""
+        return self.put_many([(document_id, merchant_id, document_type, content_hash, result)]) == 1
+
+    def put_many(self, entries: Iterable[StoreEntry]) -> int:
+        """
+        Bulk upsert in a single transaction. Serialization happens before
+        the write lock is taken; returns the number of rows actually added.
+        """
+        now = time.time()
+        rows = [
+            (doc_id, self.version, merchant_id, document_type, content_hash, self.serialize(result), now)
+            for doc_id, merchant_id, document_type, content_hash, result in entries
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.commit()
+            added = self._db.total_changes - before
+            self._counters["writes"] += added
+            self._counters["duplicates"] += len(rows) - added
+        return added
+
+    def _fetch(self, query: str, params: Tuple) -> List[Any]:
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [self.deserialize(payload) for payload, in rows]
+
+    def get(self, document_id: str) -> Optional[Any]:
+        """Latest result for a document ID, under any pipeline version"""
+        found = self._fetch(
+            "SELECT payload FROM results WHERE document_id = ? ORDER BY rowid DESC LIMIT 1", (document_id,)
+        )
+        return found[0] if found else None
+
+    def find(self, merchant_id: str, content_hash: str) -> Optional[Any]:
+        """
+        Result already produced for these exact bytes from this merchant
+        under the current version, so a retried upload isn't reprocessed
+        """
+        found = self._fetch(
+            "SELECT payload FROM results WHERE content_hash = ? AND merchant_id = ? AND version = ? "
+            "ORDER BY rowid DESC LIMIT 1",
+            (content_hash, merchant_id, self.version),
+        )
+        self._counters["hits" if found else "misses"] += 1
+        return found[0] if found else None
+
+    def by_merchant(self, merchant_id: str, document_type: Optional[str] = None) -> List[Any]:
+        """A merchant's full document packet (optionally one type), latest result per document, oldest first"""
+        if document_type is None:
+            condition, params = "merchant_id = ?", (merchant_id,)
+        else:
+            condition, params = "merchant_id = ? AND document_type = ?", (merchant_id, document_type)
+        return self._fetch(
+            f"SELECT payload FROM results WHERE rowid IN "
+            f"(SELECT MAX(rowid) FROM results WHERE {condition} GROUP BY document_id) ORDER BY rowid",
+            params,
+        )
+
+    def by_content(self, content_hash: str) -> List[Any]:
+        """Latest result per document for every merchant that submitted these bytes"""
+        return self._fetch(
+            "SELECT payload FROM results WHERE rowid IN "
+            "(SELECT MAX(rowid) FROM results WHERE content_hash = ? GROUP BY document_id) ORDER BY rowid",
+            (content_hash,),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows, documents = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT document_id) FROM results").fetchone()
+        return dict(self._counters, rows=rows, documents=documents)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
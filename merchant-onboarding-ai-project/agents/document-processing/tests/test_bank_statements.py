@@ -0,0 +1,65 @@
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+from bank_statements import BankStatementExtractor, TransactionTable, cash_flow_features, parse_transaction_page
+
+SAMPLES = Path(__file__).resolve().parents[4] / "prototype" / "sample_documents"
+
+SPLIT_COLUMNS = """\
+Date        Description                     Deposits    Withdrawals   Balance
+02/02/2024  ACH DEPOSIT - CLIENT PAYMENT   $15,500.00               $60,730.18
+02/07/2024  CHECK #1001 - OFFICE RENT                  $4,200.00    $56,530.18
+"""
+
+SINGLE_COLUMN = """\
+12/30  WIRE TRANSFER - PROJECT FEE  $1,000.00  $3,000.00
+12/31  NSF FEE  $35.00  $2,965.00
+01/02  ACH DEPOSIT  $500.00  $3,465.00
+"""
+
+def test_unsigned_amounts_follow_the_header_columns():
+    page = parse_transaction_page(SPLIT_COLUMNS)
+    assert page["amount"] == [15500.0, 4200.0]
+    assert page["direction"] == [1, -1]
+    assert page["balance"] == [60730.18, 56530.18]
+    assert page["year"] == [2024, 2024]
+
+def test_single_column_signs_and_years_come_from_balance_and_period():
+    page = parse_transaction_page(SINGLE_COLUMN)
+    assert page["direction"] == [0, 0, 0]
+    table = TransactionTable.from_pages([page], period_start=date(2023, 12, 1), opening_balance=2000.0)
+    assert table.amount.tolist() == [1000.0, -35.0, 500.0]
+    assert np.datetime_as_string(table.date).tolist() == ["2023-12-30", "2023-12-31", "2024-01-02"]
+
+def test_explicit_signs_win_over_the_balance():
+    page = parse_transaction_page("01/03/2024  REFUND  +$20.00\n01/04/2024  FEE  ($5.00)\n")
+    assert TransactionTable.from_pages([page]).amount.tolist() == [20.0, -5.0]
+
+def test_cash_flow_features_of_the_sample_statement():
+    extractor = BankStatementExtractor()
+    fields = extractor.merge([extractor.parse_text((SAMPLES / "bank_statement.txt").read_text())])
+    features = fields["cash_flow"]
+    assert fields["opening_balance"] == 45230.18
+    assert features["transaction_count"] == 11
+    assert features["period_days"] == 29
+    assert features["total_deposits"] == 127450.0
+    assert features["total_withdrawals"] == 89340.25
+    assert features["negative_balance_days"] == 0
+    assert features["minimum_daily_balance"] == 45230.18
+    assert features["nsf_count"] == 0
+
+def test_opening_balance_is_worked_back_from_a_printed_balance():
+    page = parse_transaction_page("02/01/2024  DEPOSIT  +$100.00\n02/02/2024  FEE  -$50.00  $1,050.00\n")
+    features = cash_flow_features(TransactionTable.from_pages([page]))
+    assert features["minimum_daily_balance"] == 1050.0
+    assert features["average_daily_balance"] == 1075.0
+
+def test_balance_features_are_left_out_without_any_balance():
+    page = parse_transaction_page("02/01/2024  ACH DEPOSIT  +$15,500.00\n02/28/2024  NSF FEE  -$35.00\n")
+    features = cash_flow_features(TransactionTable.from_pages([page]), date(2024, 2, 1), date(2024, 2, 29))
+    assert "average_daily_balance" not in features
+    assert "negative_balance_days" not in features
+    assert features["total_deposits"] == 15500.0
+    assert features["nsf_count"] == 1
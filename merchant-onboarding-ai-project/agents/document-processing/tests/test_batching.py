@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+import pytest
+
+from batching import MicroBatcher
+
+class Recorder:
+    """Batch function doubling each item and recording the batches it saw"""
+
+    def __init__(self, error=None, drop=0):
+        self.batches = []
+        self.error = error
+        self.drop = drop
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        await asyncio.sleep(0)
+        if self.error:
+            raise self.error
+        return [item * 2 for item in items][self.drop:], 0.01 * len(items)
+
+def run(batcher, items):
+    async def main():
+        return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+    return asyncio.run(main())
+
+def test_full_batches_flush_without_waiting():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=2, max_wait_ms=10_000)
+    start = time.perf_counter()
+    assert run(batcher, [1, 2, 3, 4]) == [2, 4, 6, 8]
+    assert time.perf_counter() - start < 1
+    assert recorder.batches == [[1, 2], [3, 4]]
+    assert not batcher._tasks
+
+def test_partial_batch_flushes_after_max_wait():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=10, max_wait_ms=20)
+    start = time.perf_counter()
+    assert run(batcher, [1, 2, 3]) == [2, 4, 6]
+    assert time.perf_counter() - start >= 0.02
+    assert recorder.batches == [[1, 2, 3]]
+
+def test_leftover_items_flush_on_the_next_timer():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=2, max_wait_ms=5)
+    assert run(batcher, [1, 2, 3, 4, 5]) == [2, 4, 6, 8, 10]
+    assert recorder.batches == [[1, 2], [3, 4], [5]]
+
+def test_batch_errors_reach_every_waiter():
+    batcher = MicroBatcher(Recorder(error=RuntimeError("model server down")), max_batch_size=3)
+    results = run(batcher, [1, 2, 3])
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+def test_missing_results_fail_the_batch_instead_of_hanging():
+    batcher = MicroBatcher(Recorder(drop=1), max_batch_size=2)
+    results = run(batcher, [1, 2])
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_cancelled_callers_are_left_out_of_the_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher(recorder, max_batch_size=10, max_wait_ms=10)
+
+    async def main():
+        cancelled = asyncio.ensure_future(batcher.submit(1))
+        kept = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await kept
+
+    assert asyncio.run(main()) == 4
+    assert recorder.batches == [[2]]
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MicroBatcher(Recorder(), max_batch_size=0)
@@ -0,0 +1,50 @@
+import pytest
+
+from compact_results import (FORMAT_VERSION, CompactResult, IndicatorCodes, ResultBatch,
+                             pack_result, pack_results, unpack_result, unpack_results)
+from document_processor import DocumentType, ProcessingResult
+
+def make_result(indicators):
+    return ProcessingResult(
+        document_id="m1_business_license_abc", document_type=DocumentType.BUSINESS_LICENSE,
+        extracted_data={"business_name": "TechFlow Solutions LLC"}, confidence_score=0.9,
+        fraud_indicators=indicators, quality_score=0.95, processing_time=0.1,
+    )
+
+def test_indicators_beyond_the_bitmask_are_kept_as_strings(monkeypatch):
+    codes = IndicatorCodes(f"indicator_{number}" for number in range(IndicatorCodes.MAX_CODES - 1))
+    monkeypatch.setattr("compact_results.indicator_codes", codes)
+    indicators = ["indicator_3", "first_new", "second_new"]
+
+    compact = CompactResult.from_result(make_result(indicators))
+
+    assert compact.fraud_mask == 1 << 3 | 1 << (IndicatorCodes.MAX_CODES - 1)
+    assert compact.fraud_overflow == ("second_new",)
+    assert sorted(compact.fraud_indicators) == sorted(indicators)
+    assert sorted(unpack_result(pack_result(compact)).fraud_indicators) == sorted(indicators)
+
+    batch = ResultBatch.from_results([compact, CompactResult.from_result(make_result([]))])
+    assert batch.with_indicator("second_new").tolist() == [True, False]
+    assert batch.with_indicator("indicator_3").tolist() == [True, False]
+
+def test_long_indicator_names_round_trip():
+    name = "manual_review:" + "x" * 600
+    compact = CompactResult.from_result(make_result([name]))
+    [decoded] = unpack_results(pack_results([compact]))
+    assert decoded.fraud_indicators == [name]
+    assert FORMAT_VERSION == 2
+
+def test_querying_an_unknown_indicator_assigns_no_code(monkeypatch):
+    codes = IndicatorCodes(["reused_document"])
+    monkeypatch.setattr("compact_results.indicator_codes", codes)
+    batch = ResultBatch.from_results([CompactResult.from_result(make_result(["reused_document"]))])
+
+    assert batch.with_indicator("never_seen").tolist() == [False]
+    assert codes.lookup("never_seen") is None
+    assert batch.with_indicator("reused_document").tolist() == [True]
+
+def test_other_format_versions_are_rejected():
+    record = bytearray(pack_result(CompactResult.from_result(make_result([]))))
+    record[0] = 1
+    with pytest.raises(ValueError, match="version 1"):
+        unpack_result(bytes(record))
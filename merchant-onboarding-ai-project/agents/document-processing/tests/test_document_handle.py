@@ -0,0 +1,62 @@
+import mmap
+
+import pytest
+
+from document_handle import DocumentHandle
+from formats import PdfTextLayer, UnsupportedDocumentError, sniff_kind
+
+LINE = "Statement of account for TechFlow Solutions LLC, page {}"
+
+def write_pdf(path, page_texts):
+    """Uncompressed classic PDF with one text content stream per page"""
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    kids = []
+    for number, text in enumerate(page_texts):
+        page, content = 3 + 2 * number, 4 + 2 * number
+        kids.append(f"{page} 0 R")
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+        objects[page] = f"<< /Type /Page /Parent 2 0 R /Contents {content} 0 R >>".encode()
+        objects[content] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    body = b"%PDF-1.4\n" + b"".join(b"%d 0 obj\n%s\nendobj\n" % (number, objects[number]) for number in sorted(objects))
+    path.write_bytes(body + b"trailer\n<< /Root 1 0 R >>\n%%EOF\n")
+    return path
+
+def test_text_layer_pages_decode_lazily(tmp_path):
+    path = write_pdf(tmp_path / "statement.pdf", [LINE.format(number) for number in range(5)])
+    with DocumentHandle(str(path), page_window=2) as document:
+        assert document.page_count == 5
+        assert document.page(3).kind == "text"
+        assert document.page(3).buffer.decode() == LINE.format(3)
+        assert [page.number for page in document.iter_pages()] == [0, 1, 2, 3, 4]
+        assert len(document._pages) == 2
+
+def test_text_layer_reads_from_a_memory_map(tmp_path):
+    path = write_pdf(tmp_path / "statement.pdf", [LINE.format(1), LINE.format(2)])
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        layer = PdfTextLayer.open(data)
+        assert len(layer) == 2 and layer.page_text(1) == LINE.format(2)
+
+def test_pdf_without_text_layer_is_one_page_over_the_mapped_file(tmp_path):
+    path = write_pdf(tmp_path / "scan.pdf", [LINE.format(1), "7"])
+    with DocumentHandle(str(path)) as document:
+        assert document.page_count == 1
+        page = document.page(0)
+        assert page.kind == "pdf"
+        assert page.buffer is document.data
+
+def test_sniff_kind_only_calls_readable_bytes_text():
+    assert sniff_kind(b"%PDF-1.7\n") == "pdf"
+    assert sniff_kind(b"\x89PNG\r\n\x1a\n....") == "image"
+    assert sniff_kind("Geschäftsführer: Jürgen Müller\n".encode("utf-8")) == "text"
+    assert sniff_kind("Geschäftsführer: Jürgen Müller\n".encode("latin-1")) == "text"
+    # A multi-byte character split at the end of the sniffed head
+    assert sniff_kind("Straße".encode("utf-8")[:-3]) == "text"
+    assert sniff_kind(b"PK\x03\x04\x14\x00\x06\x00\x08\x00\x00\x00!\x00\xdf\xa4\xd2lZ\x01") == "unknown"
+    assert sniff_kind(bytes(range(256))) == "unknown"
+
+def test_unsupported_format_is_rejected(tmp_path):
+    path = tmp_path / "packet.docx"
+    path.write_bytes(b"PK\x03\x04" + bytes(range(256)) * 4)
+    with pytest.raises(UnsupportedDocumentError):
+        DocumentHandle(str(path))
@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+import pytest
+
+from executors import StageExecutor, worker_model
+
+# Pool workers unpickle these by reference, so they live at module level
+
+def load_model():
+    return {"loaded_in": os.getpid()}
+
+def read_buffer(view, suffix):
+    return bytes(view) + suffix, os.getpid(), worker_model("ocr")
+
+def read_buffers(views):
+    return [bytes(view) for view in views]
+
+@pytest.fixture
+def executor():
+    executor = StageExecutor({"ocr": 1}, model_loaders={"ocr": load_model})
+    yield executor
+    executor.shutdown()
+
+def test_pool_stages_read_the_document_from_shared_memory(executor):
+    async def main():
+        await executor.start()
+        return await executor.run("ocr", read_buffer, b"%PDF-1.7 statement", b"!")
+
+    data, pid, model = asyncio.run(main())
+    assert data == b"%PDF-1.7 statement!"
+    assert pid != os.getpid()
+    # The model was loaded once, by the worker's initializer
+    assert model == {"loaded_in": pid}
+
+def test_batches_share_one_segment(executor):
+    buffers = [b"first page", b"", b"third page"]
+    result, cpu_time = asyncio.run(executor.run_batch("ocr", read_buffers, buffers))
+    assert result == buffers
+    assert cpu_time >= 0
+
+def test_stages_without_a_pool_run_inline(executor):
+    data, pid, model = asyncio.run(executor.run("classify", read_buffer, b"abc", b"d"))
+    assert (data, pid) == (b"abcd", os.getpid())
+    # Inline stages see their own executor's models, not another stage's
+    assert model is None
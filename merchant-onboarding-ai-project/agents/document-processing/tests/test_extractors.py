@@ -0,0 +1,38 @@
+import asyncio
+from pathlib import Path
+
+from document_processor import DocumentProcessingAgent
+from extractors import GenericExtractor
+
+SAMPLES = Path(__file__).resolve().parents[4] / "prototype" / "sample_documents"
+
+class UpperCaseLicenseExtractor(GenericExtractor):
+    def parse_text(self, text):
+        fields = super().parse_text(text)
+        return {"custom": True, "business_name": fields["business_name"].upper()}
+
+def test_extractor_override_applies_to_text_documents():
+    agent = DocumentProcessingAgent({
+        "extractors": {"business_license": UpperCaseLicenseExtractor},
+        "result_cache": {"enabled": False},
+    })
+    try:
+        result = asyncio.run(agent.process_document(str(SAMPLES / "business_license.txt"), "m1"))
+    finally:
+        agent.close()
+    assert result.extracted_data == {"custom": True, "business_name": "TECHFLOW SOLUTIONS LLC"}
+
+def test_extractor_overrides_stay_with_their_agent():
+    custom = DocumentProcessingAgent({
+        "extractors": {"business_license": UpperCaseLicenseExtractor},
+        "result_cache": {"enabled": False},
+    })
+    plain = DocumentProcessingAgent({"result_cache": {"enabled": False}})
+    try:
+        asyncio.run(custom.process_document(str(SAMPLES / "business_license.txt"), "m1"))
+        result = asyncio.run(plain.process_document(str(SAMPLES / "business_license.txt"), "m1"))
+    finally:
+        custom.close()
+        plain.close()
+    assert "custom" not in result.extracted_data
+    assert result.extracted_data["business_name"] == "TechFlow Solutions LLC"
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+
+from formats import UnsupportedDocumentError
+from job_queue import DONE, FAILED, QUEUED, JobQueue, WorkerPool
+from metrics import MetricsSink
+
+class FailingAgent:
+    """Stands in for DocumentProcessingAgent: every document raises ``error``"""
+
+    def __init__(self, error):
+        self.error = error
+        self.metrics = MetricsSink()
+        self.calls = 0
+
+    async def process_document(self, document_path, merchant_id):
+        self.calls += 1
+        raise self.error
+
+def test_claims_are_exclusive_across_connections(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    producer = JobQueue(path)
+    producer.enqueue_many([f"doc{number}.pdf" for number in range(40)], "m1")
+    claimed, errors = [], []
+
+    def drain(name):
+        queue = JobQueue(path)
+        try:
+            while (job := queue.claim(name)) is not None:
+                claimed.append(job.id)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            queue.close()
+
+    threads = [threading.Thread(target=drain, args=(f"w{number}",)) for number in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    producer.close()
+    assert not errors
+    assert sorted(claimed) == list(range(1, 41))
+
+def test_expired_lease_is_reclaimed():
+    queue = JobQueue(visibility_timeout=0.05)
+    queue.enqueue("doc.pdf", "m1")
+    first = queue.claim("w1")
+    assert queue.claim("w2") is None
+    time.sleep(0.06)
+    second = queue.claim("w2")
+    assert second.id == first.id and second.attempts == 2
+    # The first worker's lease is gone; only the new holder can finish the job
+    assert not queue.complete(first, "result-1")
+    assert queue.complete(second, "result-2")
+    assert queue.get(first.id).state == DONE
+
+def test_backoff_then_failed_after_max_attempts():
+    queue = JobQueue(max_attempts=2, backoff=0.05)
+    job_id = queue.enqueue("doc.pdf", "m1")
+    assert queue.fail(queue.claim("w1"), "boom") == QUEUED
+    # Still backing off
+    assert queue.claim("w1") is None
+    time.sleep(0.06)
+    job = queue.claim("w1")
+    assert job.id == job_id and job.attempts == 2
+    assert queue.fail(job, "boom") == FAILED
+    assert queue.get(job_id).error == "boom"
+    assert queue.pending() == 0
+
+def test_permanent_errors_skip_retries():
+    queue = JobQueue(max_attempts=3, backoff=0.001)
+    agent = FailingAgent(UnsupportedDocumentError("not a document"))
+    job_id = queue.enqueue("doc.bin", "m1")
+    asyncio.run(WorkerPool(agent, queue, workers=1, poll_interval=0.01).run_until_idle())
+    job = queue.get(job_id)
+    assert (job.state, job.attempts, agent.calls) == (FAILED, 1, 1)
+
+def test_other_errors_are_retried_until_out_of_attempts():
+    queue = JobQueue(max_attempts=3, backoff=0.001)
+    agent = FailingAgent(RuntimeError("model server unavailable"))
+    job_id = queue.enqueue("doc.pdf", "m1")
+    asyncio.run(WorkerPool(agent, queue, workers=1, poll_interval=0.01).run_until_idle())
+    job = queue.get(job_id)
+    assert (job.state, job.attempts, agent.calls) == (FAILED, 3, 3)
+
+def test_higher_priority_lanes_are_claimed_first():
+    queue = JobQueue()
+    review = queue.enqueue("review.pdf", "m1", lane="enhanced_review")
+    fast = queue.enqueue("fast.pdf", "m2", lane="fast_track")
+    instant = queue.enqueue("instant.pdf", "m3", lane="instant")
+    assert [queue.claim("w1").id for _ in range(3)] == [instant, fast, review]
+
+def test_waiting_jobs_overtake_new_instant_jobs():
+    queue = JobQueue(lane_delays={"instant": 0.0, "fast_track": 0.05})
+    fast = queue.enqueue("fast.pdf", "m1", lane="fast_track")
+    time.sleep(0.06)
+    queue.enqueue("instant.pdf", "m2", lane="instant")
+    assert queue.claim("w1").id == fast
@@ -0,0 +1,60 @@
+import asyncio
+
+from document_handle import DocumentHandle
+from document_processor import DocumentProcessingAgent
+from metrics import MetricsSink
+
+PAGE = "Merchant application page {} for TechFlow Solutions LLC, 1247 Innovation Drive, San Francisco"
+
+class RecordingSink(MetricsSink):
+    def __init__(self):
+        self.outcomes = []
+
+    def increment(self, name, value=1.0, labels=None):
+        if name == "documents_total":
+            self.outcomes.append(labels["outcome"])
+
+def process(paths, config):
+    sink = RecordingSink()
+    agent = DocumentProcessingAgent(dict(config, metrics_sink=sink, result_store={"enabled": False}))
+    try:
+        for merchant, path in enumerate(paths):
+            asyncio.run(agent.process_document(str(path), f"m{merchant}"))
+        return agent, sink.outcomes
+    finally:
+        agent.close()
+
+def write_pages(path, *pages):
+    path.write_text("\f".join(PAGE.format(page) for page in pages))
+    return path
+
+def test_fingerprints_are_bounded_to_max_pages(tmp_path):
+    document = write_pages(tmp_path / "long.txt", *range(6))
+    agent, _ = process([document], {"page_index": {"enabled": True, "max_pages": 2}})
+    assert agent.page_index.stats()["hashed_pages"] == 2
+
+def test_partial_fingerprints_never_prove_a_duplicate(tmp_path):
+    first = write_pages(tmp_path / "a.txt", 1, 2, 3)
+    second = write_pages(tmp_path / "b.txt", 1, 2, 4)
+    _, outcomes = process([first, second], {"page_index": {"enabled": True, "max_pages": 2}})
+    assert outcomes == ["processed", "processed"]
+
+def test_agents_sharing_one_index_file(tmp_path):
+    config = {"page_index": {"path": str(tmp_path / "pages.db")}, "result_store": {"enabled": False}}
+    first, second = DocumentProcessingAgent(config), DocumentProcessingAgent(config)
+    original = write_pages(tmp_path / "original.txt", 1, 2)
+    # Shares its first page with the original
+    edited = write_pages(tmp_path / "edited.txt", 1, 3)
+    try:
+        # Both agents opened the index before either one indexed the document
+        asyncio.run(first.process_document(str(original), "m1"))
+        asyncio.run(second.process_document(str(original), "m2"))
+        result = asyncio.run(second.process_document(str(edited), "m3"))
+        with DocumentHandle(str(original)) as document:
+            content_hash = document.content_hash
+        assert first.page_index.merchants(content_hash) == {"m1", "m2"}
+        assert "reused_document" in result.fraud_indicators
+        assert first.page_index.stats()["documents"] == 2
+    finally:
+        first.close()
+        second.close()
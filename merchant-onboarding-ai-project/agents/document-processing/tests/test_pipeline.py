@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from pipeline import ShortCircuitPolicy, Stage, StageGraph
+
+def recording_stage(name, log, depends_on=(), delay=0.0, output=None):
+    async def run(inputs):
+        log.append(("start", name))
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(("cancelled", name))
+            raise
+        log.append(("end", name))
+        return output if output is not None else {dep: inputs[dep] for dep in depends_on} or name
+    return Stage(name, run, depends_on)
+
+class StopAfter(ShortCircuitPolicy):
+    def __init__(self, stage, skippable):
+        self.stage = stage
+        self.skippable = frozenset(skippable)
+
+    def check(self, stage, output):
+        return "stop" if stage == self.stage else None
+
+def test_stages_start_once_their_dependencies_finish():
+    log = []
+    graph = StageGraph([
+        recording_stage("quality", log, delay=0.01),
+        recording_stage("classify", log, delay=0.02),
+        recording_stage("extract", log, ("classify",)),
+        recording_stage("fraud", log, ("extract", "quality")),
+    ])
+    outputs = asyncio.run(graph.run({"document": None}))
+
+    assert log.index(("start", "extract")) > log.index(("end", "classify"))
+    assert log.index(("start", "fraud")) > max(log.index(("end", "extract")), log.index(("end", "quality")))
+    # Independent stages overlap
+    assert log.index(("start", "classify")) < log.index(("end", "quality"))
+    assert outputs["fraud"] == {"extract": {"classify": "classify"}, "quality": "quality"}
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    async def noop(inputs):
+        return None
+    with pytest.raises(ValueError, match="unknown stage"):
+        StageGraph([Stage("extract", noop, ("classify",))]).validate()
+    with pytest.raises(ValueError, match="cycle among: a, b"):
+        StageGraph([Stage("a", noop, ("b",)), Stage("b", noop, ("a",))]).validate()
+    with pytest.raises(ValueError, match="required by"):
+        StageGraph([Stage("a", noop), Stage("b", noop, ("a",))]).remove_stage("a")
+
+def test_short_circuit_cancels_running_and_skips_downstream_stages():
+    log = []
+    graph = StageGraph([
+        recording_stage("quality", log),
+        recording_stage("fraud", log, delay=10),
+        recording_stage("extract", log, delay=10),
+        recording_stage("confidence", log, ("extract",)),
+        recording_stage("report", log, ("quality",)),
+    ])
+    skipped, timings = {}, {}
+    outputs = asyncio.run(graph.run({}, timings, StopAfter("quality", {"fraud", "extract"}), skipped))
+
+    assert skipped == {"fraud": "stop", "extract": "stop", "confidence": "stop"}
+    assert {("cancelled", "fraud"), ("cancelled", "extract")} <= set(log)
+    assert ("start", "confidence") not in log
+    # Stages that aren't skippable still run
+    assert set(outputs) == {"quality", "report"}
+    assert set(timings) == {"quality", "fraud", "extract", "report"}
+
+def test_a_failing_stage_cancels_the_others():
+    log = []
+
+    async def broken(inputs):
+        raise RuntimeError("model crashed")
+
+    graph = StageGraph([recording_stage("slow", log, delay=10), Stage("broken", broken)])
+    with pytest.raises(RuntimeError, match="model crashed"):
+        asyncio.run(graph.run({}))
+    assert ("cancelled", "slow") in log
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from document_processor import DocumentProcessingAgent
+
+class SlowDocuments:
+    """Stands in for process_document, tracking how many documents are in flight"""
+
+    def __init__(self, fail=None):
+        self.in_flight = 0
+        self.peak = 0
+        self.cancelled = 0
+        self.fail = fail
+
+    async def __call__(self, document_path, merchant_id):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.001 * (int(document_path) % 3))
+            if document_path == self.fail:
+                raise RuntimeError(f"cannot read {document_path}")
+            return document_path
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+@pytest.fixture
+def agent():
+    agent = DocumentProcessingAgent({"batch_concurrency": 3, "result_cache": {"enabled": False}})
+    yield agent
+    agent.close()
+
+def collect(agent, paths):
+    async def main():
+        return [result async for result in agent.process_batch(paths, "m1")]
+    return asyncio.run(main())
+
+def test_at_most_batch_concurrency_documents_are_in_flight(agent):
+    documents = SlowDocuments()
+    agent.process_document = documents
+
+    def paths():
+        for number in range(20):
+            # Never more than the bound ahead of the results handed out
+            assert number - len(results) <= agent.batch_concurrency
+            yield str(number)
+
+    async def main():
+        async for result in agent.process_batch(paths(), "m1"):
+            results.append(result)
+
+    results = []
+    asyncio.run(main())
+    assert sorted(results, key=int) == [str(number) for number in range(20)]
+    assert documents.peak == agent.batch_concurrency
+
+def test_a_failed_document_cancels_the_rest(agent):
+    documents = SlowDocuments(fail="4")
+    agent.process_document = documents
+    with pytest.raises(RuntimeError, match="cannot read 4"):
+        collect(agent, (str(number) for number in range(20)))
+    assert documents.in_flight == 0
+
+def test_stopping_early_cancels_documents_in_flight(agent):
+    documents = SlowDocuments()
+    agent.process_document = documents
+
+    async def main():
+        batch = agent.process_batch((str(number) for number in range(20)), "m1")
+        first = await batch.__anext__()
+        await batch.aclose()
+        return first
+
+    assert asyncio.run(main()) is not None
+    assert documents.in_flight == 0
+    assert documents.cancelled > 0
+
+def test_concurrency_must_be_positive(agent):
+    agent.batch_concurrency = 0
+    with pytest.raises(ValueError):
+        collect(agent, ["0"])
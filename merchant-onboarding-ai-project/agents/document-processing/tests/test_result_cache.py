@@ -0,0 +1,64 @@
+import json
+
+from result_cache import ResultCache
+
+def cache(tmp_path=None, version="v1", **options):
+    return ResultCache(version, json.dumps, json.loads,
+                       disk_path=str(tmp_path / "cache.db") if tmp_path else None, **options)
+
+def test_keys_are_scoped_to_the_pipeline_version():
+    assert cache().key("abc") == cache().key("abc")
+    assert cache().key("abc") != cache(version="v2").key("abc")
+    assert cache().key("abc") != cache().key("abd")
+
+def test_entries_are_copies_and_memory_is_lru():
+    results = cache(memory_entries=2)
+    results.put("a", {"fields": [1]})
+    results.get("a")["fields"].append(2)
+    assert results.get("a") == {"fields": [1]}
+
+    results.put("b", {})
+    results.get("a")
+    results.put("c", {})
+    assert results.get("b") is None
+    assert results.stats()["memory_entries"] == 2
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    first = cache(tmp_path)
+    first.put("a", {"score": 0.9})
+    first.close()
+
+    second = cache(tmp_path)
+    assert second.get("a") == {"score": 0.9}
+    assert second.get("a") == {"score": 0.9}
+    stats = second.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 0)
+    second.close()
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("result_cache.time.time", lambda: now[0])
+    results = cache(tmp_path, memory_entries=0, disk_max_bytes=250)
+    payload = {"text": "x" * 100}
+    results.put("a", payload)
+    now[0] += 100
+    results.put("b", payload)
+    now[0] += 100
+    assert results.get("a") == payload  # Refreshes a's access time
+    now[0] += 100
+    results.put("c", payload)
+
+    assert results.get("b") is None
+    assert results.get("a") == payload and results.get("c") == payload
+    assert results.stats()["evictions"] == 1
+    results.close()
+
+def test_recent_disk_hits_do_not_write(tmp_path):
+    results = cache(tmp_path, memory_entries=0)
+    results.put("a", {})
+    statements = []
+    results._db.set_trace_callback(statements.append)
+    for _ in range(3):
+        assert results.get("a") == {}
+    assert not [statement for statement in statements if statement.startswith("UPDATE")]
+    results.close()
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import shutil
+from pathlib import Path
+
+from document_processor import DocumentProcessingAgent
+from result_store import ResultStore, document_id
+
+SAMPLES = Path(__file__).resolve().parents[4] / "prototype" / "sample_documents"
+
+def store(tmp_path, version="v1"):
+    return ResultStore(version, json.dumps, json.loads, str(tmp_path / "results.db"))
+
+def test_document_ids_follow_the_content():
+    assert document_id("m1", "bank_statement", "ab" * 32) == document_id("m1", "bank_statement", "ab" * 32)
+    assert document_id("m1", "bank_statement", "ab" * 32) != document_id("m1", "bank_statement", "ac" * 32)
+    assert document_id("m1", "bank_statement", "ab" * 32) != document_id("m2", "bank_statement", "ab" * 32)
+
+def test_repeated_put_is_a_no_op(tmp_path):
+    results = store(tmp_path)
+    assert results.put("m1_license_1", "m1", "license", "h1", {"attempt": 1})
+    assert not results.put("m1_license_1", "m1", "license", "h1", {"attempt": 2})
+    assert results.get("m1_license_1") == {"attempt": 1}
+    assert results.stats()["rows"] == 1 and results.stats()["duplicates"] == 1
+    results.close()
+
+def test_a_new_version_appends_and_reads_return_the_latest(tmp_path):
+    first = store(tmp_path)
+    first.put("m1_license_1", "m1", "license", "h1", {"version": 1})
+    first.close()
+    second = store(tmp_path, "v2")
+    assert second.find("m1", "h1") is None
+    second.put("m1_license_1", "m1", "license", "h1", {"version": 2})
+    assert second.get("m1_license_1") == {"version": 2}
+    assert second.by_merchant("m1") == [{"version": 2}]
+    assert second.stats()["rows"] == 2 and second.stats()["documents"] == 1
+    second.close()
+
+def test_lookups_by_merchant_type_and_content(tmp_path):
+    results = store(tmp_path)
+    results.put_many([
+        ("m1_license_1", "m1", "license", "h1", {"doc": "license"}),
+        ("m1_statement_2", "m1", "statement", "h2", {"doc": "statement"}),
+        ("m2_license_1", "m2", "license", "h1", {"doc": "m2 license"}),
+    ])
+    assert results.by_merchant("m1") == [{"doc": "license"}, {"doc": "statement"}]
+    assert results.by_merchant("m1", "statement") == [{"doc": "statement"}]
+    assert results.by_content("h1") == [{"doc": "license"}, {"doc": "m2 license"}]
+    assert results.find("m2", "h1") == {"doc": "m2 license"}
+    assert results.find("m2", "h2") is None
+    results.close()
+
+def test_same_bytes_get_the_same_id_and_are_not_reprocessed(tmp_path):
+    copy = tmp_path / "copy.txt"
+    shutil.copy(SAMPLES / "business_license.txt", copy)
+    agent = DocumentProcessingAgent({"result_cache": {"enabled": False},
+                                     "result_store": {"path": str(tmp_path / "results.db")}})
+    try:
+        first = asyncio.run(agent.process_document(str(SAMPLES / "business_license.txt"), "m1"))
+        retried = asyncio.run(agent.process_document(str(copy), "m1"))
+        other = asyncio.run(agent.process_document(str(copy), "m2"))
+        assert retried.document_id == first.document_id
+        assert retried.stage_timings == {}
+        assert other.document_id != first.document_id
+        assert agent.result_store.stats()["rows"] == 2
+    finally:
+        agent.close()
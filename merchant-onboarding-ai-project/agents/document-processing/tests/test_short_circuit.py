@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from document_processor import REUSED_DOCUMENT, DocumentProcessingAgent, DocumentShortCircuitPolicy
+
+def test_required_stages_cannot_be_skipped():
+    with pytest.raises(ValueError, match="classify"):
+        DocumentShortCircuitPolicy.from_config({"min_quality": 0.4, "skippable": ["classify", "extract"]})
+
+def test_skippable_stages_are_configurable():
+    policy = DocumentShortCircuitPolicy.from_config({"min_quality": 0.4, "skippable": ["fraud"]})
+    assert policy.skippable == frozenset({"fraud"})
+
+def test_reuse_is_reported_when_fraud_scoring_is_skipped(tmp_path):
+    document = tmp_path / "statement.txt"
+    document.write_text("Merchant application for TechFlow Solutions LLC, 1247 Innovation Drive, San Francisco")
+    agent = DocumentProcessingAgent({
+        "page_index": {"enabled": True},
+        "result_cache": {"enabled": False},
+        "result_store": {"enabled": False},
+        # Every document falls below this, so fraud scoring never runs
+        "short_circuit": {"min_quality": 0.99},
+    })
+    try:
+        first = asyncio.run(agent.process_document(str(document), "m1"))
+        second = asyncio.run(agent.process_document(str(document), "m2"))
+    finally:
+        agent.close()
+    assert "fraud" in second.skipped_stages
+    assert first.fraud_indicators == []
+    assert second.fraud_indicators == [REUSED_DOCUMENT]
@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+from document_processor import DocumentProcessingAgent
+from executors import StageExecutor
+from metrics import MetricsSink
+from pipeline import Stage, StageGraph, record_cpu_time
+
+class RecordingSink(MetricsSink):
+    def __init__(self):
+        self.counters = []
+        self.observations = []
+
+    def increment(self, name, value=1.0, labels=None):
+        self.counters.append((name, value, labels))
+
+    def observe(self, name, value, labels=None):
+        self.observations.append((name, value, labels))
+
+def busy(view, seconds):
+    # Module level so the pool worker can unpickle it
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        pass
+    return len(view)
+
+def test_cpu_time_is_attributed_to_the_reporting_stage():
+    async def ocr(inputs):
+        record_cpu_time(0.25)
+        await asyncio.sleep(0)
+        record_cpu_time(0.5)
+
+    async def fetch(inputs):
+        await asyncio.sleep(0.02)
+
+    timings = {}
+    asyncio.run(StageGraph([Stage("ocr", ocr), Stage("fetch", fetch)]).run({}, timings))
+
+    assert timings["ocr"].cpu_time == 0.75
+    assert timings["fetch"].cpu_time == 0.0
+    assert timings["fetch"].wall_time >= 0.02
+    # Outside a stage there is nothing to attribute to
+    record_cpu_time(1.0)
+
+def test_worker_cpu_time_is_attributed_to_the_calling_stage():
+    executor = StageExecutor({"ocr": 1})
+
+    async def ocr(inputs):
+        return await executor.run("ocr", busy, b"page", 0.05)
+
+    async def classify(inputs):
+        return await executor.run("classify", busy, b"page", 0.02)
+
+    async def wait(inputs):
+        await asyncio.sleep(0.05)
+
+    timings = {}
+    try:
+        asyncio.run(StageGraph([Stage("ocr", ocr), Stage("classify", classify), Stage("wait", wait)]).run({}, timings))
+    finally:
+        executor.shutdown()
+
+    assert timings["ocr"].cpu_time >= 0.05
+    assert 0.02 <= timings["classify"].cpu_time < timings["ocr"].cpu_time
+    assert timings["wait"].cpu_time < 0.01
+    assert timings["wait"].wall_time >= 0.05
+
+def test_stage_timings_reach_the_metrics_sink(tmp_path):
+    document = tmp_path / "application.txt"
+    document.write_text("Merchant application for TechFlow Solutions LLC, 1247 Innovation Drive, San Francisco")
+    sink = RecordingSink()
+    agent = DocumentProcessingAgent({
+        "metrics_sink": sink,
+        "result_cache": {"enabled": False},
+        "result_store": {"enabled": False},
+    })
+    try:
+        result = asyncio.run(agent.process_document(str(document), "m1"))
+    finally:
+        agent.close()
+
+    doc_type = result.document_type.value
+    assert ("documents_total", 1.0, {"document_type": doc_type, "outcome": "processed"}) in sink.counters
+    for stage, timing in result.stage_timings.items():
+        labels = {"document_type": doc_type, "stage": stage}
+        assert ("stage_seconds", timing.wall_time, labels) in sink.observations
+        assert ("stage_cpu_seconds", timing.cpu_time, labels) in sink.observations
+    observed_stages = {labels["stage"] for name, _, labels in sink.observations if name == "stage_seconds"}
+    assert observed_stages == set(result.stage_timings) != set()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Degradation Engine Benchmark
+Times the engine against the per-image PIL rotate + blur path the sample
+generators used before it, per page and across batch sizes, as JSON
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from degradation import SCANNER_ARTEFACTS, DegradationConfig, degrade_images
+
+def sample_page(width=850, height=1100):
+    """A letter-size page of text lines, like the generated documents"""
+    img = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(img)
+    for y in range(60, height - 60, 22):
+        draw.text((60, y), "ACME MERCHANT SERVICES  Statement 2024-02  Balance $12,345.67  " * 2, fill="black")
+    return img
+
+def legacy_ocr_challenges(img, rotation, blur_radius):
+    """The generators' old add_ocr_challenges, with the blur always applied"""
+    img = img.rotate(random.uniform(-rotation, rotation), expand=True, fillcolor="white")
+    return img.filter(ImageFilter.GaussianBlur(radius=blur_radius))
+
+def seconds_per_page(run, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return round(best / pages, 4)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--pages", type=int, default=16,
+                        help="Pages per timed run, so random effects average out at every batch size")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    page = sample_page()
+    rotate_blur = {"rotation": 1.5, "blur_probability": 1.0, "blur_sigma": (0.3, 0.3)}
+    configs = {
+        "rotate_blur_nearest": DegradationConfig(resample="nearest", **rotate_blur),
+        "rotate_blur_bilinear": DegradationConfig(**rotate_blur),
+        "scanner_artefacts": SCANNER_ARTEFACTS,
+    }
+    report = {
+        "benchmark": "degradation",
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "page_size": list(page.size),
+        "legacy_pil_seconds_per_page": seconds_per_page(
+            lambda: [legacy_ocr_challenges(page, 1.5, 0.3) for _ in range(args.pages)], args.pages, args.repeat),
+        "engine_seconds_per_page": {},
+    }
+    print(f"legacy PIL rotate+blur: {report['legacy_pil_seconds_per_page']:.4f}s/page")
+    for name, config in configs.items():
+        timings = {}
+        for batch_size in args.batch_sizes:
+            rng = np.random.default_rng(0)
+            timings[str(batch_size)] = seconds_per_page(
+                lambda: degrade_images([page] * args.pages, config, rng, batch_size), args.pages, args.repeat)
+        report["engine_seconds_per_page"][name] = timings
+        print(f"{name:<22} " + "  ".join(f"batch {size}: {value:.4f}s/page" for size, value in timings.items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote report: {args.output}")
+
+if __name__ == "__main__":
+    main()
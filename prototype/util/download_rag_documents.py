@@ -5,9 +5,17 @@ Downloads regulatory documents for merchant onboarding AI knowledge base
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import hashlib
 import os
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import time
+from urllib.parse import urlparse
+
+import rag_manifest
+from rag_manifest import DocumentManifest
 
 # Document URLs and metadata
 DOCUMENTS = {
@@ -56,83 +64,186 @@ DOCUMENTS = {
     ]
 }
 
-def download_file(url, filepath, description):
-    """Download file with error handling and progress"""
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+CHUNK_SIZE = 64 * 1024
+MAX_WORKERS = 8
+# Simultaneous requests per host - be respectful to servers
+PER_HOST_LIMIT = 2
+def create_session(pool_size=MAX_WORKERS):
+    """One pooled, keep-alive session shared by all download threads"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers['User-Agent'] = USER_AGENT
+    return session
+
+def file_checksum(filepath, digest=None):
+    """(size, SHA-256 hasher) of a file read in CHUNK_SIZE blocks"""
+    digest = digest or hashlib.sha256()
+    size = 0
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest
+
+def download_file(url, filepath, description, session=None, entry=None, record_partial=None):
+    """
+    Download ``url`` to ``filepath``; returns (status, manifest fields).
+    ``entry`` is the document's previous manifest entry, if any. status is
+    "downloaded", "not_modified" or "failed"; the fields (size, sha256,
+    etag, ...) are what changed and belong in the manifest. The body streams
+    into ``<filepath>.part`` and is renamed into place only once complete,
+    so ``filepath`` is never partial. An interrupted ``.part`` is resumed
+    with a Range request when the server still has the same version, and an
+    existing file is revalidated with If-None-Match/If-Modified-Since.
+    ``record_partial`` is called with the ``.part`` file's validators before
+    the body streams, so a later run can resume even if this one is killed.
+    """
+    session = session or create_session(1)
+    entry = entry or {}
+    filepath = Path(filepath)
+    part_path = filepath.with_name(filepath.name + ".part")
+    headers = {}
+
+    if filepath.exists():
+        if not (entry.get('etag') or entry.get('last_modified')):
+            # Placed by hand (see manual_download_list.txt); nothing to revalidate against
+            print(f"File exists, skipping: {filepath}")
+            if entry.get('sha256'):
+                return "not_modified", {}
+            size, digest = file_checksum(filepath)
+            return "not_modified", {'size': size, 'sha256': digest.hexdigest()}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    resume_from = part_path.stat().st_size if part_path.exists() else 0
+    partial_validator = entry.get('partial_etag') or entry.get('partial_last_modified')
+    if resume_from and partial_validator:
+        headers['Range'] = f"bytes={resume_from}-"
+        headers['If-Range'] = partial_validator
+    else:
+        resume_from = 0
+
+    fields = {}
     try:
         print(f"Downloading: {description}")
         print(f"URL: {url}")
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        with open(filepath, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
+
+        with session.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                print(f"Not modified: {filepath}")
+                return "not_modified", fields
+            if response.status_code == 416:
+                # Our partial file no longer matches anything the server has
+                part_path.unlink()
+                entry = dict(entry, partial_etag=None, partial_last_modified=None)
+                return download_file(url, filepath, description, session, entry, record_partial)
+            response.raise_for_status()
+
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            # Weak ETags can't be used with If-Range
+            fields['partial_etag'] = etag if etag and not etag.startswith('W/') else None
+            fields['partial_last_modified'] = last_modified
+            if record_partial is not None:
+                record_partial(dict(fields))
+
+            resuming = response.status_code == 206
+            digest = file_checksum(part_path)[1] if resuming else hashlib.sha256()
+            with open(part_path, 'ab' if resuming else 'wb') as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
                     f.write(chunk)
-        
-        print(f"Downloaded: {filepath}")
-        return True
-        
+                    digest.update(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+        size = part_path.stat().st_size
+        os.replace(part_path, filepath)
+        fields = {'size': size, 'sha256': digest.hexdigest(), 'etag': etag, 'last_modified': last_modified,
+                  'partial_etag': None, 'partial_last_modified': None}
+        print(f"Downloaded: {filepath}" + (f" (resumed at {resume_from} bytes)" if resuming else ""))
+        return "downloaded", fields
+
     except requests.exceptions.RequestException as e:
         print(f"Failed to download {description}: {e}")
-        return False
+        return "failed", fields
     except Exception as e:
         print(f"Error downloading {description}: {e}")
-        return False
+        return "failed", fields
+
+def create_document_manifest(base_path="rag_documents"):
+    """
+    Write the human-readable manifest (document_manifest.md) and a JSON
+    snapshot (document_manifest.json) from the SQLite manifest
+    """
+    base_path = Path(base_path)
+    manifest_path = base_path / "document_manifest.md"
+    fetched = (rag_manifest.DOWNLOADED, rag_manifest.NOT_MODIFIED)
+
+    with DocumentManifest(base_path) as manifest:
+        manifest.sync(DOCUMENTS)
+        with open(manifest_path, 'w') as f:
+            f.write("# RAG Document Manifest\n")
+            f.write("## Regulatory Documents for Merchant Onboarding AI\n\n")
+
+            for category, docs in DOCUMENTS.items():
+                f.write(f"### {category.replace('_', ' ').title()}\n")
+                for doc in docs:
+                    entry = manifest.get(DocumentManifest.key(category, doc['name']))
+                    f.write(f"- **{doc['name']}**: {doc['description']}\n")
+                    f.write(f"  - URL: {doc['url']}\n")
+                    if entry['status'] in fetched:
+                        f.write(f"  - Status: [x] Downloaded ({entry['size']:,} bytes, sha256 {entry['sha256'][:12]})\n\n")
+                    else:
+                        f.write(f"  - Status: [ ] Downloaded ({entry['status']})\n\n")
+        manifest.to_json(base_path / "document_manifest.json")
 
-def create_document_manifest():
-    """Create manifest of all documents to download"""
-    manifest_path = "rag_documents/document_manifest.md"
-    
-    with open(manifest_path, 'w') as f:
-        f.write("# RAG Document Manifest\n")
-        f.write("## Regulatory Documents for Merchant Onboarding AI\n\n")
-        
-        for category, docs in DOCUMENTS.items():
-            f.write(f"### {category.replace('_', ' ').title()}\n")
-            for doc in docs:
-                f.write(f"- **{doc['name']}**: {doc['description']}\n")
-                f.write(f"  - URL: {doc['url']}\n")
-                f.write(f"  - Status: [ ] Downloaded\n\n")
-    
     print(f"Created manifest: {manifest_path}")
 
-def download_all_documents():
-    """Download all documents in organized structure"""
-    
-    base_path = Path("rag_documents")
-    success_count = 0
-    total_count = 0
-    
-    for category, docs in DOCUMENTS.items():
-        category_path = base_path / category
-        category_path.mkdir(exist_ok=True)
-        
-        print(f"\nProcessing category: {category}")
-        
-        for doc in docs:
-            total_count += 1
-            filepath = category_path / doc['name']
-            
-            if filepath.exists():
-                print(f"File exists, skipping: {filepath}")
-                success_count += 1
-                continue
-            
-            if download_file(doc['url'], filepath, doc['description']):
-                success_count += 1
-            
-            # Rate limiting - be respectful to servers
-            time.sleep(2)
-    
+def download_all_documents(base_path="rag_documents", max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT):
+    """
+    Download all documents in organized structure
+    Downloads run concurrently over one pooled session, with at most
+    ``per_host_limit`` requests in flight to any one host. Unchanged files
+    cost a single conditional request. Every result is recorded in the
+    manifest as soon as it lands.
+    """
+    base_path = Path(base_path)
+    manifest = DocumentManifest(base_path)
+    manifest.sync(DOCUMENTS)
+    host_limits = defaultdict(lambda: threading.BoundedSemaphore(per_host_limit))
+    lock = threading.Lock()
+    session = create_session(max_workers)
+
+    def fetch(category, doc):
+        filepath = base_path / category / doc['name']
+        key = DocumentManifest.key(category, doc['name'])
+        with lock:
+            limit = host_limits[urlparse(doc['url']).netloc]
+        with limit:
+            status, fields = download_file(doc['url'], filepath, doc['description'], session, manifest.get(key),
+                                           lambda validators: manifest.record(key, **validators))
+        manifest.record(key, status, **fields)
+        return status
+
+    for category in DOCUMENTS:
+        (base_path / category).mkdir(parents=True, exist_ok=True)
+
+    with manifest, session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch, category, doc) for category, docs in DOCUMENTS.items() for doc in docs]
+        statuses = Counter(future.result() for future in futures)
+
+    total_count = sum(statuses.values())
     print(f"\nDownload Summary:")
     print(f"   Total documents: {total_count}")
-    print(f"   Successfully downloaded: {success_count}")
-    print(f"   Failed: {total_count - success_count}")
+    print(f"   Downloaded: {statuses['downloaded']}")
+    print(f"   Unchanged: {statuses['not_modified']}")
+    print(f"   Failed: {statuses['failed']}")
+    return statuses
 
 def create_manual_download_list():
     """Create list for manual downloads when automation fails"""
@@ -161,14 +272,15 @@ if __name__ == "__main__":
     for category in DOCUMENTS.keys():
         Path(f"rag_documents/{category}").mkdir(parents=True, exist_ok=True)
     
-    # Create documentation
-    create_document_manifest()
     create_manual_download_list()
     
     # Attempt automated downloads
     print("\nStarting automated downloads...")
     download_all_documents()
     
+    # Document what was actually fetched
+    create_document_manifest()
+    
     print("\nProcess complete!")
     print("Check document_manifest.md for download status")
     print("Use manual_download_list.txt if automation failed")
\ No newline at end of file
@@ -1,24 +1,25 @@
 #!/usr/bin/env python3
 """Generate ALL missing documents in realistic formats (PDF, JPEG, PNG)"""
 
-from PIL import Image, ImageDraw, ImageFilter
+from PIL import Image, ImageDraw
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-import random
 import io
+import os
+
+from degradation import DegradationConfig, degrade_image
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_documents")
+
+OCR_CHALLENGES = DegradationConfig(rotation=2, blur_probability=0.3, blur_sigma=(0.4, 0.4), resample="nearest")
 
 def add_ocr_challenges(img):
     """Add realistic OCR challenges"""
-    angle = random.uniform(-2, 2)
-    img = img.rotate(angle, expand=True, fillcolor='white')
-    if random.random() > 0.7:
-        img = img.filter(ImageFilter.GaussianBlur(radius=0.4))
-    return img
+    return degrade_image(img, OCR_CHALLENGES)
 
-def create_dba_certificate():
+def create_dba_certificate(filepath=os.path.join(OUTPUT_DIR, "dba_certificate.pdf")):
     """Generate DBA certificate as PDF"""
-    filepath = "c:/work/boarding/prototype/sample_documents/dba_certificate.pdf"
-    c = canvas.Canvas(filepath, pagesize=letter)
+    c = canvas.Canvas(filepath, pagesize=letter, invariant=1)
     
     c.drawString(100, 750, "STATE OF CALIFORNIA")
     c.drawString(100, 720, "FICTITIOUS BUSINESS NAME STATEMENT")
@@ -35,7 +36,7 @@ def create_dba_certificate():
     c.save()
     return filepath
 
-def create_personal_financial_statement():
+def create_personal_financial_statement(filepath=os.path.join(OUTPUT_DIR, "personal_financial_statement.jpg")):
     """Generate personal financial statement as JPEG"""
     img = Image.new('RGB', (850, 1100), color='white')
     draw = ImageDraw.Draw(img)
@@ -61,11 +62,10 @@ def create_personal_financial_statement():
     draw.text((50, 560), "NET WORTH: $1,400,000", fill='black')
     
     img = add_ocr_challenges(img)
-    filepath = "c:/work/boarding/prototype/sample_documents/personal_financial_statement.jpg"
     img.save(filepath, 'JPEG', quality=85)
     return filepath
 
-def create_pci_compliance():
+def create_pci_compliance(filepath=os.path.join(OUTPUT_DIR, "pci_compliance.png")):
     """Generate PCI compliance certificate"""
     img = Image.new('RGB', (850, 650), color='white')
     draw = ImageDraw.Draw(img)
@@ -86,14 +86,12 @@ def create_pci_compliance():
     draw.text((70, 450), "SecureAudit Partners LLC", fill='blue')
     
     img = add_ocr_challenges(img)
-    filepath = "c:/work/boarding/prototype/sample_documents/pci_compliance.png"
     img.save(filepath)
     return filepath
 
-def create_beneficial_ownership():
+def create_beneficial_ownership(filepath=os.path.join(OUTPUT_DIR, "beneficial_ownership.pdf")):
     """Generate FinCEN beneficial ownership form as PDF"""
-    filepath = "c:/work/boarding/prototype/sample_documents/beneficial_ownership.pdf"
-    c = canvas.Canvas(filepath, pagesize=letter)
+    c = canvas.Canvas(filepath, pagesize=letter, invariant=1)
     
     c.drawString(100, 750, "BENEFICIAL OWNERSHIP CERTIFICATION")
     c.drawString(100, 720, "FinCEN Form 314.81")
@@ -118,7 +116,7 @@ def create_beneficial_ownership():
     c.save()
     return filepath
 
-def create_background_check_auth():
+def create_background_check_auth(filepath=os.path.join(OUTPUT_DIR, "background_check_auth.jpg")):
     """Generate background check authorization"""
     img = Image.new('RGB', (850, 1100), color='white')
     draw = ImageDraw.Draw(img)
@@ -147,11 +145,10 @@ def create_background_check_auth():
     draw.text((50, 690), "Date: March 1, 2024", fill='black')
     
     img = add_ocr_challenges(img)
-    filepath = "c:/work/boarding/prototype/sample_documents/background_check_auth.jpg"
     img.save(filepath, 'JPEG', quality=80)
     return filepath
 
-def create_zoning_permit():
+def create_zoning_permit(filepath=os.path.join(OUTPUT_DIR, "zoning_permit.png")):
     """Generate zoning permit"""
     img = Image.new('RGB', (700, 900), color='white')
     draw = ImageDraw.Draw(img)
@@ -177,14 +174,12 @@ def create_zoning_permit():
     draw.text((50, 580), "City & County of San Francisco", fill='blue')
     
     img = add_ocr_challenges(img)
-    filepath = "c:/work/boarding/prototype/sample_documents/zoning_permit.png"
     img.save(filepath)
     return filepath
 
-def create_property_insurance():
+def create_property_insurance(filepath=os.path.join(OUTPUT_DIR, "property_insurance.pdf")):
     """Generate property insurance certificate as PDF"""
-    filepath = "c:/work/boarding/prototype/sample_documents/property_insurance.pdf"
-    c = canvas.Canvas(filepath, pagesize=letter)
+    c = canvas.Canvas(filepath, pagesize=letter, invariant=1)
     
     c.drawString(100, 750, "COMMERCIAL PROPERTY INSURANCE")
     c.drawString(100, 720, "CERTIFICATE OF INSURANCE")
@@ -208,10 +203,9 @@ def create_property_insurance():
     c.save()
     return filepath
 
-def create_business_plan():
+def create_business_plan(filepath=os.path.join(OUTPUT_DIR, "business_plan.pdf")):
     """Generate business plan excerpt as PDF"""
-    filepath = "c:/work/boarding/prototype/sample_documents/business_plan.pdf"
-    c = canvas.Canvas(filepath, pagesize=letter)
+    c = canvas.Canvas(filepath, pagesize=letter, invariant=1)
     
     c.drawString(100, 750, "BUSINESS PLAN - EXECUTIVE SUMMARY")
     c.drawString(100, 720, "TechFlow Solutions LLC")
@@ -238,7 +232,7 @@ def create_business_plan():
     c.save()
     return filepath
 
-def create_ofac_screening():
+def create_ofac_screening(filepath=os.path.join(OUTPUT_DIR, "ofac_screening.jpg")):
     """Generate OFAC screening results"""
     img = Image.new('RGB', (850, 1100), color='white')
     draw = ImageDraw.Draw(img)
@@ -266,29 +260,27 @@ def create_ofac_screening():
     draw.text((50, 600), "Report ID: OFAC-2024-789456", fill='black')
     
     img = add_ocr_challenges(img)
-    filepath = "c:/work/boarding/prototype/sample_documents/ofac_screening.jpg"
     img.save(filepath, 'JPEG', quality=85)
     return filepath
 
-def generate_all_missing():
+def generate_all_missing(output_dir=OUTPUT_DIR):
     """Generate all remaining documents in mixed formats"""
     
     generators = [
-        create_dba_certificate,
-        create_personal_financial_statement,
-        create_pci_compliance,
-        create_beneficial_ownership,
-        create_background_check_auth,
-        create_zoning_permit,
-        create_property_insurance,
-        create_business_plan,
-        create_ofac_screening
+        ("dba_certificate.pdf", create_dba_certificate),
+        ("personal_financial_statement.jpg", create_personal_financial_statement),
+        ("pci_compliance.png", create_pci_compliance),
+        ("beneficial_ownership.pdf", create_beneficial_ownership),
+        ("background_check_auth.jpg", create_background_check_auth),
+        ("zoning_permit.png", create_zoning_permit),
+        ("property_insurance.pdf", create_property_insurance),
+        ("business_plan.pdf", create_business_plan),
+        ("ofac_screening.jpg", create_ofac_screening)
     ]
     
     created_files = []
-    for generator in generators:
-        filepath = generator()
-        filename = filepath.split('/')[-1]
+    for filename, generator in generators:
+        generator(os.path.join(output_dir, filename))
         created_files.append(filename)
         print(f"Generated: {filename}")
     
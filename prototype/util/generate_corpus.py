@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Synthetic Document Corpus Generator
+Renders load-test corpora from the sample document generators in parallel.
+The same seed always produces byte-identical files, regardless of the
+number of worker processes.
+"""
+
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import generate_all_missing_docs
+import generate_missing_docs
+import generate_realistic_docs
+import generate_remaining_docs
+
+# (document name, extension, generator, writes_file). Generators that write
+# the file themselves take the output path; the rest return a PIL image.
+CATALOG = [
+    ("drivers_license", "png", generate_realistic_docs.create_drivers_license, False),
+    ("bank_statement", "png", generate_realistic_docs.create_bank_statement, False),
+    ("business_license", "png", generate_realistic_docs.create_business_license, False),
+    ("tax_return", "png", generate_realistic_docs.create_tax_return, False),
+    ("insurance_certificate", "png", generate_realistic_docs.create_insurance_certificate, False),
+    ("social_security_card", "png", generate_missing_docs.create_social_security_card, False),
+    ("lease_agreement", "png", generate_missing_docs.create_lease_agreement, False),
+    ("utility_bill", "png", generate_missing_docs.create_utility_bill, False),
+    ("financial_statement", "png", generate_missing_docs.create_financial_statement, False),
+    ("cpa_letter", "png", generate_missing_docs.create_cpa_letter, False),
+    ("website_screenshot", "png", generate_missing_docs.create_website_screenshots, False),
+    ("professional_license", "png", generate_remaining_docs.create_professional_license, False),
+    ("operating_agreement", "png", generate_remaining_docs.create_operating_agreement, False),
+    ("board_resolution", "png", generate_remaining_docs.create_board_resolution, False),
+    ("workers_compensation", "png", generate_remaining_docs.create_workers_comp, False),
+    ("ein_letter", "png", generate_remaining_docs.create_ein_letter, False),
+    ("product_catalog", "png", generate_remaining_docs.create_product_catalog, False),
+    ("dba_certificate", "pdf", generate_all_missing_docs.create_dba_certificate, True),
+    ("personal_financial_statement", "jpg", generate_all_missing_docs.create_personal_financial_statement, True),
+    ("pci_compliance", "png", generate_all_missing_docs.create_pci_compliance, True),
+    ("beneficial_ownership", "pdf", generate_all_missing_docs.create_beneficial_ownership, True),
+    ("background_check_auth", "jpg", generate_all_missing_docs.create_background_check_auth, True),
+    ("zoning_permit", "png", generate_all_missing_docs.create_zoning_permit, True),
+    ("property_insurance", "pdf", generate_all_missing_docs.create_property_insurance, True),
+    ("business_plan", "pdf", generate_all_missing_docs.create_business_plan, True),
+    ("ofac_screening", "jpg", generate_all_missing_docs.create_ofac_screening, True),
+]
+
+# Files per subdirectory, so huge corpora don't end up in one flat directory
+SHARD_SIZE = 1000
+
+def document_path(output_dir, index):
+    name, extension, _, _ = CATALOG[index % len(CATALOG)]
+    return os.path.join(output_dir, f"{index // SHARD_SIZE:05d}", f"{index:08d}_{name}.{extension}")
+
+def render_document(task):
+    """Render document ``index``; randomness depends only on (seed, index)"""
+    output_dir, seed, index = task
+    _, extension, generator, writes_file = CATALOG[index % len(CATALOG)]
+    filepath = document_path(output_dir, index)
+
+    random.seed(f"{seed}:{index}")
+    if writes_file:
+        generator(filepath)
+    else:
+        img = generator()
+        if extension == "jpg":
+            img.save(filepath, 'JPEG', quality=85)
+        else:
+            img.save(filepath)
+    return filepath
+
+def generate_corpus(output_dir, count, seed=0, workers=None, chunksize=16):
+    """Generate ``count`` documents into ``output_dir`` and return docs/sec"""
+    for shard in range((count + SHARD_SIZE - 1) // SHARD_SIZE):
+        os.makedirs(os.path.join(output_dir, f"{shard:05d}"), exist_ok=True)
+
+    tasks = ((output_dir, seed, index) for index in range(count))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for done, _ in enumerate(pool.map(render_document, tasks, chunksize=chunksize), 1):
+            if done % 1000 == 0:
+                print(f"  {done}/{count} documents ({done / (time.perf_counter() - start):.1f} docs/sec)")
+    elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed else 0.0
+    print(f"Generated {count} documents in {elapsed:.2f}s ({rate:.1f} docs/sec) -> {output_dir}")
+    return rate
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a reproducible synthetic document corpus")
+    parser.add_argument("output_dir", help="Directory to write documents into")
+    parser.add_argument("--count", type=int, default=len(CATALOG), help="Number of documents to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same seed gives byte-identical output")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=16, help="Documents handed to a worker at a time")
+    args = parser.parse_args()
+
+    generate_corpus(args.output_dir, args.count, seed=args.seed, workers=args.workers, chunksize=args.chunksize)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 #!/usr/bin/env python3
 """Generate all missing merchant onboarding documents"""
 
-from PIL import Image, ImageDraw, ImageFilter
-import random
+from PIL import Image, ImageDraw
+import os
+
+from degradation import DegradationConfig, degrade_image
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_documents")
+
+OCR_CHALLENGES = DegradationConfig(rotation=1.5, blur_probability=0.2, blur_sigma=(0.3, 0.3), resample="nearest")
 
 def add_ocr_challenges(img):
     """Add realistic OCR challenges"""
-    angle = random.uniform(-1.5, 1.5)
-    img = img.rotate(angle, expand=True, fillcolor='white')
-    if random.random() > 0.8:
-        img = img.filter(ImageFilter.GaussianBlur(radius=0.3))
-    return img
+    return degrade_image(img, OCR_CHALLENGES)
 
 def create_social_security_card():
     """Generate SSN card image"""
@@ -160,7 +162,7 @@ def create_website_screenshots():
     
     return add_ocr_challenges(img)
 
-def generate_missing_documents():
+def generate_missing_documents(output_dir=OUTPUT_DIR):
     """Generate all missing document types"""
     
     docs = [
@@ -174,7 +176,7 @@ def generate_missing_documents():
     
     for filename, generator in docs:
         img = generator()
-        filepath = f"c:/work/boarding/prototype/sample_documents/{filename}"
+        filepath = os.path.join(output_dir, filename)
         img.save(filepath)
         print(f"Generated: {filename}")
     
@@ -1,26 +1,20 @@
 #!/usr/bin/env python3
 """Generate realistic merchant onboarding documents with OCR challenges"""
 
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-import random
+from PIL import Image, ImageDraw, ImageFont
 import os
 
+from degradation import DegradationConfig, degrade_image
+from templates import DocumentTemplate, TableField, TextField
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_documents")
+
+OCR_CHALLENGES = DegradationConfig(rotation=2, blur_probability=0.3, blur_sigma=(0.5, 0.5), brightness=(0.8, 1.2),
+                                  resample="nearest")
+
 def add_ocr_challenges(img):
     """Add realistic OCR challenges to document images"""
-    # Slight rotation (1-3 degrees)
-    angle = random.uniform(-2, 2)
-    img = img.rotate(angle, expand=True, fillcolor='white')
-    
-    # Add slight blur
-    if random.random() > 0.7:
-        img = img.filter(ImageFilter.GaussianBlur(radius=0.5))
-    
-    # Adjust brightness/contrast
-    from PIL import ImageEnhance
-    enhancer = ImageEnhance.Brightness(img)
-    img = enhancer.enhance(random.uniform(0.8, 1.2))
-    
-    return img
+    return degrade_image(img, OCR_CHALLENGES)
 
 def create_drivers_license():
     """Generate realistic driver's license with phone photo artifacts"""
@@ -51,38 +45,47 @@ def create_drivers_license():
     
     return add_ocr_challenges(img)
 
-def create_bank_statement():
-    """Generate bank statement scan with typical artifacts"""
-    img = Image.new('RGB', (850, 1100), color='white')
-    draw = ImageDraw.Draw(img)
-    
+def _draw_bank_statement_layout(draw):
     # Bank header
     draw.rectangle([30, 30, 820, 100], fill='#003366')
     draw.text((50, 50), "FIRST NATIONAL BANK", fill='white')
     draw.text((50, 70), "BUSINESS CHECKING STATEMENT", fill='white')
     
-    # Account details
-    draw.text((50, 130), "TechFlow Solutions LLC", fill='black')
-    draw.text((50, 160), "Account: ****-****-4567", fill='black')
-    draw.text((50, 190), "Period: 02/01/2024 - 02/29/2024", fill='black')
-    
     # Balance summary
     draw.rectangle([50, 220, 800, 300], outline='black')
     draw.text((70, 240), "Beginning Balance:", fill='black')
-    draw.text((300, 240), "$45,230.18", fill='black')
     draw.text((70, 260), "Total Deposits:", fill='black')
-    draw.text((300, 260), "$127,450.00", fill='black')
     draw.text((70, 280), "Ending Balance:", fill='black')
-    draw.text((300, 280), "$83,339.93", fill='black')
     
     # Transaction header
     draw.text((50, 330), "Date", fill='black')
     draw.text((150, 330), "Description", fill='black')
     draw.text((500, 330), "Amount", fill='black')
     draw.line([(50, 350), (800, 350)], fill='black')
-    
-    # Transactions
-    transactions = [
+
+def _transaction_color(row, column):
+    if column != 2:
+        return 'black'
+    return 'green' if row[2].startswith('+') else 'red'
+
+BANK_STATEMENT = DocumentTemplate((850, 1100), 'white', _draw_bank_statement_layout, [
+    TextField("business_name", (50, 130)),
+    TextField("account", (50, 160), "Account: {}"),
+    TextField("period", (50, 190), "Period: {}"),
+    TextField("beginning_balance", (300, 240)),
+    TextField("total_deposits", (300, 260)),
+    TextField("ending_balance", (300, 280)),
+    TableField("transactions", 370, (50, 150, 500), fill=_transaction_color),
+])
+
+BANK_STATEMENT_RECORD = {
+    "business_name": "TechFlow Solutions LLC",
+    "account": "****-****-4567",
+    "period": "02/01/2024 - 02/29/2024",
+    "beginning_balance": "$45,230.18",
+    "total_deposits": "$127,450.00",
+    "ending_balance": "$83,339.93",
+    "transactions": [
         ("02/02", "ACH DEPOSIT - CLIENT PAYMENT", "+$15,500.00"),
         ("02/05", "WIRE TRANSFER - PROJECT FEE", "+$25,000.00"),
         ("02/07", "CHECK #1001 - OFFICE RENT", "-$4,200.00"),
@@ -91,17 +94,12 @@ def create_bank_statement():
         ("02/15", "ACH DEPOSIT - CLIENT PAYMENT", "+$22,300.00"),
         ("02/20", "WIRE TRANSFER - PROJECT", "+$35,900.00"),
         ("02/25", "ACH DEPOSIT - CONSULTING", "+$20,000.00")
-    ]
-    
-    y = 370
-    for date, desc, amount in transactions:
-        draw.text((50, y), date, fill='black')
-        draw.text((150, y), desc, fill='black')
-        color = 'green' if amount.startswith('+') else 'red'
-        draw.text((500, y), amount, fill=color)
-        y += 25
-    
-    return add_ocr_challenges(img)
+    ],
+}
+
+def create_bank_statement(record=BANK_STATEMENT_RECORD):
+    """Generate bank statement scan with typical artifacts"""
+    return add_ocr_challenges(BANK_STATEMENT.render(record))
 
 def create_business_license():
     """Generate business license as poor quality photo"""
@@ -144,105 +142,124 @@ def create_business_license():
     
     return add_ocr_challenges(img)
 
-def create_tax_return():
-    """Generate tax return with handwritten annotations"""
-    img = Image.new('RGB', (850, 1100), color='white')
-    draw = ImageDraw.Draw(img)
-    
+def _draw_tax_return_layout(draw):
     # Form header
     draw.text((50, 50), "Form 1065", fill='black')
     draw.text((200, 50), "U.S. Return of Partnership Income", fill='black')
-    draw.text((600, 50), "2023", fill='black')
     
     # Business info
     draw.rectangle([50, 100, 800, 200], outline='black')
-    draw.text((70, 120), "Name: TechFlow Solutions LLC", fill='black')
-    draw.text((70, 140), "EIN: 87-1234567", fill='black')
-    draw.text((70, 160), "Address: 1247 Innovation Drive, Suite 300", fill='black')
-    draw.text((70, 180), "San Francisco, CA 94107", fill='black')
     
     # Income section
     draw.text((50, 230), "INCOME", fill='black')
     draw.line([(50, 250), (200, 250)], fill='black')
-    
     draw.text((70, 270), "1a Gross receipts or sales", fill='black')
-    draw.text((500, 270), "1,245,000", fill='black')
     draw.text((70, 300), "1c Net sales (1a minus 1b)", fill='black')
-    draw.text((500, 300), "1,232,550", fill='black')
     
     # Deductions
     draw.text((50, 350), "DEDUCTIONS", fill='black')
     draw.line([(50, 370), (200, 370)], fill='black')
-    
     draw.text((70, 390), "9 Salaries and wages", fill='black')
-    draw.text((500, 390), "485,000", fill='black')
     draw.text((70, 420), "11 Rent", fill='black')
-    draw.text((500, 420), "50,400", fill='black')
     draw.text((70, 450), "20 Total deductions", fill='black')
-    draw.text((500, 450), "804,900", fill='black')
     
     # Net income
     draw.text((70, 500), "22 Ordinary business income", fill='black')
-    draw.text((500, 500), "427,650", fill='black')
-    
+
+TAX_RETURN = DocumentTemplate((850, 1100), 'white', _draw_tax_return_layout, [
+    TextField("tax_year", (600, 50)),
+    TextField("business_name", (70, 120), "Name: {}"),
+    TextField("ein", (70, 140), "EIN: {}"),
+    TextField("street", (70, 160), "Address: {}"),
+    TextField("city", (70, 180)),
+    TextField("gross_receipts", (500, 270)),
+    TextField("net_sales", (500, 300)),
+    TextField("salaries", (500, 390)),
+    TextField("rent", (500, 420)),
+    TextField("total_deductions", (500, 450)),
+    TextField("ordinary_income", (500, 500)),
     # Handwritten note (in red)
-    draw.text((600, 520), "Reviewed - MC", fill='red')
-    
-    # Preparer info
-    draw.text((50, 600), "Paid Preparer: Martinez & Associates CPA", fill='black')
-    draw.text((50, 630), "Preparer: Maria Martinez, CPA", fill='black')
-    draw.text((50, 660), "Date: 03/10/2024", fill='black')
-    
-    return add_ocr_challenges(img)
+    TextField("annotation", (600, 520), fill='red'),
+    TextField("preparer_firm", (50, 600), "Paid Preparer: {}"),
+    TextField("preparer", (50, 630), "Preparer: {}"),
+    TextField("prepared_date", (50, 660), "Date: {}"),
+])
 
-def create_insurance_certificate():
-    """Generate insurance certificate with watermark"""
-    img = Image.new('RGB', (850, 650), color='white')
-    draw = ImageDraw.Draw(img)
-    
+TAX_RETURN_RECORD = {
+    "tax_year": "2023",
+    "business_name": "TechFlow Solutions LLC",
+    "ein": "87-1234567",
+    "street": "1247 Innovation Drive, Suite 300",
+    "city": "San Francisco, CA 94107",
+    "gross_receipts": "1,245,000",
+    "net_sales": "1,232,550",
+    "salaries": "485,000",
+    "rent": "50,400",
+    "total_deductions": "804,900",
+    "ordinary_income": "427,650",
+    "annotation": "Reviewed - MC",
+    "preparer_firm": "Martinez & Associates CPA",
+    "preparer": "Maria Martinez, CPA",
+    "prepared_date": "03/10/2024",
+}
+
+def create_tax_return(record=TAX_RETURN_RECORD):
+    """Generate tax return with handwritten annotations"""
+    return add_ocr_challenges(TAX_RETURN.render(record))
+
+def _draw_insurance_certificate_layout(draw):
     # Watermark
     draw.text((300, 300), "SAMPLE", fill='#E0E0E0')
     
     # Header
     draw.text((50, 50), "CERTIFICATE OF LIABILITY INSURANCE", fill='black')
-    draw.text((600, 50), "Date: 03/01/2024", fill='black')
     
-    # Insurer info
+    # Insurer and insured boxes
     draw.rectangle([50, 100, 800, 180], outline='black')
-    draw.text((70, 120), "INSURER: Pacific Insurance Company", fill='black')
-    draw.text((70, 140), "NAIC #: 12345", fill='black')
-    draw.text((70, 160), "Rating: A+ (Superior)", fill='black')
-    
-    # Insured info
     draw.rectangle([50, 200, 800, 280], outline='black')
-    draw.text((70, 220), "INSURED: TechFlow Solutions LLC", fill='black')
-    draw.text((70, 240), "1247 Innovation Drive, Suite 300", fill='black')
-    draw.text((70, 260), "San Francisco, CA 94107", fill='black')
     
-    # Coverage details
+    # Coverage header
     draw.text((50, 310), "TYPE OF INSURANCE", fill='black')
     draw.text((300, 310), "POLICY NUMBER", fill='black')
     draw.text((500, 310), "LIMITS", fill='black')
     draw.line([(50, 330), (800, 330)], fill='black')
     
-    draw.text((50, 350), "General Liability", fill='black')
-    draw.text((300, 350), "GL-2024-789456", fill='black')
-    draw.text((500, 350), "$2,000,000", fill='black')
-    
-    draw.text((50, 380), "Professional Liability", fill='black')
-    draw.text((300, 380), "PL-2024-789457", fill='black')
-    draw.text((500, 380), "$1,000,000", fill='black')
-    
-    # Effective dates
-    draw.text((50, 430), "Policy Period: 03/01/2024 to 03/01/2025", fill='black')
-    
-    # Signature
     draw.text((50, 500), "Authorized Representative:", fill='black')
-    draw.text((50, 530), "John Smith, Agent", fill='blue')
-    
-    return add_ocr_challenges(img)
 
-def generate_all_documents():
+INSURANCE_CERTIFICATE = DocumentTemplate((850, 650), 'white', _draw_insurance_certificate_layout, [
+    TextField("issue_date", (600, 50), "Date: {}"),
+    TextField("insurer", (70, 120), "INSURER: {}"),
+    TextField("naic", (70, 140), "NAIC #: {}"),
+    TextField("rating", (70, 160), "Rating: {}"),
+    TextField("insured", (70, 220), "INSURED: {}"),
+    TextField("street", (70, 240)),
+    TextField("city", (70, 260)),
+    TableField("coverages", 350, (50, 300, 500), row_height=30),
+    TextField("policy_period", (50, 430), "Policy Period: {}"),
+    TextField("agent", (50, 530), fill='blue'),
+])
+
+INSURANCE_CERTIFICATE_RECORD = {
+    "issue_date": "03/01/2024",
+    "insurer": "Pacific Insurance Company",
+    "naic": "12345",
+    "rating": "A+ (Superior)",
+    "insured": "TechFlow Solutions LLC",
+    "street": "1247 Innovation Drive, Suite 300",
+    "city": "San Francisco, CA 94107",
+    "coverages": [
+        ("General Liability", "GL-2024-789456", "$2,000,000"),
+        ("Professional Liability", "PL-2024-789457", "$1,000,000"),
+    ],
+    "policy_period": "03/01/2024 to 03/01/2025",
+    "agent": "John Smith, Agent",
+}
+
+def create_insurance_certificate(record=INSURANCE_CERTIFICATE_RECORD):
+    """Generate insurance certificate with watermark"""
+    return add_ocr_challenges(INSURANCE_CERTIFICATE.render(record))
+
+def generate_all_documents(output_dir=OUTPUT_DIR):
     """Generate all realistic document images"""
     
     docs = [
@@ -255,7 +272,7 @@ def generate_all_documents():
     
     for filename, generator in docs:
         img = generator()
-        filepath = f"c:/work/boarding/prototype/sample_documents/{filename}"
+        filepath = os.path.join(output_dir, filename)
         img.save(filepath)
         print(f"Generated: {filename}")
     
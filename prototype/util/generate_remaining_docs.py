@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 """Generate remaining critical merchant documents"""
 
-from PIL import Image, ImageDraw, ImageFilter
-import random
+from PIL import Image, ImageDraw
+import os
+
+from degradation import DegradationConfig, degrade_image
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "sample_documents")
+
+OCR_CHALLENGES = DegradationConfig(rotation=1, resample="nearest")
 
 def add_ocr_challenges(img):
-    angle = random.uniform(-1, 1)
-    img = img.rotate(angle, expand=True, fillcolor='white')
-    return img
+    return degrade_image(img, OCR_CHALLENGES)
 
 def create_professional_license():
     """Generate professional license"""
@@ -138,7 +142,7 @@ def create_product_catalog():
     
     return add_ocr_challenges(img)
 
-def generate_remaining_docs():
+def generate_remaining_docs(output_dir=OUTPUT_DIR):
     """Generate remaining critical documents"""
     
     docs = [
@@ -152,7 +156,7 @@ def generate_remaining_docs():
     
     for filename, generator in docs:
         img = generator()
-        filepath = f"c:/work/boarding/prototype/sample_documents/{filename}"
+        filepath = os.path.join(output_dir, filename)
         img.save(filepath)
         print(f"Generated: {filename}")
     
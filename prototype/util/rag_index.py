@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+RAG Vector Index
+In-process approximate nearest-neighbour search (IVF over NumPy arrays) for
+the chunk embeddings produced by rag_ingest, with category filters and
+memory-mapped save/load
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import time
+from pathlib import Path
+
+import numpy as np
+
+from download_rag_documents import DOCUMENTS
+from rag_ingest import STORE_DIR, VectorStore
+
+INDEX_DIR = "ivf_index"
+# Lists scanned per query: recall against latency. On the ingested corpus 2
+# probes keep recall@10 around 0.95 at ~2.8x the speed of 8. Widely spread
+# corpora need more: on 200k clustered synthetic vectors (``benchmark
+# --synthetic 200000``) recall@10 is 0.54 / 0.84 / 0.99 at 2 / 4 / 8 probes
+# (0.25 / 0.40 / 0.64 ms per query). Run the benchmark before lowering it further.
+DEFAULT_PROBES = 2
+# Training k-means on a sample is as good as on everything, and much faster
+TRAIN_POINTS_PER_LIST = 256
+
+def _top_k(scores, ids, k):
+    """Best ``k`` (scores, ids) per row, sorted by descending score"""
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        ids = np.take_along_axis(ids, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+def exact_search(vectors, queries, k=10, ids=None, allowed=None, block=65536):
+    """
+    Brute-force inner-product search, streamed in blocks so a memory-mapped
+    ``vectors`` is never loaded whole; ``allowed`` is an optional row mask
+    """
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    ids = np.arange(len(vectors)) if ids is None else np.asarray(ids)
+    best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+    best_ids = np.full((len(queries), 0), -1, dtype=np.int64)
+    for start in range(0, len(vectors), block):
+        scores = queries @ np.asarray(vectors[start:start + block]).T
+        if allowed is not None:
+            scores[:, ~allowed[start:start + block]] = -np.inf
+        block_ids = np.broadcast_to(ids[start:start + block], scores.shape)
+        best_scores, best_ids = _top_k(np.hstack([best_scores, scores]), np.hstack([best_ids, block_ids]), k)
+    return best_scores, best_ids
+
+def chunk_checksum(ids):
+    """Digest of a set of chunk ids; an index is current while it matches the store's live chunks"""
+    return hashlib.sha256(np.sort(np.asarray(ids, dtype=np.int64)).tobytes()).hexdigest()
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-normalised vectors
+    Vectors are clustered by spherical k-means into ``n_lists`` lists and
+    stored contiguously, list by list. A query scores the centroids, then
+    scans only its ``n_probe`` closest lists. Each vector carries a
+    category code, and lists holding none of a filter's categories are
+    never probed, so filtered queries stay as cheap as unfiltered ones.
+    ``checksum`` identifies the chunk ids indexed (see ``chunk_checksum``).
+    """
+
+    def __init__(self, centroids, vectors, ids, categories, offsets, category_names, checksum=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.ids = ids
+        self.categories = categories
+        self.offsets = offsets
+        self.category_names = list(category_names)
+        self.checksum = checksum or chunk_checksum(ids)
+        # Vectors of each category in each list
+        self.list_categories = np.zeros((len(centroids), len(self.category_names)), dtype=np.int64)
+        for list_no in range(len(centroids)):
+            codes = np.asarray(categories[offsets[list_no]:offsets[list_no + 1]])
+            self.list_categories[list_no] = np.bincount(codes, minlength=len(self.category_names))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def n_lists(self):
+        return len(self.centroids)
+
+    @classmethod
+    def build(cls, vectors, ids=None, categories=None, n_lists=None, iterations=10, seed=0):
+        """
+        Train centroids and bucket ``vectors``
+        ``categories`` are names (one per vector); ``n_lists`` defaults to
+        about 4 * sqrt(N).
+        """
+        n, dim = vectors.shape
+        ids = np.arange(n, dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+        names = list(DOCUMENTS)
+        codes = np.zeros(n, dtype=np.int16)
+        if categories is not None:
+            for name in dict.fromkeys(categories):
+                if name not in names:
+                    names.append(name)
+            lookup = {name: code for code, name in enumerate(names)}
+            codes = np.array([lookup[c] for c in categories], dtype=np.int16)
+        if n == 0:
+            # Nothing ingested yet: an index that finds nothing
+            empty = np.zeros((0, dim), dtype=np.float32)
+            return cls(empty, empty, ids, codes, np.zeros(1, dtype=np.int64), names)
+        n_lists = max(1, min(n, n_lists or int(4 * math.sqrt(n))))
+
+        rng = np.random.default_rng(seed)
+        sample = np.asarray(vectors[np.sort(rng.choice(n, min(n, n_lists * TRAIN_POINTS_PER_LIST), replace=False))])
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            counts = np.bincount(assignment, minlength=n_lists)
+            order = np.argsort(assignment, kind="stable")
+            sums = np.zeros_like(centroids)
+            nonempty = counts > 0
+            sums[nonempty] = np.add.reduceat(sample[order], np.cumsum(counts)[nonempty] - counts[nonempty])
+            # Empty lists are re-seeded from random points
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1, norms)
+
+        assignment = np.concatenate([np.argmax(np.asarray(vectors[start:start + 65536]) @ centroids.T, axis=1)
+                                     for start in range(0, n, 65536)])
+        order = np.argsort(assignment, kind="stable")
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return cls(centroids.astype(np.float32), np.asarray(vectors[order], dtype=np.float32),
+                   ids[order], codes[order], offsets, names)
+
+    @classmethod
+    def from_store(cls, store, n_lists=None):
+        """Index every live chunk of a rag_ingest VectorStore"""
+        ids, categories = store.active_rows()
+        vectors = store.vectors()
+        return cls.build(vectors[ids] if len(ids) else np.zeros((0, store.dim or 0), np.float32),
+                         ids, categories, n_lists)
+
+    def _allowed_codes(self, categories):
+        unknown = set(categories) - set(self.category_names)
+        if unknown:
+            raise ValueError(f"Unknown categories: {', '.join(sorted(unknown))}")
+        return [self.category_names.index(c) for c in categories]
+
+    def search(self, queries, k=10, n_probe=DEFAULT_PROBES, categories=None):
+        """
+        Batched search; returns (scores, ids), each (len(queries), k),
+        padded with -inf / -1 when fewer than ``k`` vectors qualify.
+        ``categories`` restricts results to those DOCUMENTS categories.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        if not self.n_lists:
+            return best_scores, best_ids
+        coarse = queries @ self.centroids.T
+        codes = None
+        if categories is not None:
+            codes = self._allowed_codes(categories)
+            coarse[:, self.list_categories[:, codes].sum(axis=1) == 0] = -np.inf
+        n_probe = min(n_probe, self.n_lists)
+        probes = np.argpartition(-coarse, n_probe - 1, axis=1)[:, :n_probe]
+        probed = np.take_along_axis(coarse, probes, axis=1) > -np.inf
+
+        # One matrix product per list, covering every query that probes it
+        for list_no in np.unique(probes[probed]):
+            start, end = self.offsets[list_no], self.offsets[list_no + 1]
+            if start == end:
+                continue
+            rows = np.nonzero(((probes == list_no) & probed).any(axis=1))[0]
+            scores = queries[rows] @ np.asarray(self.vectors[start:end]).T
+            if codes is not None:
+                scores[:, ~np.isin(np.asarray(self.categories[start:end]), codes)] = -np.inf
+            list_ids = np.broadcast_to(np.asarray(self.ids[start:end]), scores.shape)
+            best_scores[rows], best_ids[rows] = _top_k(np.hstack([best_scores[rows], scores]),
+                                                       np.hstack([best_ids[rows], list_ids]), k)
+        best_ids[best_scores == -np.inf] = -1
+        return best_scores, best_ids
+
+    def save(self, path):
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("centroids", "vectors", "ids", "categories", "offsets"):
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+        with open(path / "index.json", "w") as f:
+            json.dump({"category_names": self.category_names, "size": len(self), "checksum": self.checksum},
+                      f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a saved index; with ``mmap`` the vectors stay on disk and are paged in on demand"""
+        path = Path(path)
+        with open(path / "index.json") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode=mode)
+                  for name in ("centroids", "vectors", "ids", "categories", "offsets")}
+        return cls(np.asarray(arrays["centroids"]), arrays["vectors"], arrays["ids"], arrays["categories"],
+                   np.asarray(arrays["offsets"]), meta["category_names"], meta.get("checksum"))
+
+def benchmark(index, vectors, queries, k=10, probes=(1, 2, 4, 8, 16, 32), categories=None, row_categories=None):
+    """Recall@k and per-query latency of the index against exact search"""
+    allowed = None
+    if categories is not None:
+        allowed = np.isin(np.asarray(row_categories), categories)
+
+    start = time.perf_counter()
+    _, truth = exact_search(vectors, queries, k, allowed=allowed)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"exact        {exact_ms:8.3f} ms/query   recall@{k} 1.000")
+
+    results = {"exact_ms": exact_ms, "ivf": []}
+    for n_probe in probes:
+        if n_probe > index.n_lists:
+            break
+        start = time.perf_counter()
+        _, found = index.search(queries, k, n_probe, categories)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        recall = np.mean([len(set(t[t >= 0]) & set(f)) / max(1, (t >= 0).sum()) for t, f in zip(truth, found)])
+        print(f"ivf probe={n_probe:<3} {ms:7.3f} ms/query   recall@{k} {recall:.3f}   ({exact_ms / ms:.1f}x)")
+        results["ivf"].append({"n_probe": n_probe, "ms": ms, "recall": float(recall)})
+    return results
+
+def _synthetic_corpus(n, dim, clusters=256, seed=0):
+    """Clustered unit vectors, roughly like topic-grouped document chunks"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    categories = [list(DOCUMENTS)[i % len(DOCUMENTS)] for i in rng.integers(len(DOCUMENTS), size=n)]
+    return vectors, categories
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or benchmark the RAG vector index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Index the ingested vector store")
+    build.add_argument("--base-path", default="rag_documents")
+    build.add_argument("--lists", type=int, help="Number of IVF lists (default ~4*sqrt(N))")
+
+    bench = sub.add_parser("benchmark", help="Recall/latency against exact search")
+    bench.add_argument("--synthetic", type=int, help="Benchmark on N synthetic vectors instead of the store")
+    bench.add_argument("--base-path", default="rag_documents")
+    bench.add_argument("--dim", type=int, default=384)
+    bench.add_argument("--queries", type=int, default=200)
+    bench.add_argument("--k", type=int, default=10)
+    bench.add_argument("--category", action="append", help="Filter to a DOCUMENTS category (repeatable)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        base_path = Path(args.base_path)
+        with VectorStore(base_path / STORE_DIR) as store:
+            start = time.perf_counter()
+            index = IVFIndex.from_store(store, args.lists)
+        index.save(base_path / INDEX_DIR)
+        print(f"Indexed {len(index)} chunks into {index.n_lists} lists in {time.perf_counter() - start:.2f}s")
+        return
+
+    if args.synthetic:
+        vectors, categories = _synthetic_corpus(args.synthetic, args.dim)
+    else:
+        with VectorStore(Path(args.base_path) / STORE_DIR) as store:
+            ids, categories = store.active_rows()
+            vectors = np.asarray(store.vectors()[ids])
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, categories=categories)
+    print(f"Built {index.n_lists}-list index over {len(vectors)} vectors in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    benchmark(index, vectors, queries, args.k, categories=args.category, row_categories=categories)
+
+if __name__ == "__main__":
+    main()
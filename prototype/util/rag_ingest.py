@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+RAG Ingestion Pipeline
+Streams downloaded regulatory documents page by page into overlapping text
+chunks, embeds them in batches and appends the vectors to a memory-mapped
+store, re-embedding only documents whose checksum changed
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from download_rag_documents import DOCUMENTS
+from rag_manifest import DOWNLOADED, NOT_MODIFIED, DocumentManifest
+
+try:
+    import pypdfium2
+except ImportError:  # optional dependency
+    pypdfium2 = None
+
+try:
+    import pypdf
+except ImportError:  # optional dependency
+    pypdf = None
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional dependency
+    SentenceTransformer = None
+
+STORE_DIR = "vector_store"
+# ~500-1000 tokens per chunk, as recommended in public_rag_sources.md
+CHUNK_WORDS = 300
+CHUNK_OVERLAP = 50
+EMBED_BATCH_SIZE = 64
+WORD = re.compile(r"\S+")
+
+@dataclass
+class Chunk:
+    text: str
+    page_start: int
+    page_end: int
+
+def iter_pages(path):
+    """Yield the text of one page at a time; never holds the whole document"""
+    path = Path(path)
+    if path.suffix.lower() != ".pdf":
+        # Plain-text sources: form feeds separate pages
+        with open(path, encoding="utf-8", errors="replace") as f:
+            page = []
+            for line in f:
+                *done, rest = line.split("\f")
+                for part in done:
+                    page.append(part)
+                    yield "".join(page)
+                    page = []
+                page.append(rest)
+            yield "".join(page)
+        return
+
+    if pypdfium2 is not None:
+        pdf = pypdfium2.PdfDocument(str(path))
+        try:
+            for number in range(len(pdf)):
+                page = pdf[number]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+    elif pypdf is not None:
+        # A file object (not a path) keeps pypdf reading lazily from disk
+        with open(path, "rb") as f:
+            reader = pypdf.PdfReader(f)
+            for page in reader.pages:
+                yield page.extract_text() or ""
+    else:
+        raise ImportError("Extracting PDF text requires pypdfium2 or pypdf")
+
+def iter_chunks(pages, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """
+    Overlapping word windows over a stream of pages
+    Only the current window is buffered, so memory stays flat however long
+    the document is.
+    """
+    if not 0 <= overlap < chunk_words:
+        raise ValueError("overlap must be smaller than chunk_words")
+    words, pages_of, emitted = [], [], False
+    for number, text in enumerate(pages, 1):
+        for match in WORD.finditer(text):
+            words.append(match.group())
+            pages_of.append(number)
+            if len(words) == chunk_words:
+                yield Chunk(" ".join(words), pages_of[0], pages_of[-1])
+                keep = len(words) - overlap
+                words, pages_of, emitted = words[keep:], pages_of[keep:], True
+    # The overlap carried forward has already been emitted
+    if len(words) > (overlap if emitted else 0):
+        yield Chunk(" ".join(words), pages_of[0], pages_of[-1])
+
+class HashingEmbedder:
+    """
+    Dependency-free stand-in for an embedding model
+    Signed feature hashing of unigrams and bigrams, L2-normalised. Good
+    enough for lexical similarity and for exercising the pipeline.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        rows, buckets, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode())
+                rows.append(row)
+                buckets.append(h % self.dim)
+                signs.append(1.0 if h & 0x80000000 else -1.0)
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(vectors, (np.array(rows, dtype=np.int64), np.array(buckets, dtype=np.int64)),
+                  np.array(signs, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (optional dependency)"""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        if SentenceTransformer is None:
+            raise ImportError("SentenceTransformerEmbedder requires sentence-transformers")
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"st-{model_name}"
+
+    def embed(self, texts):
+        return self.model.encode(list(texts), batch_size=EMBED_BATCH_SIZE,
+                                 normalize_embeddings=True).astype(np.float32)
+
+class VectorStore:
+    """
+    Append-only float32 vector file plus a SQLite catalogue of chunks
+    Row ``i`` of the vector file is chunk ``i``. Re-embedding a document
+    appends new rows and retires the old ones (``active = 0``); ``compact``
+    reclaims them into a new generation of the file, which the catalogue
+    names in its ``meta`` table. ``vectors()`` is a read-only memory map, so
+    readers never load the file into memory.
+    """
+
+    def __init__(self, path=STORE_DIR, dim=None):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path / "chunks.sqlite"))
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS documents (doc_key TEXT PRIMARY KEY, category TEXT, sha256 TEXT, "
+            "embedder TEXT, chunks INTEGER, ingested_at REAL);"
+            "CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, doc_key TEXT, category TEXT, "
+            "page_start INTEGER, page_end INTEGER, text TEXT, active INTEGER NOT NULL DEFAULT 1);"
+            "CREATE INDEX IF NOT EXISTS chunks_doc ON chunks (doc_key);"
+        )
+        stored = self._meta("dim")
+        if stored is not None and dim is not None and int(stored) != dim:
+            raise ValueError(f"Store holds {stored}-d vectors, embedder produces {dim}-d")
+        self.dim = int(stored) if stored is not None else dim
+        if stored is None and dim is not None:
+            self._set_meta("dim", dim)
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def vector_path(self):
+        """The current generation's vector file (re-read, as compaction may switch it)"""
+        return self.path / (self._meta("vector_file") or "vectors.f32")
+
+    def __len__(self):
+        vector_path = self.vector_path
+        if not vector_path.exists() or not self.dim:
+            return 0
+        return vector_path.stat().st_size // (4 * self.dim)
+
+    def document(self, doc_key):
+        row = self._db.execute("SELECT sha256, embedder, chunks FROM documents WHERE doc_key = ?",
+                               (doc_key,)).fetchone()
+        return dict(zip(("sha256", "embedder", "chunks"), row)) if row else None
+
+    def documents(self):
+        return [row[0] for row in self._db.execute("SELECT doc_key FROM documents ORDER BY doc_key")]
+
+    def embedders(self):
+        """Names of the embedders the stored documents were embedded with"""
+        return {row[0] for row in self._db.execute("SELECT DISTINCT embedder FROM documents")}
+
+    def write_document(self, doc_key, category, sha256, embedder, chunk_batches):
+        """
+        Append ``(chunks, vectors)`` batches for one document, then retire its
+        previous rows. The catalogue switches over in one transaction after
+        all vectors are on disk, so an interrupted ingest leaves the old
+        version live (plus some unreferenced tail rows).
+        """
+        # Rows past the last catalogued chunk belong to an interrupted ingest
+        first = self._db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+        rows = []
+        with open(self.vector_path, "ab") as f:
+            f.truncate(first * 4 * self.dim)
+            for chunks, vectors in chunk_batches:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                rows.extend(chunks)
+        with self._db:
+            self._db.execute("UPDATE chunks SET active = 0 WHERE doc_key = ?", (doc_key,))
+            self._db.executemany(
+                "INSERT INTO chunks (id, doc_key, category, page_start, page_end, text) VALUES (?, ?, ?, ?, ?, ?)",
+                [(first + i, doc_key, category, c.page_start, c.page_end, c.text) for i, c in enumerate(rows)],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_key, category, sha256, embedder, len(rows), time.time()),
+            )
+        return len(rows)
+
+    def remove_document(self, doc_key):
+        with self._db:
+            self._db.execute("UPDATE chunks SET active = 0 WHERE doc_key = ?", (doc_key,))
+            self._db.execute("DELETE FROM documents WHERE doc_key = ?", (doc_key,))
+
+    def vectors(self):
+        """Read-only memory map of every row, active or not"""
+        if len(self) == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.vector_path, dtype=np.float32, mode="r", shape=(len(self), self.dim))
+
+    def active_rows(self):
+        """(ids, categories) of live chunks, ordered by id"""
+        rows = self._db.execute("SELECT id, category FROM chunks WHERE active = 1 ORDER BY id").fetchall()
+        return np.array([r[0] for r in rows], dtype=np.int64), [r[1] for r in rows]
+
+    def chunks(self, ids):
+        """{id: row} for the given chunk ids"""
+        ids = [int(i) for i in ids]
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            query = ("SELECT id, doc_key, category, page_start, page_end, text FROM chunks WHERE id IN (%s)"
+                     % ",".join("?" * len(batch)))
+            for row in self._db.execute(query, batch):
+                found[row[0]] = dict(zip(("id", "doc_key", "category", "page_start", "page_end", "text"), row))
+        return found
+
+    def iter_active_chunks(self):
+        """(id, category, text) of every live chunk, ordered by id"""
+        yield from self._db.execute("SELECT id, category, text FROM chunks WHERE active = 1 ORDER BY id")
+
+    def compact(self):
+        """
+        Rewrite the vector file without retired rows, renumbering chunks
+        The live rows go to a new generation's file, and the renumbering and
+        the switch to that file commit in one transaction: a crash at any
+        point leaves the catalogue pointing at vectors numbered like it.
+        """
+        ids, _ = self.active_rows()
+        vectors = self.vectors()
+        old_path = self.vector_path
+        generation = int(self._meta("generation") or 0) + 1
+        new_path = self.path / f"vectors.{generation}.f32"
+        # Overwrites whatever an interrupted compaction left at this generation
+        with open(new_path, "wb") as f:
+            for start in range(0, len(ids), 4096):
+                f.write(np.ascontiguousarray(vectors[ids[start:start + 4096]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        del vectors
+        with self._db:
+            self._db.execute("DELETE FROM chunks WHERE active = 0")
+            self._db.execute("CREATE TEMP TABLE renumber AS SELECT id AS old_id, "
+                             "ROW_NUMBER() OVER (ORDER BY id) - 1 AS new_id FROM chunks")
+            # Offset first so the new ids never collide with old ones mid-update
+            self._db.execute("UPDATE chunks SET id = -1 - (SELECT new_id FROM renumber WHERE old_id = chunks.id)")
+            self._db.execute("UPDATE chunks SET id = -1 - id")
+            self._db.execute("DROP TABLE renumber")
+            self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [("generation", str(generation)), ("vector_file", new_path.name)])
+        # Readers that already mapped the old file keep their mapping
+        old_path.unlink(missing_ok=True)
+        return len(ids)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _embedded_batches(chunks, embedder, batch_size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) == batch_size:
+            yield batch, embedder.embed([c.text for c in batch])
+            batch = []
+    if batch:
+        yield batch, embedder.embed([c.text for c in batch])
+
+def ingest_corpus(base_path="rag_documents", store_path=None, embedder=None,
+                  batch_size=EMBED_BATCH_SIZE, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """
+    Bring the vector store up to date with the downloaded corpus
+    A document is (re-)embedded only when its manifest checksum or the
+    embedder differs from what the store holds; documents that have left
+    the manifest are retired. Returns counts per outcome.
+    """
+    base_path = Path(base_path)
+    embedder = embedder or HashingEmbedder()
+    store_path = store_path or base_path / STORE_DIR
+    counts = {"embedded": 0, "unchanged": 0, "removed": 0, "chunks": 0}
+
+    with DocumentManifest(base_path) as manifest, VectorStore(store_path, embedder.dim) as store:
+        manifest.sync(DOCUMENTS)
+        fetched = {entry['key']: entry for entry in manifest.entries()
+                   if entry['status'] in (DOWNLOADED, NOT_MODIFIED) and entry['sha256']}
+
+        for doc_key in store.documents():
+            if doc_key not in fetched:
+                store.remove_document(doc_key)
+                counts["removed"] += 1
+
+        for doc_key, entry in fetched.items():
+            stored = store.document(doc_key)
+            if stored and stored["sha256"] == entry['sha256'] and stored["embedder"] == embedder.name:
+                counts["unchanged"] += 1
+                continue
+
+            start = time.perf_counter()
+            chunks = iter_chunks(iter_pages(base_path / entry['path']), chunk_words, overlap)
+            written = store.write_document(doc_key, entry['category'], entry['sha256'], embedder.name,
+                                           _embedded_batches(chunks, embedder, batch_size))
+            counts["embedded"] += 1
+            counts["chunks"] += written
+            print(f"Embedded {doc_key}: {written} chunks in {time.perf_counter() - start:.2f}s")
+
+    print(f"Ingestion: {counts['embedded']} embedded ({counts['chunks']} chunks), "
+          f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk and embed the downloaded RAG corpus")
+    parser.add_argument("--base-path", default="rag_documents")
+    parser.add_argument("--store", help=f"Vector store directory (default: <base-path>/{STORE_DIR})")
+    parser.add_argument("--model", help="sentence-transformers model; default is the hashing embedder")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--compact", action="store_true", help="Reclaim retired vectors afterwards")
+    args = parser.parse_args()
+
+    embedder = SentenceTransformerEmbedder(args.model) if args.model else HashingEmbedder()
+    ingest_corpus(args.base_path, args.store, embedder, args.batch_size)
+    if args.compact:
+        with VectorStore(args.store or Path(args.base_path) / STORE_DIR) as store:
+            print(f"Compacted store to {store.compact()} vectors")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+RAG Document Manifest
+Machine-readable record of every document in the RAG corpus: where it came
+from, what was actually fetched (size, SHA-256, validators) and when
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+MANIFEST_FILE = "manifest.sqlite"
+
+# Entry statuses
+PENDING = "pending"
+DOWNLOADED = "downloaded"
+NOT_MODIFIED = "not_modified"
+FAILED = "failed"
+
+COLUMNS = ("key", "category", "name", "url", "description", "path", "status", "size", "sha256",
+           "etag", "last_modified", "fetched_at", "checked_at", "partial_etag", "partial_last_modified")
+
+class DocumentManifest:
+    """
+    SQLite-backed manifest, one row per entry in ``DOCUMENTS``
+    Each update is a single transaction, so readers (and a crashed
+    downloader) only ever see whole rows. Safe to share between threads.
+    """
+
+    def __init__(self, base_path="rag_documents"):
+        self.base_path = Path(base_path)
+        self.base_path.mkdir(parents=True, exist_ok=True)
+        self.path = self.base_path / MANIFEST_FILE
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "key TEXT PRIMARY KEY, category TEXT, name TEXT, url TEXT, description TEXT, path TEXT, "
+            "status TEXT NOT NULL DEFAULT 'pending', size INTEGER, sha256 TEXT, etag TEXT, "
+            "last_modified TEXT, fetched_at REAL, checked_at REAL, "
+            "partial_etag TEXT, partial_last_modified TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS documents_status ON documents (status)")
+
+    @staticmethod
+    def key(category, name):
+        return f"{category}/{name}"
+
+    def sync(self, documents):
+        """
+        Add new ``DOCUMENTS`` entries and refresh their metadata; fetch results
+        are kept. The connection is in autocommit mode, so the batch runs in an
+        explicit transaction: one commit, and nothing applied if any row fails.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for category, docs in documents.items():
+                    for doc in docs:
+                        key = self.key(category, doc['name'])
+                        self._db.execute(
+                            "INSERT INTO documents (key, category, name, url, description, path) "
+                            "VALUES (?, ?, ?, ?, ?, ?) "
+                            "ON CONFLICT(key) DO UPDATE SET url = excluded.url, description = excluded.description",
+                            (key, category, doc['name'], doc['url'], doc['description'], key),
+                        )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM documents WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def entries(self, status=None, category=None):
+        query, params = "SELECT * FROM documents WHERE 1 = 1", []
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY key", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def checksums(self):
+        """{key: sha256} of every document fetched so far"""
+        with self._lock:
+            rows = self._db.execute("SELECT key, sha256 FROM documents WHERE sha256 IS NOT NULL").fetchall()
+        return {key: sha256 for key, sha256 in rows}
+
+    def changed_since(self, checksums):
+        """Keys whose content differs from a previous ``checksums()`` snapshot"""
+        return sorted(key for key, sha256 in self.checksums().items() if checksums.get(key) != sha256)
+
+    def record(self, key, status=None, **fields):
+        """
+        Update one entry; ``fields`` are manifest columns (size, sha256, etag,
+        ...). Without ``status`` only the fields change, e.g. the validators
+        of a download still in progress.
+        """
+        unknown = set(fields) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown manifest columns: {', '.join(sorted(unknown))}")
+        if status is not None:
+            fields = dict(fields, status=status, checked_at=time.time())
+        if status == DOWNLOADED:
+            fields.setdefault('fetched_at', fields['checked_at'])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            # A single statement commits atomically on an autocommit connection
+            self._db.execute(f"UPDATE documents SET {assignments} WHERE key = ?", (*fields.values(), key))
+
+    def to_json(self, path=None):
+        """Snapshot the manifest as JSON (written atomically when ``path`` is given)"""
+        snapshot = json.dumps({"documents": self.entries()}, indent=2)
+        if path is not None:
+            path = Path(path)
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_text(snapshot)
+            tmp_path.replace(path)
+        return snapshot
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the RAG document manifest")
+    parser.add_argument("--base-path", default="rag_documents")
+    parser.add_argument("--status", choices=[PENDING, DOWNLOADED, NOT_MODIFIED, FAILED])
+    parser.add_argument("--json", action="store_true", help="Print the full manifest as JSON")
+    args = parser.parse_args()
+
+    with DocumentManifest(args.base_path) as manifest:
+        if args.json:
+            print(manifest.to_json())
+            return
+        for entry in manifest.entries(status=args.status):
+            sha = (entry['sha256'] or "-")[:12]
+            print(f"{entry['status']:<13} {entry['size'] or 0:>12,} {sha:<12} {entry['key']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+RAG Hybrid Retrieval
+BM25 keyword search and vector search over the same chunks, fused by
+reciprocal rank, behind an LRU/TTL cache of normalised queries
+"""
+
+import argparse
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from pathlib import Path
+
+import numpy as np
+
+from rag_index import DEFAULT_PROBES, INDEX_DIR, IVFIndex, chunk_checksum
+from rag_ingest import STORE_DIR, HashingEmbedder, SentenceTransformerEmbedder, VectorStore
+
+# Keeps identifiers such as "a-ep", "1010.230" and "12.3.1" whole
+TOKEN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+RRF_K = 60
+CACHE_SIZE = 1024
+CACHE_TTL = 300.0
+
+def tokenize(text):
+    """
+    Lowercase terms; compound identifiers are kept whole and also split into
+    parts, so "SAQ A-EP" matches both "A-EP" and "EP"
+    """
+    terms = []
+    for token in TOKEN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(re.split(r"[.\-/]", token))
+    return terms
+
+def normalize_query(query):
+    return " ".join(query.lower().split()).rstrip("?.! ")
+
+class BM25Index:
+    """
+    Inverted index with Okapi BM25 scoring
+    Postings are NumPy arrays of (position, term frequency), so a query
+    costs one vectorised update per query term.
+    """
+
+    def __init__(self, ids, categories, lengths, postings, k1=1.5, b=0.75):
+        self.ids = ids
+        self.categories = categories
+        self.lengths = lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        # Length normalisation term of the BM25 denominator, per chunk
+        self._norm = k1 * (1 - b + b * lengths / max(self.avg_length, 1e-9))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, chunks, **params):
+        """``chunks`` yields (chunk_id, category, text)"""
+        ids, categories, lengths = [], [], []
+        positions, frequencies = defaultdict(list), defaultdict(list)
+        for position, (chunk_id, category, text) in enumerate(chunks):
+            terms = Counter(tokenize(text))
+            ids.append(chunk_id)
+            categories.append(category)
+            lengths.append(sum(terms.values()))
+            for term, count in terms.items():
+                positions[term].append(position)
+                frequencies[term].append(count)
+        postings = {term: (np.array(positions[term], dtype=np.int64), np.array(frequencies[term], dtype=np.float32))
+                    for term in positions}
+        return cls(np.array(ids, dtype=np.int64), np.array(categories, dtype=object),
+                   np.array(lengths, dtype=np.float32), postings, **params)
+
+    @classmethod
+    def from_store(cls, store, **params):
+        return cls.build(store.iter_active_chunks(), **params)
+
+    def search(self, query, k=10, categories=None):
+        """(scores, chunk ids) of the best ``k`` matches, best first"""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            positions, tf = posting
+            idf = math.log(1 + (len(self.ids) - len(positions) + 0.5) / (len(positions) + 0.5))
+            scores[positions] += idf * tf * (self.k1 + 1) / (tf + self._norm[positions])
+        if categories is not None:
+            scores[~np.isin(self.categories, list(categories))] = 0
+        hits = np.nonzero(scores)[0]
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return scores[hits], self.ids[hits]
+
+class QueryCache:
+    """Thread-safe LRU of results keyed by normalised query, expiring after ``ttl`` seconds"""
+
+    def __init__(self, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+class HybridRetriever:
+    """
+    Fuses BM25 and vector rankings with reciprocal rank fusion
+    Exact identifiers ("SAQ A-EP", "31 CFR 1010.230") are carried by BM25,
+    paraphrases by the vector index; a chunk ranked well by either rises.
+    """
+
+    def __init__(self, store, index, bm25, embedder, cache=None, candidates=50):
+        self.store = store
+        self.index = index
+        self.bm25 = bm25
+        self.embedder = embedder
+        self.cache = cache if cache is not None else QueryCache()
+        self.candidates = candidates
+
+    @classmethod
+    def open(cls, base_path="rag_documents", embedder=None, rebuild=True, **params):
+        """
+        Load the ingested store and saved index under ``base_path``
+        BM25 covers the store's live chunks; the saved index must cover the
+        same ones. A missing or stale index is rebuilt and saved, or with
+        ``rebuild=False`` refused, so retired chunks are never returned.
+        Queries must be embedded like the documents were: ``embedder``
+        defaults to the hashing embedder, and any other stored embedder is
+        refused rather than searched in the wrong vector space.
+        """
+        base_path = Path(base_path)
+        store = VectorStore(base_path / STORE_DIR)
+        embedder = embedder or (HashingEmbedder(store.dim) if store.dim else HashingEmbedder())
+        others = store.embedders() - {embedder.name}
+        if others:
+            store.close()
+            raise ValueError(f"Store was embedded with {', '.join(sorted(others))}, not {embedder.name}; "
+                             f"open it with the same embedder")
+        bm25 = BM25Index.from_store(store)
+        index_path = base_path / INDEX_DIR
+        index = IVFIndex.load(index_path) if (index_path / "index.json").exists() else None
+        if index is None or index.checksum != chunk_checksum(bm25.ids):
+            if not rebuild:
+                store.close()
+                raise ValueError(f"Index at {index_path} does not match the vector store; "
+                                 f"rebuild it with rag_index.py build")
+            index = IVFIndex.from_store(store)
+            index.save(index_path)
+            print(f"Rebuilt stale index: {len(index)} chunks in {index.n_lists} lists")
+        return cls(store, index, bm25, embedder, **params)
+
+    def search(self, query, k=10, categories=None, n_probe=DEFAULT_PROBES):
+        """
+        Top ``k`` chunks as dicts (doc_key, category, pages, text, score).
+        Repeated questions are answered from the cache.
+        """
+        key = (normalize_query(query), k, tuple(sorted(categories)) if categories else None, n_probe)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        depth = max(self.candidates, k)
+        _, keyword_ids = self.bm25.search(query, depth, categories)
+        _, vector_ids = self.index.search(self.embedder.embed([query]), depth, n_probe, categories)
+
+        fused = defaultdict(float)
+        for ranking in (keyword_ids, vector_ids[0][vector_ids[0] >= 0]):
+            for rank, chunk_id in enumerate(ranking):
+                fused[int(chunk_id)] += 1.0 / (RRF_K + rank + 1)
+        best = sorted(fused, key=fused.get, reverse=True)[:k]
+
+        chunks = self.store.chunks(best)
+        results = [dict(chunks[chunk_id], score=fused[chunk_id]) for chunk_id in best if chunk_id in chunks]
+        self.cache.put(key, results)
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Ask the regulatory corpus a question")
+    parser.add_argument("query")
+    parser.add_argument("--base-path", default="rag_documents")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--category", action="append", help="Restrict to a DOCUMENTS category (repeatable)")
+    parser.add_argument("--probes", type=int, default=DEFAULT_PROBES,
+                        help="IVF lists scanned; more raises recall at some latency")
+    parser.add_argument("--model", help="sentence-transformers model the corpus was ingested with")
+    args = parser.parse_args()
+
+    embedder = SentenceTransformerEmbedder(args.model) if args.model else None
+    retriever = HybridRetriever.open(args.base_path, embedder)
+    start = time.perf_counter()
+    results = retriever.search(args.query, args.k, args.category, args.probes)
+    print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for result in results:
+        print(f"\n[{result['score']:.4f}] {result['doc_key']} p.{result['page_start']}-{result['page_end']}")
+        print(f"  {result['text'][:200]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Document Templates
+Renders a document's static layout once as a cached base layer and draws
+only the per-merchant fields from a data record on top of a copy of it
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Rasterising text is most of the cost of a render, and field values repeat
+# heavily across variants (dates, descriptions, addresses), so each distinct
+# string is rasterised once into a coverage mask and pasted thereafter
+STAMP_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=None)
+def _default_font():
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=STAMP_CACHE_SIZE)
+def _text_stamp(text: str) -> Tuple[Image.Image, Tuple[int, int]]:
+    font = _default_font()
+    left, top, right, bottom = font.getbbox(text)
+    stamp = Image.new('L', (max(right - left, 1), max(bottom - top, 1)), 0)
+    ImageDraw.Draw(stamp).text((-left, -top), text, fill=255, font=font)
+    return stamp, (left, top)
+
+def _draw_text(img: Image.Image, xy: Tuple[int, int], text: str, fill: str):
+    """Pixel-identical to ``ImageDraw.text`` with the default font"""
+    stamp, (left, top) = _text_stamp(text)
+    img.paste(fill, (xy[0] + left, xy[1] + top), stamp)
+
+@dataclass
+class TextField:
+    """A single value drawn at ``xy``; ``format`` wraps it, e.g. "Account: {}" """
+    name: str
+    xy: Tuple[int, int]
+    format: str = "{}"
+    fill: str = 'black'
+
+@dataclass
+class TableField:
+    """
+    Rows of a table, one line per row starting at ``y``.
+    ``columns`` are the x positions of each value in a row; ``fill`` may be
+    a callable ``fill(row, column_index)`` returning that cell's colour.
+    """
+    name: str
+    y: int
+    columns: Sequence[int]
+    row_height: int = 25
+    fill: Union[str, Callable[[Sequence, int], str]] = 'black'
+
+class DocumentTemplate:
+    """
+    Static layout plus variable fields
+    ``draw_static`` paints everything that is the same on every copy of the
+    document; it runs once, on the first render. Each render copies that base
+    layer and draws the record's fields, so the cost of a variant is the
+    handful of fields that change rather than the whole page.
+    """
+
+    def __init__(self, size: Tuple[int, int], background: str,
+                 draw_static: Callable[[ImageDraw.ImageDraw], None],
+                 fields: List[Union[TextField, TableField]]):
+        self.size = size
+        self.background = background
+        self.draw_static = draw_static
+        self.fields = fields
+        self._base: Optional[Image.Image] = None
+
+    @property
+    def base(self) -> Image.Image:
+        """The cached static layer (do not draw on it; use ``render``)"""
+        if self._base is None:
+            img = Image.new('RGB', self.size, color=self.background)
+            self.draw_static(ImageDraw.Draw(img))
+            self._base = img
+        return self._base
+
+    def render(self, record: Dict) -> Image.Image:
+        """Draw ``record``'s fields onto a copy of the base layer"""
+        missing = [f.name for f in self.fields if f.name not in record]
+        if missing:
+            raise KeyError(f"Record is missing template fields: {', '.join(missing)}")
+
+        img = self.base.copy()
+        for f in self.fields:
+            if isinstance(f, TextField):
+                _draw_text(img, f.xy, f.format.format(record[f.name]), f.fill)
+                continue
+            y = f.y
+            for row in record[f.name]:
+                for column, (x, value) in enumerate(zip(f.columns, row)):
+                    fill = f.fill(row, column) if callable(f.fill) else f.fill
+                    _draw_text(img, (x, y), str(value), fill)
+                y += f.row_height
+        return img
+
+    def render_many(self, records) -> List[Image.Image]:
+        return [self.render(record) for record in records]
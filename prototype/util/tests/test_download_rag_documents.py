@@ -0,0 +1,169 @@
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download_rag_documents import create_session, download_file
+from rag_manifest import DocumentManifest
+
+BODY = bytes(range(256)) * 1024
+ETAG = '"v1"'
+
+class DocumentHandler(BaseHTTPRequestHandler):
+    """Serves ``server.body`` with a strong ETag, honouring conditional and range requests"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        body = server.body
+        if self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        status, start = 200, 0
+        byte_range = self.headers.get("Range")
+        if byte_range and self.headers.get("If-Range", server.etag) == server.etag:
+            start = int(byte_range.split("=")[1].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.end_headers()
+                return
+            status = 206
+        payload = body[start:]
+
+        self.send_response(status)
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        self.end_headers()
+        if server.truncate_at is not None:
+            # Drop the connection part way through the body
+            self.wfile.write(payload[:server.truncate_at])
+            self.wfile.flush()
+            self.close_connection = True
+            server.truncate_at = None
+            return
+        self.wfile.write(payload)
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), DocumentHandler)
+    httpd.body, httpd.etag, httpd.truncate_at, httpd.requests = BODY, ETAG, None, []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/doc.pdf"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def session():
+    with create_session(1) as session:
+        yield session
+
+def test_download_writes_file_and_validators(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    status, fields = download_file(server.url, target, "doc", session)
+
+    assert status == "downloaded"
+    assert target.read_bytes() == BODY
+    assert not (tmp_path / "doc.pdf.part").exists()
+    assert fields["size"] == len(BODY)
+    assert fields["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert fields["etag"] == ETAG
+
+def test_existing_file_is_revalidated_with_etag(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    _, fields = download_file(server.url, target, "doc", session)
+
+    status, changed = download_file(server.url, target, "doc", session, fields)
+
+    assert status == "not_modified"
+    assert changed == {}
+    assert server.requests[-1]["If-None-Match"] == ETAG
+    assert target.read_bytes() == BODY
+
+def test_interrupted_download_keeps_part_and_resumes_with_if_range(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    part = tmp_path / "doc.pdf.part"
+    server.truncate_at = 100_000
+
+    status, fields = download_file(server.url, target, "doc", session)
+
+    assert status == "failed"
+    assert not target.exists()
+    assert part.exists() and 0 < part.stat().st_size < len(BODY)
+    assert fields["partial_etag"] == ETAG
+
+    resumed_from = part.stat().st_size
+    status, fields = download_file(server.url, target, "doc", session, fields)
+
+    assert status == "downloaded"
+    assert server.requests[-1]["Range"] == f"bytes={resumed_from}-"
+    assert server.requests[-1]["If-Range"] == ETAG
+    assert target.read_bytes() == BODY
+    assert fields["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert not part.exists()
+
+def test_validators_reach_the_manifest_before_the_body(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    key = DocumentManifest.key("kyc_aml", "doc.pdf")
+
+    with DocumentManifest(tmp_path) as manifest:
+        manifest.sync({"kyc_aml": [{"name": "doc.pdf", "url": server.url, "description": "doc"}]})
+        server.truncate_at = 100_000
+        status, _ = download_file(server.url, target, "doc", session, manifest.get(key),
+                                  lambda validators: manifest.record(key, **validators))
+        assert status == "failed"
+        # Only the manifest carries the validator over to the next run
+        entry = manifest.get(key)
+        assert entry["partial_etag"] == ETAG and entry["status"] == "pending"
+
+        resumed_from = (tmp_path / "doc.pdf.part").stat().st_size
+        status, fields = download_file(server.url, target, "doc", session, entry)
+
+    assert status == "downloaded"
+    assert server.requests[-1]["If-Range"] == ETAG
+    assert server.requests[-1]["Range"] == f"bytes={resumed_from}-"
+    assert target.read_bytes() == BODY
+
+def test_changed_validator_restarts_from_scratch(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    (tmp_path / "doc.pdf.part").write_bytes(b"stale bytes of the old version")
+    server.body, server.etag = BODY[::-1], '"v2"'
+
+    status, fields = download_file(server.url, target, "doc", session, {"partial_etag": ETAG})
+
+    assert status == "downloaded"
+    assert server.requests[-1]["If-Range"] == ETAG
+    assert target.read_bytes() == BODY[::-1]
+    assert fields["etag"] == '"v2"'
+
+def test_unsatisfiable_range_discards_part_and_restarts(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    (tmp_path / "doc.pdf.part").write_bytes(BODY + b"trailing garbage")
+
+    status, fields = download_file(server.url, target, "doc", session, {"partial_etag": ETAG})
+
+    assert status == "downloaded"
+    assert "Range" in server.requests[0] and "Range" not in server.requests[-1]
+    assert target.read_bytes() == BODY
+    assert fields["sha256"] == hashlib.sha256(BODY).hexdigest()
+    assert not (tmp_path / "doc.pdf.part").exists()
+
+def test_failed_refresh_leaves_existing_file_untouched(server, session, tmp_path):
+    target = tmp_path / "doc.pdf"
+    target.write_bytes(b"previous version")
+    server.truncate_at = 10
+
+    status, _ = download_file(server.url, target, "doc", session, {"etag": '"v0"'})
+
+    assert status == "failed"
+    assert target.read_bytes() == b"previous version"
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from rag_index import IVFIndex, _synthetic_corpus, chunk_checksum, exact_search
+from rag_ingest import VectorStore
+
+@pytest.fixture(scope="module")
+def corpus():
+    vectors, categories = _synthetic_corpus(2000, 32, clusters=16)
+    ids = np.arange(100, 2100, dtype=np.int64)
+    return vectors, ids, categories, IVFIndex.build(vectors, ids, categories, n_lists=16)
+
+def recall(found, truth):
+    return np.mean([len(set(t) & set(f)) / len(t) for t, f in zip(truth, found)])
+
+def test_search_finds_the_exact_neighbours_when_probing_every_list(corpus):
+    vectors, ids, _, index = corpus
+    queries = vectors[:20]
+    _, truth = exact_search(vectors, queries, 10, ids)
+    scores, found = index.search(queries, 10, n_probe=index.n_lists)
+    assert recall(found, truth) == 1.0
+    assert found[:, 0].tolist() == ids[:20].tolist()
+    assert (np.diff(scores, axis=1) <= 0).all()
+    assert recall(index.search(queries, 10, n_probe=4)[1], truth) > 0.8
+
+def test_category_filter_only_returns_that_category(corpus):
+    vectors, ids, categories, index = corpus
+    category = categories[0]
+    _, found = index.search(vectors[:10], 10, categories=[category])
+    by_id = dict(zip(ids.tolist(), categories))
+    assert {by_id[i] for i in found[found >= 0].tolist()} == {category}
+    with pytest.raises(ValueError, match="Unknown categories"):
+        index.search(vectors[:1], categories=["not_a_category"])
+
+def test_save_and_load_round_trip(corpus, tmp_path):
+    vectors, _, _, index = corpus
+    index.save(tmp_path / "index")
+    loaded = IVFIndex.load(tmp_path / "index")
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.checksum == index.checksum and len(loaded) == len(index)
+    for expected, actual in zip(index.search(vectors[:5], 5), loaded.search(vectors[:5], 5)):
+        np.testing.assert_array_equal(expected, actual)
+
+def test_chunk_checksum_depends_on_the_ids_not_their_order():
+    assert chunk_checksum([3, 1, 2]) == chunk_checksum(np.array([1, 2, 3]))
+    assert chunk_checksum([1, 2, 3]) != chunk_checksum([1, 2, 4])
+    assert chunk_checksum([]) == IVFIndex.build(np.zeros((0, 8), np.float32)).checksum
+
+def test_empty_store_builds_an_index_that_finds_nothing(tmp_path):
+    with VectorStore(tmp_path / "store") as store:
+        index = IVFIndex.from_store(store)
+    assert len(index) == 0 and index.n_lists == 0
+    index.save(tmp_path / "index")
+    scores, ids = IVFIndex.load(tmp_path / "index").search(np.ones((2, 8), np.float32), 3)
+    assert ids.tolist() == [[-1] * 3] * 2
+    assert np.isneginf(scores).all()
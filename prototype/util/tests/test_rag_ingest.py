@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from rag_ingest import Chunk, HashingEmbedder, VectorStore
+
+EMBEDDER = HashingEmbedder(32)
+
+def write(store, doc_key, texts):
+    chunks = [Chunk(text, 1, 1) for text in texts]
+    store.write_document(doc_key, "pci_compliance", doc_key, EMBEDDER.name,
+                         [(chunks, EMBEDDER.embed(texts))])
+
+def live_vectors(store):
+    ids, _ = store.active_rows()
+    texts = [store.chunks(ids)[int(i)]["text"] for i in ids]
+    return np.asarray(store.vectors()[ids]), EMBEDDER.embed(texts)
+
+@pytest.fixture
+def store(tmp_path):
+    with VectorStore(tmp_path / "store", EMBEDDER.dim) as store:
+        write(store, "a", [f"cardholder data requirement {n}" for n in range(5)])
+        write(store, "b", [f"beneficial owner threshold {n}" for n in range(5)])
+        write(store, "a", [f"revised cardholder data requirement {n}" for n in range(3)])
+        yield store
+
+def test_compact_renumbers_chunks_and_vectors_together(store, tmp_path):
+    old_path = store.vector_path
+    assert store.compact() == 8
+
+    stored, expected = live_vectors(store)
+    assert len(store) == 8 and store.active_rows()[0].tolist() == list(range(8))
+    np.testing.assert_allclose(stored, expected)
+    assert not old_path.exists()
+    with VectorStore(tmp_path / "store") as reopened:
+        np.testing.assert_allclose(*live_vectors(reopened))
+
+def test_interrupted_compaction_leaves_store_consistent(store, monkeypatch):
+    def crash(fd):
+        raise OSError("disk full")
+    monkeypatch.setattr("rag_ingest.os.fsync", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+
+    np.testing.assert_allclose(*live_vectors(store))
+    assert store.compact() == 8
+    np.testing.assert_allclose(*live_vectors(store))
+
+def test_crash_after_commit_leaves_store_consistent(store, monkeypatch):
+    def crash(self, missing_ok=False):
+        raise OSError("killed")
+    monkeypatch.setattr("pathlib.Path.unlink", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+
+    assert store.active_rows()[0].tolist() == list(range(8))
+    np.testing.assert_allclose(*live_vectors(store))
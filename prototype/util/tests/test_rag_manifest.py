@@ -0,0 +1,22 @@
+import pytest
+
+from rag_manifest import DocumentManifest
+
+DOCUMENTS = {
+    "kyc_aml": [
+        {"name": "cdd_rule.pdf", "url": "https://example.org/cdd.pdf", "description": "CDD Rule FAQ"},
+        {"name": "broken.pdf", "url": "https://example.org/broken.pdf"},
+    ],
+}
+
+def test_sync_is_all_or_nothing(tmp_path):
+    with DocumentManifest(tmp_path) as manifest:
+        # The second entry has no description, so the batch fails part way
+        with pytest.raises(KeyError):
+            manifest.sync(DOCUMENTS)
+        assert manifest.entries() == []
+        assert not manifest._db.in_transaction
+
+        manifest.sync({"kyc_aml": DOCUMENTS["kyc_aml"][:1]})
+    with DocumentManifest(tmp_path) as reopened:
+        assert [entry["key"] for entry in reopened.entries()] == ["kyc_aml/cdd_rule.pdf"]
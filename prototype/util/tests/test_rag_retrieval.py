@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from rag_index import INDEX_DIR, IVFIndex
+from rag_ingest import STORE_DIR, Chunk, HashingEmbedder, VectorStore
+from rag_retrieval import BM25Index, HybridRetriever, QueryCache, tokenize
+
+EMBEDDER = HashingEmbedder(64)
+
+DOCUMENTS = {
+    "pci_dss": ("pci_compliance", [
+        "Merchants validating with SAQ A-EP must scan their payment page quarterly",
+        "Cardholder data must be encrypted when transmitted across open public networks",
+    ]),
+    "cdd_rule": ("aml_kyc", [
+        "Covered institutions identify beneficial owners under 31 CFR 1010.230",
+        "Customer due diligence includes understanding the nature of the customer relationship",
+    ]),
+}
+
+def ingest(base_path, documents, embedder=EMBEDDER):
+    with VectorStore(base_path / STORE_DIR, embedder.dim) as store:
+        for doc_key, (category, texts) in documents.items():
+            store.write_document(doc_key, category, doc_key, embedder.name,
+                                 [([Chunk(text, 1, 1) for text in texts], embedder.embed(texts))])
+
+@pytest.fixture
+def base_path(tmp_path):
+    ingest(tmp_path, DOCUMENTS)
+    return tmp_path
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    assert tokenize("SAQ A-EP, 31 CFR 1010.230") == ["saq", "a-ep", "a", "ep", "31", "cfr", "1010.230", "1010", "230"]
+
+def test_bm25_ranks_exact_identifiers_and_filters_categories():
+    bm25 = BM25Index.build([
+        (0, "aml_kyc", "beneficial owners under 31 CFR 1010.230"),
+        (1, "pci_compliance", "SAQ A-EP payment page scans"),
+        (2, "pci_compliance", "SAQ D covers every other merchant"),
+    ])
+    scores, ids = bm25.search("SAQ A-EP")
+    assert ids.tolist() == [1, 2] and scores[0] > scores[1]
+    assert bm25.search("1010.230")[1].tolist() == [0]
+    assert bm25.search("SAQ A-EP", categories=["aml_kyc"])[1].tolist() == []
+    assert bm25.search("SAQ", k=1)[1].tolist() in ([1], [2])
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["hits"] == 3 and cache.stats()["misses"] == 1
+
+def test_query_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("rag_retrieval.time.monotonic", lambda: now[0])
+    cache = QueryCache(ttl=10)
+    cache.put("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+class FixedIndex:
+    """Vector index stub returning a fixed ranking"""
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def search(self, queries, k, n_probe, categories):
+        ids = np.full((1, k), -1, dtype=np.int64)
+        ids[0, :len(self.ids)] = self.ids[:k]
+        return np.zeros((1, k), dtype=np.float32), ids
+
+def test_reciprocal_rank_fusion_favours_chunks_both_rankings_agree_on(base_path):
+    with VectorStore(base_path / STORE_DIR) as store:
+        bm25 = BM25Index.build([(0, "c", "alpha beta"), (1, "c", "alpha"), (2, "c", "gamma"), (3, "c", "beta")])
+        # Keyword ranking for "alpha beta" is [0, 1, 3]; the vector ranking puts 3 first
+        retriever = HybridRetriever(store, FixedIndex([3, 0, 2]), bm25, EMBEDDER)
+        results = retriever.search("alpha beta", k=4)
+    assert [result["id"] for result in results] == [0, 3, 1, 2]
+    assert results[0]["score"] == pytest.approx(1 / 61 + 1 / 62)
+
+def test_repeated_queries_are_served_from_the_cache(base_path):
+    retriever = HybridRetriever.open(base_path)
+    first = retriever.search("What is SAQ A-EP?")
+    assert retriever.search("what is saq a-ep") is first
+    assert retriever.cache.stats()["hits"] == 1
+    assert first[0]["doc_key"] == "pci_dss"
+
+def test_stale_index_is_rebuilt_or_refused(base_path):
+    HybridRetriever.open(base_path).store.close()
+    saved = IVFIndex.load(base_path / INDEX_DIR)
+    ingest(base_path, {"pci_dss": ("pci_compliance", ["Quarterly ASV scans are required for SAQ A-EP"])})
+
+    with pytest.raises(ValueError, match="does not match"):
+        HybridRetriever.open(base_path, rebuild=False)
+    retriever = HybridRetriever.open(base_path)
+    assert retriever.index.checksum != saved.checksum
+    assert len(retriever.index) == 3
+    texts = {result["text"] for result in retriever.search("SAQ A-EP")}
+    assert "Quarterly ASV scans are required for SAQ A-EP" in texts
+    assert "Merchants validating with SAQ A-EP must scan their payment page quarterly" not in texts
+
+def test_a_different_query_embedder_is_refused(base_path):
+    class OtherEmbedder(HashingEmbedder):
+        def __init__(self):
+            super().__init__(EMBEDDER.dim)
+            self.name = "st-all-MiniLM-L6-v2"
+
+    with pytest.raises(ValueError, match="embedded with hashing-64"):
+        HybridRetriever.open(base_path, OtherEmbedder())